@@ -0,0 +1,97 @@
+"""
+Measure the time the Gemini processor spends on function declarations per call.
+
+For tool sets of increasing size, compares converting and encoding the tools
+on every call, as gemini_processor used to, with src/llm/gemini_declarations.py
+once warm, both for the same tool list (the LLM calls of a request) and for an
+equal list decoded from a new request.
+
+    python benchmarks/gemini_declarations.py --tools 5,25,100
+
+Run it from mcp_servers/python/clients. Needs no network access.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.llm.gemini_declarations import gemini_tools
+
+
+def synthetic_tools(count: int) -> list:
+    return [{
+        "type": "function",
+        "function": {
+            "name": f"tool_{i}",
+            "description": "Searches the mailbox and returns matching messages " * 3,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Gmail search query"},
+                    "max_results": {"type": "integer", "description": "Maximum number of results", "default": 10},
+                    "labels": {"type": "array", "items": {"type": "string"}, "description": "Label IDs"},
+                    "window": {
+                        "type": "object",
+                        "properties": {"after": {"type": "string"}, "before": {"type": "string"}},
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+    } for i in range(count)]
+
+
+def convert_every_call(tools: list) -> str:
+    """gemini_processor's former conversion, top level properties only"""
+    function_declarations = []
+    for tool in tools:
+        func = tool.get("function", {})
+        parameters = func.get("parameters", {})
+        processed_props = {}
+        for key, val in parameters.get("properties", {}).items():
+            if val.get("type") == "array":
+                processed_props[key] = {"type": "array", "items": {"type": val.get("items", {}).get("type", "string")},
+                                        "default": val.get("default", []), "description": val.get("description", "")}
+            else:
+                processed_props[key] = {"type": val.get("type", "string"), "default": val.get("default", ""),
+                                        "description": val.get("description", "")}
+        function_declarations.append({"name": func.get("name"), "description": func.get("description"),
+                                      "parameters": {"type": parameters.get("type", "object"), "properties": processed_props,
+                                                     "required": parameters.get("required", [])}})
+    return json.dumps([{"functionDeclarations": function_declarations}])
+
+
+def per_call_us(call, iterations: int) -> float:
+    call()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return round((time.perf_counter() - started) / iterations * 1_000_000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Gemini function declaration construction per call")
+    parser.add_argument("--tools", default="5,25,100", help="Comma separated tool set sizes")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    report = []
+    for count in [int(c) for c in args.tools.split(",")]:
+        tools = synthetic_tools(count)
+        # Equal lists, as decoded from separate requests
+        copies = itertools.cycle([json.loads(json.dumps(tools)) for _ in range(args.iterations + 1)])
+        report.append({
+            "tools": count,
+            "convert_every_call_us": per_call_us(lambda: convert_every_call(tools), args.iterations),
+            "cached_same_list_us": per_call_us(lambda: gemini_tools(tools).encoded, args.iterations),
+            "cached_new_request_us": per_call_us(lambda: gemini_tools(next(copies)).encoded, args.iterations),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Load test for the client API.
+
+Drives /api/v1/mcp/process_message at a fixed concurrency and reports throughput
+and latency. With --workers it launches run.py once per worker count, so the
+scaling of the multi-worker mode can be compared side by side:
+
+    python benchmarks/load_test.py --payload payload.json --workers 1,2,4
+
+Run it from mcp_servers/python/clients.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+
+DEFAULT_PAYLOAD = {
+    "selected_server_credentials": {"MCP-GSUITE": {}},
+    "client_details": {
+        "api_key": "",
+        "temperature": 0.1,
+        "max_tokens": 1000,
+        "input": "List my calendars",
+        "input_type": "text",
+        "prompt": "you are a helpful assistant",
+        "chat_model": "gpt-4o-mini",
+        "chat_history": []
+    },
+    "selected_client": "MCP_CLIENT_OPENAI",
+    "selected_servers": ["MCP-GSUITE"]
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(url: str, payload: Dict[str, Any], concurrency: int, total_requests: int, timeout: float) -> Dict[str, Any]:
+    """Send total_requests requests with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total_requests):
+        queue.put_nowait(None)
+
+    async def worker(session: aiohttp.ClientSession):
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=payload) as resp:
+                    body = await resp.read()
+                    if resp.status != 200 or not json.loads(body).get("Status"):
+                        errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(timeout=client_timeout, connector=connector) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60.0):
+    """Poll the server until it accepts connections"""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(base_url) as resp:
+                    await resp.read()
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server at {base_url} did not become ready within {timeout}s")
+
+
+def start_server(workers: int, port: int, extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(extra_env or {})
+    env["MCP_CLIENT_WORKERS"] = str(workers)
+    env["MCP_CLIENT_BIND"] = f"127.0.0.1:{port}"
+    return subprocess.Popen([sys.executable, "run.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the MCP client API")
+    parser.add_argument("--url", default="http://127.0.0.1:5001", help="Base URL of a running server (ignored with --workers)")
+    parser.add_argument("--payload", help="JSON file with the request payload")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per request timeout in seconds")
+    parser.add_argument("--workers", help="Comma separated worker counts; launches run.py for each")
+    parser.add_argument("--port", type=int, default=5099, help="Port used when launching run.py")
+    args = parser.parse_args()
+
+    payload = DEFAULT_PAYLOAD
+    if args.payload:
+        with open(args.payload) as f:
+            payload = json.load(f)
+
+    path = "/api/v1/mcp/process_message"
+    results = []
+    if args.workers:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            process = start_server(workers, args.port)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                await wait_until_ready(base_url)
+                # Warm up every worker so server startup is not part of the measurement
+                await run_load(base_url + path, payload, workers * 2, workers * 4, args.timeout)
+                stats = await run_load(base_url + path, payload, args.concurrency, args.requests, args.timeout)
+            finally:
+                stop_server(process)
+            results.append({"workers": workers, **stats})
+    else:
+        results.append(await run_load(args.url + path, payload, args.concurrency, args.requests, args.timeout))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
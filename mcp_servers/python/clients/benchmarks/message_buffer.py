@@ -0,0 +1,119 @@
+"""
+Measure the CPU cost of building LLM request bodies over a long agent session.
+
+Replays synthetic conversations of --turns turns, each a user message followed
+by --tool-calls tool results, and builds the request body for every LLM call
+of the agent loop in two ways:
+
+    rebuild     converting the whole chat history and encoding the payload
+                on every call, as the processors used to
+    buffered    with src/llm/message_buffer.py, converting and encoding only
+                the messages added since the previous call
+
+Reports the total time per conversation and the time of the last call, which
+grows with the history when rebuilding. Needs no network access.
+
+    python benchmarks/message_buffer.py --turns 50 --conversations 5
+
+Run it from mcp_servers/python/clients.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.llm.message_buffer import encode_payload, MessageBuffer
+
+
+@dataclass
+class ChatMessage:
+    role: str
+    content: str
+
+
+def to_chat_message(msg):
+    return {"role": msg["role"], "content": msg["content"]}
+
+
+def payload_fields(tools):
+    return {"model": "gpt-4o", "max_tokens": 1000, "stream": False, "tools": tools, "tool_choice": "auto", "temperature": 0.1}
+
+
+def rebuild(prompt, chat_history, tools) -> bytes:
+    history = [ChatMessage(**msg) for msg in chat_history]
+    messages_arr = [{"role": "system", "content": prompt}]
+    messages_arr += [{"role": m.role, "content": m.content} for m in history]
+    return json.dumps({**payload_fields(tools), "messages": messages_arr}).encode()
+
+
+def buffered(buffer, prompt, chat_history, tools) -> bytes:
+    buffer.sync(chat_history)
+    system_message = json.dumps({"role": "system", "content": prompt})
+    return encode_payload(payload_fields(tools), messages=buffer.encode_array(head=[system_message])).encode()
+
+
+def synthetic_tool_result(turn: int, call: int, size: int) -> str:
+    emails = [{"id": f"{turn}-{call}-{i}", "subject": f"Subject {i}", "snippet": "lorem ipsum " * 8} for i in range(size // 150)]
+    return f"Executed tool: query_gmail_emails and the result is: {json.dumps(emails)}"
+
+
+def run_conversation(args, build) -> dict:
+    tools = [{"type": "function", "function": {"name": f"tool_{i}", "description": "d" * 200, "parameters": {"type": "object", "properties": {}}}} for i in range(10)]
+    prompt = "You are a helpful assistant. " * 20
+    chat_history = []
+    total = 0.0
+    last_call = 0.0
+    calls = 0
+    for turn in range(args.turns):
+        chat_history.append({"role": "user", "content": f"Request number {turn}, please look at my inbox"})
+        for call in range(args.tool_calls + 1):
+            started = time.perf_counter()
+            build(prompt, chat_history, tools)
+            last_call = time.perf_counter() - started
+            total += last_call
+            calls += 1
+            if call < args.tool_calls:
+                chat_history.append({"role": "assistant", "content": synthetic_tool_result(turn, call, args.result_bytes)})
+    return {"total_ms": total * 1000, "last_call_ms": last_call * 1000, "calls": calls}
+
+
+def summarize(runs: list) -> dict:
+    return {
+        "total_ms_per_conversation": round(statistics.median(run["total_ms"] for run in runs), 2),
+        "last_call_ms": round(statistics.median(run["last_call_ms"] for run in runs), 3),
+        "llm_calls_per_conversation": runs[0]["calls"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure request body construction over long agent sessions")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per turn")
+    parser.add_argument("--result-bytes", type=int, default=4000, help="Approximate size of each tool result")
+    parser.add_argument("--conversations", type=int, default=5)
+    args = parser.parse_args()
+
+    # Both ways must send the same body
+    buffer = MessageBuffer(to_chat_message)
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": synthetic_tool_result(0, 0, 500)}]
+    assert json.loads(rebuild("p", history, [])) == json.loads(buffered(buffer, "p", history, []))
+
+    report = {
+        "turns": args.turns,
+        "rebuild": summarize([run_conversation(args, rebuild) for _ in range(args.conversations)]),
+        # A new buffer per conversation, as every request starts its own
+        "buffered": summarize([
+            run_conversation(args, lambda *call, buffer=MessageBuffer(to_chat_message): buffered(buffer, *call))
+            for _ in range(args.conversations)
+        ]),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure the peak memory of holding LLM responses during a request.
+
+Replays an agent loop of --calls LLM calls, each returning a provider response
+of about --response-bytes, and keeps the responses the way a request does until
+its result is serialized. Reports the tracemalloc peak and the size of the JSON
+result for:
+
+    asdict          the processors' former dict data, a deep copy of the
+                    response kept in final_llm_response and llm_responses_arr
+    full            slotted response data referencing the response, with
+                    MCP_CLIENT_LLM_RESPONSE_VERBOSITY=full
+    final           the same with verbosity final
+    none            the same with verbosity none
+
+    python benchmarks/response_memory.py --calls 10 --response-bytes 200000
+
+Run it from mcp_servers/python/clients. Needs no network access.
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.llm.response_data import SuccessResponseDataFormat
+
+
+@dataclass
+class DictResponseDataFormat:
+    total_llm_calls: int
+    total_tokens: int
+    total_input_tokens: int
+    total_output_tokens: int
+    final_llm_response: Dict[str, Any]
+    llm_responses_arr: List[Dict[str, Any]]
+    messages: List[str]
+    output_type: str
+
+
+def provider_response(size: int) -> str:
+    """Raw body of a chat completion, as received from the provider"""
+    content = "word " * (size // 5)
+    return json.dumps({
+        "id": "chatcmpl-benchmark",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": size // 4, "total_tokens": 1000 + size // 4},
+    })
+
+
+def processor_data(body: str, mode: str):
+    response_data = json.loads(body)
+    fields = dict(
+        total_llm_calls=1, total_tokens=0, total_input_tokens=0, total_output_tokens=0,
+        final_llm_response=response_data, messages=[response_data["choices"][0]["message"]["content"]], output_type="text",
+    )
+    if mode == "asdict":
+        return asdict(DictResponseDataFormat(llm_responses_arr=[response_data], **fields))
+    return SuccessResponseDataFormat(**fields)
+
+
+def run_request(bodies: List[str], mode: str) -> int:
+    result = {"final_llm_response": None, "llm_responses_arr": [], "messages": []}
+    for body in bodies:
+        data = processor_data(body, mode)
+        # As record_llm_response in src/client_and_server_execution.py
+        if mode != "none":
+            result["final_llm_response"] = data.get("final_llm_response")
+            if mode in ("asdict", "full"):
+                result["llm_responses_arr"].append(data.get("final_llm_response"))
+        result["messages"] = data.get("messages")
+    return len(json.dumps({"Data": result}))
+
+
+def measure(bodies: List[str], mode: str) -> Dict[str, Any]:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result_bytes = run_request(bodies, mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_kib": round(peak / 1024, 1), "result_kib": round(result_bytes / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak memory of LLM response handling per request")
+    parser.add_argument("--calls", type=int, default=10, help="LLM calls per request")
+    parser.add_argument("--response-bytes", type=int, default=200000, help="Approximate size of each provider response")
+    args = parser.parse_args()
+
+    bodies = [provider_response(args.response_bytes) for _ in range(args.calls)]
+    report = {"calls": args.calls, "response_bytes": args.response_bytes, "modes": {}}
+    for mode in ("asdict", "full", "final", "none"):
+        report["modes"][mode] = measure(bodies, mode)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Offline benchmark of the client API.
+
+Starts the stub LLM and Google backends (benchmarks/stubs.py) and run.py pointed
+at them, then drives /api/v1/mcp/process_message and
+/api/v1/mcp/process_message_stream at each requested concurrency. For every run
+it reports p50/p95/p99 latency, throughput, errors, and the CPU time and peak RSS
+of run.py and every process it started (workers and MCP servers), read from /proc.
+
+    python benchmarks/run_benchmark.py --clients openai,gemini --concurrency 1,8,32
+
+Needs no network access and no real credentials. Run it from
+mcp_servers/python/clients on Linux. The MCP-GSUITE server must be runnable
+(uv and its dependencies installed). Results are printed as JSON and can be
+written to a file with --output to compare runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from load_test import percentile, start_server, stop_server, wait_until_ready
+
+
+CLIENTS = {
+    "openai": "MCP_CLIENT_OPENAI",
+    "azure": "MCP_CLIENT_AZURE_AI",
+    "gemini": "MCP_CLIENT_GEMINI",
+}
+
+ENDPOINTS = {
+    "process_message": "/api/v1/mcp/process_message",
+    "process_message_stream": "/api/v1/mcp/process_message_stream",
+}
+
+
+def build_payload(client: str, stub_url: str) -> Dict[str, Any]:
+    """Request payload for the given client, with credentials the stubs accept"""
+    client_details = {
+        "api_key": "stub-key",
+        "temperature": 0.1,
+        "max_tokens": 1000,
+        "input": "Show my unread emails",
+        "input_type": "text",
+        "prompt": "you are a helpful assistant",
+        "chat_model": "gpt-4o-mini" if client != "gemini" else "gemini-2.0-flash",
+        "chat_history": [],
+    }
+    if client == "azure":
+        client_details.update({"endpoint": stub_url, "deployment_id": "stub", "api_version": "2024-02-01"})
+
+    return {
+        "selected_server_credentials": {
+            "MCP-GSUITE": {
+                "token": "stub-access-token",
+                "refresh_token": "stub-refresh-token",
+                "token_uri": f"{stub_url}/token",
+                "client_id": "stub-client-id",
+                "client_secret": "stub-client-secret",
+            }
+        },
+        "client_details": client_details,
+        "selected_client": CLIENTS[client],
+        "selected_servers": ["MCP-GSUITE"],
+    }
+
+
+# ----------------------------------------------------------------- process resources
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _process_tree(pid: int) -> List[int]:
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(_children(current))
+    return pids
+
+
+def _cpu_seconds(pid: int) -> float:
+    """User plus system CPU time of a process"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat, counted after the command name
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class ResourceSampler:
+    """Samples CPU time and RSS of a process tree in the background while a run is in progress"""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.cpu: Dict[int, float] = {}
+        self.peak_rss = 0
+        self._baseline: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self):
+        pids = _process_tree(self.pid)
+        for pid in pids:
+            self.cpu[pid] = _cpu_seconds(pid)
+        self.peak_rss = max(self.peak_rss, sum(_rss_bytes(pid) for pid in pids))
+
+    async def _run(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._sample()
+        self._baseline = dict(self.cpu)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._sample()
+        cpu_seconds = sum(value - self._baseline.get(pid, 0.0) for pid, value in self.cpu.items())
+        return {"cpu_s": round(cpu_seconds, 3), "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1)}
+
+
+# ----------------------------------------------------------------- load generation
+
+async def _send(session: aiohttp.ClientSession, url: str, payload: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+    """Send one request. For streams, also measures the time to the first event"""
+    started = time.perf_counter()
+    first_event = None
+    ok = False
+    async with session.post(url, json=payload) as resp:
+        if not stream:
+            body = await resp.read()
+            ok = resp.status == 200 and bool(json.loads(body).get("Status"))
+        else:
+            async for line in resp.content:
+                if not line.startswith(b"data:"):
+                    continue
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+                event = json.loads(line[5:])
+                if event.get("StreamingStatus") == "ERROR" or "error" in event:
+                    ok = False
+                    break
+                if event.get("Action") == "AI-RESPONSE":
+                    ok = True
+                if event.get("StreamingStatus") == "COMPLETED":
+                    break
+    return {"ok": ok, "latency": time.perf_counter() - started, "first_event": first_event}
+
+
+async def drive(url: str, payload: Dict[str, Any], stream: bool, concurrency: int, total_requests: int, timeout: float) -> Dict[str, Any]:
+    """Send total_requests requests with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    first_events: List[float] = []
+    errors = 0
+    remaining = total_requests
+
+    async def worker(session: aiohttp.ClientSession):
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                result = await _send(session, url, payload, stream)
+                if not result["ok"]:
+                    errors += 1
+                if result["first_event"] is not None:
+                    first_events.append(result["first_event"])
+                latencies.append(result["latency"])
+            except Exception:
+                errors += 1
+                latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout), connector=connector) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        "requests": total_requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+    if stream:
+        stats["first_event_p50_ms"] = round(percentile(first_events, 50) * 1000, 1)
+        stats["first_event_p95_ms"] = round(percentile(first_events, 95) * 1000, 1)
+    return stats
+
+
+def start_stubs(args) -> subprocess.Popen:
+    stubs = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs.py")
+    return subprocess.Popen([
+        sys.executable, stubs,
+        "--port", str(args.stub_port),
+        "--llm-latency-ms", str(args.llm_latency_ms),
+        "--google-latency-ms", str(args.google_latency_ms),
+        "--messages", str(args.messages),
+    ])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP client API against local stub backends")
+    parser.add_argument("--clients", default="openai", help=f"Comma separated, any of {','.join(CLIENTS)}")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"Comma separated, any of {','.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per run")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per request timeout in seconds")
+    parser.add_argument("--port", type=int, default=5099, help="Port used for run.py")
+    parser.add_argument("--stub-port", type=int, default=5100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--google-latency-ms", type=float, default=80.0)
+    parser.add_argument("--messages", type=int, default=10, help="Messages returned by the Gmail stub per query")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "GEMINI_BASE_URL": f"{stub_url}/v1beta",
+        "GSUITE_API_ENDPOINT": stub_url,
+        "MCP_CLIENT_LOG_LEVEL": "WARNING",
+    }
+
+    results = []
+    stubs = start_stubs(args)
+    server = None
+    try:
+        await wait_until_ready(stub_url)
+        server = start_server(args.workers, args.port, env)
+        await wait_until_ready(base_url)
+
+        for client in args.clients.split(","):
+            payload = build_payload(client, stub_url)
+            for endpoint in args.endpoints.split(","):
+                url = base_url + ENDPOINTS[endpoint]
+                stream = endpoint == "process_message_stream"
+                # Warm up so MCP server startup and first-call costs stay out of the measurement
+                await drive(url, payload, stream, args.workers * 2, args.workers * 4, args.timeout)
+                for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                    sampler = ResourceSampler(server.pid)
+                    sampler.start()
+                    stats = await drive(url, payload, stream, concurrency, args.requests, args.timeout)
+                    resources = await sampler.stop()
+                    result = {"client": client, "endpoint": endpoint, "concurrency": concurrency, **stats, **resources}
+                    print(json.dumps(result), file=sys.stderr)
+                    results.append(result)
+    finally:
+        if server is not None:
+            stop_server(server)
+        stop_server(stubs)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
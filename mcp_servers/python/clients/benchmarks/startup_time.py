@@ -0,0 +1,90 @@
+"""
+Measure the client's time from process start to ready-to-serve.
+
+Starts run.py repeatedly and reports the time until it accepts HTTP
+connections, with MCP servers started lazily on first use (what a rolling
+deploy waits for) and, with --eager, with the servers started before serving.
+With --importtime it also lists the modules that take longest to import when
+run.py is loaded, from python -X importtime.
+
+    python benchmarks/startup_time.py --runs 10 --eager --importtime
+
+Run it from mcp_servers/python/clients. Results are printed as JSON and can be
+written to a file with --output to compare runs.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from load_test import start_server, stop_server, wait_until_ready
+
+
+async def time_to_ready(port: int, lazy: bool) -> float:
+    started = time.perf_counter()
+    process = start_server(1, port, {"MCP_CLIENT_LAZY_SERVERS": "true" if lazy else "false"})
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{port}", timeout=120.0)
+        return (time.perf_counter() - started) * 1000
+    finally:
+        stop_server(process)
+
+
+def slowest_imports(limit: int) -> list:
+    """Cumulative import time of the slowest top-level imports of run.py"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import run"],
+        capture_output=True, text=True,
+    )
+    imports = []
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports are not indented
+        if not name.startswith("  "):
+            imports.append({"module": name.strip(), "cumulative_ms": round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda entry: entry["cumulative_ms"], reverse=True)[:limit]
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median": round(statistics.median(samples), 1),
+        "min": round(min(samples), 1),
+        "max": round(max(samples), 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure run.py time to ready-to-serve")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--port", type=int, default=5098)
+    parser.add_argument("--eager", action="store_true", help="Also measure with MCP servers started before serving")
+    parser.add_argument("--importtime", action="store_true", help="List the slowest imports of run.py")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "runs": args.runs, "ready_ms": {}}
+    modes = {"lazy_servers": True}
+    if args.eager:
+        modes["eager_servers"] = False
+    for mode, lazy in modes.items():
+        # One untimed start, so that every mode runs with warm file system caches
+        await time_to_ready(args.port, lazy)
+        report["ready_ms"][mode] = summarize([await time_to_ready(args.port, lazy) for _ in range(args.runs)])
+
+    if args.importtime:
+        report["slowest_imports"] = slowest_imports(15)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,302 @@
+"""
+Local stand-ins for the LLM providers and the Google APIs, used to benchmark the
+client offline.
+
+Serves OpenAI, Azure OpenAI and Gemini chat completions plus the Gmail, Calendar,
+OAuth2 token and userinfo endpoints the MCP-GSUITE server calls, each with a
+configurable latency. Point the client and the server at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:5100/v1
+    GEMINI_BASE_URL=http://127.0.0.1:5100/v1beta
+    GSUITE_API_ENDPOINT=http://127.0.0.1:5100
+
+and pass http://127.0.0.1:5100 as the Azure endpoint in client_details.
+
+The LLM stubs follow the client's flow: the tool selection prompt gets a
+<selected_tools> answer, the agent loop gets one tool call and, once a tool
+result is in the history, a final text answer.
+
+    python benchmarks/stubs.py --port 5100 --llm-latency-ms 300 --google-latency-ms 80
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+# Tool the LLM stub asks for, and its arguments
+DEFAULT_TOOL = "query_gmail_emails"
+DEFAULT_TOOL_ARGS = {"query": "is:unread", "max_results": 10}
+
+FINAL_ANSWER = "Here is a summary of the requested data."
+
+
+class StubSettings:
+    def __init__(self, llm_latency_ms: float, google_latency_ms: float, jitter: float,
+                 tool: str, tool_args: Dict[str, Any], messages: int):
+        self.llm_latency_ms = llm_latency_ms
+        self.google_latency_ms = google_latency_ms
+        self.jitter = jitter
+        self.tool = tool
+        self.tool_args = tool_args
+        self.messages = messages
+
+
+async def _delay(latency_ms: float, jitter: float):
+    """Sleep for the configured latency, spread by +/- jitter (a fraction of the latency)"""
+    if latency_ms <= 0:
+        return
+    spread = latency_ms * jitter
+    await asyncio.sleep(max(0.0, latency_ms + random.uniform(-spread, spread)) / 1000)
+
+
+def _usage(messages: List[Any]) -> Dict[str, int]:
+    # Rough token counts, enough for the client's token accounting
+    prompt_tokens = len(json.dumps(messages)) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20}
+
+
+def _is_tool_selection(system_prompt: str) -> bool:
+    return "<selected_tools>" in system_prompt
+
+
+def _has_tool_result(history: List[Dict[str, Any]]) -> bool:
+    for message in history:
+        if message.get("role") == "tool":
+            return True
+        if any("functionResponse" in part for part in message.get("parts", [])):
+            return True
+        content = message.get("content")
+        if isinstance(content, str) and content.startswith("Executed tool:"):
+            return True
+    return False
+
+
+def _selected_tool(tools: List[Dict[str, Any]], wanted: str) -> Optional[str]:
+    names = [tool.get("function", {}).get("name") for tool in tools]
+    if wanted in names:
+        return wanted
+    return names[0] if names else None
+
+
+# ----------------------------------------------------------------- LLM providers
+
+async def chat_completions(request: web.Request) -> web.Response:
+    """OpenAI and Azure OpenAI chat completions"""
+    settings: StubSettings = request.app["settings"]
+    body = await request.json()
+    await _delay(settings.llm_latency_ms, settings.jitter)
+
+    messages = body.get("messages", [])
+    tools = body.get("tools") or []
+    system_prompt = messages[0].get("content", "") if messages else ""
+
+    message: Dict[str, Any] = {"role": "assistant", "content": FINAL_ANSWER}
+    if _is_tool_selection(system_prompt):
+        message["content"] = f"<function_call>TRUE</function_call>\n<selected_tools>{settings.tool}</selected_tools>"
+    elif tools and not _has_tool_result(messages[1:]):
+        name = _selected_tool(tools, settings.tool)
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(settings.tool_args)},
+            }],
+        }
+
+    return web.json_response({
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+        "usage": _usage(messages),
+    })
+
+
+async def gemini_generate_content(request: web.Request) -> web.Response:
+    """Gemini generateContent, served under /v1beta/models/{model}:generateContent"""
+    settings: StubSettings = request.app["settings"]
+    body = await request.json()
+    await _delay(settings.llm_latency_ms, settings.jitter)
+
+    system_prompt = "".join(part.get("text", "") for part in body.get("system_instruction", {}).get("parts", []))
+    contents = body.get("contents", [])
+    declarations = [d for tool in body.get("tools", []) for d in tool.get("functionDeclarations", [])]
+    # Like Gemini, function calls and responses in the history need the declarations they refer to
+    function_parts = any("functionCall" in part or "functionResponse" in part
+                         for content in contents for part in content.get("parts", []))
+    if function_parts and not declarations:
+        return web.json_response({"error": {"code": 400, "status": "INVALID_ARGUMENT",
+                                            "message": "Function calls and responses need function declarations"}}, status=400)
+
+    parts: List[Dict[str, Any]] = [{"text": FINAL_ANSWER}]
+    if _is_tool_selection(system_prompt):
+        parts = [{"text": f"<function_call>TRUE</function_call>\n<selected_tools>{settings.tool}</selected_tools>"}]
+    elif declarations and not _has_tool_result(contents):
+        names = [d.get("name") for d in declarations]
+        name = settings.tool if settings.tool in names else names[0]
+        parts = [{"functionCall": {"name": name, "args": settings.tool_args}}]
+
+    prompt_tokens = len(json.dumps(contents)) // 4
+    return web.json_response({
+        "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": 20, "totalTokenCount": prompt_tokens + 20},
+    })
+
+
+# ----------------------------------------------------------------- Google APIs
+
+def _message(message_id: str, fmt: str = "full") -> Dict[str, Any]:
+    body = base64.urlsafe_b64encode(f"Body of message {message_id}. ".encode() * 20).decode()
+    headers = [
+        {"name": "Subject", "value": f"Stub message {message_id}"},
+        {"name": "From", "value": "sender@example.com"},
+        {"name": "To", "value": "me@example.com"},
+        {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+        {"name": "Message-ID", "value": f"<{message_id}@example.com>"},
+    ]
+    message = {
+        "id": message_id,
+        "threadId": f"t{message_id}",
+        "labelIds": ["INBOX", "UNREAD"],
+        "snippet": f"Body of message {message_id}.",
+        "historyId": "1000",
+        "internalDate": "1704103200000",
+        "sizeEstimate": 2048,
+        "payload": {"mimeType": "text/plain", "headers": headers, "body": {"size": len(body), "data": body}},
+    }
+    if fmt in ("metadata", "minimal"):
+        message["payload"].pop("body")
+    return message
+
+
+async def gmail_list_messages(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await _delay(settings.google_latency_ms, settings.jitter)
+    count = min(int(request.query.get("maxResults", settings.messages)), settings.messages)
+    messages = [{"id": f"m{i:05d}", "threadId": f"tm{i:05d}"} for i in range(count)]
+    return web.json_response({"messages": messages, "resultSizeEstimate": count})
+
+
+async def gmail_get_message(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response(_message(request.match_info["message_id"], request.query.get("format", "full")))
+
+
+async def gmail_send_message(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await request.read()
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response({"id": f"s{uuid.uuid4().hex[:12]}", "threadId": f"t{uuid.uuid4().hex[:12]}", "labelIds": ["SENT"]})
+
+
+async def gmail_create_draft(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await request.read()
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response({"id": f"d{uuid.uuid4().hex[:12]}", "message": {"id": f"s{uuid.uuid4().hex[:12]}"}})
+
+
+async def calendar_list(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response({"items": [
+        {"id": "primary", "summary": "me@example.com", "primary": True, "timeZone": "UTC", "accessRole": "owner"},
+        {"id": "team@example.com", "summary": "Team", "timeZone": "UTC", "accessRole": "reader"},
+    ]})
+
+
+async def calendar_list_events(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await _delay(settings.google_latency_ms, settings.jitter)
+    count = min(int(request.query.get("maxResults", settings.messages)), settings.messages)
+    events = [{
+        "id": f"e{i:05d}",
+        "summary": f"Stub event {i}",
+        "start": {"dateTime": "2024-01-01T10:00:00Z"},
+        "end": {"dateTime": "2024-01-01T11:00:00Z"},
+        "status": "confirmed",
+    } for i in range(count)]
+    return web.json_response({"items": events})
+
+
+async def calendar_insert_event(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    event = await request.json()
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response({**event, "id": f"e{uuid.uuid4().hex[:12]}", "status": "confirmed", "htmlLink": "https://calendar.example.com"})
+
+
+async def oauth_token(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await request.read()
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response({"access_token": f"stub-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"})
+
+
+async def oauth_userinfo(request: web.Request) -> web.Response:
+    settings: StubSettings = request.app["settings"]
+    await _delay(settings.google_latency_ms, settings.jitter)
+    return web.json_response({"id": "1", "email": "me@example.com", "verified_email": True})
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def create_app(settings: StubSettings) -> web.Application:
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    app["settings"] = settings
+    app.router.add_get("/", health)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/openai/deployments/{deployment}/chat/completions", chat_completions)
+    app.router.add_post("/v1beta/models/{model}:generateContent", gemini_generate_content)
+    app.router.add_get("/gmail/v1/users/{user_id}/messages", gmail_list_messages)
+    app.router.add_get("/gmail/v1/users/{user_id}/messages/{message_id}", gmail_get_message)
+    app.router.add_post("/gmail/v1/users/{user_id}/messages/send", gmail_send_message)
+    app.router.add_post("/upload/gmail/v1/users/{user_id}/messages/send", gmail_send_message)
+    app.router.add_post("/gmail/v1/users/{user_id}/drafts", gmail_create_draft)
+    app.router.add_post("/upload/gmail/v1/users/{user_id}/drafts", gmail_create_draft)
+    app.router.add_get("/calendar/v3/users/me/calendarList", calendar_list)
+    app.router.add_get("/calendar/v3/calendars/{calendar_id}/events", calendar_list_events)
+    app.router.add_post("/calendar/v3/calendars/{calendar_id}/events", calendar_insert_event)
+    app.router.add_post("/token", oauth_token)
+    app.router.add_get("/oauth2/v2/userinfo", oauth_userinfo)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub LLM and Google API backends for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--google-latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency spread as a fraction of the latency")
+    parser.add_argument("--tool", default=DEFAULT_TOOL, help="Tool the LLM stub calls")
+    parser.add_argument("--tool-args", default=json.dumps(DEFAULT_TOOL_ARGS), help="JSON arguments of the tool call")
+    parser.add_argument("--messages", type=int, default=10, help="Messages and events returned by list calls")
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        llm_latency_ms=args.llm_latency_ms,
+        google_latency_ms=args.google_latency_ms,
+        jitter=args.jitter,
+        tool=args.tool,
+        tool_args=json.loads(args.tool_args),
+        messages=args.messages,
+    )
+    web.run_app(create_app(settings), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare tokens and agent loop iterations per task with native tool messages
+and with tool results sent as text.
+
+Runs a fixed suite of Gmail and Calendar tasks through /api/v1/mcp/process_message,
+once with MCP_CLIENT_NATIVE_TOOL_MESSAGES=true (OpenAI tool messages, Gemini
+functionCall/functionResponse parts) and once with it off ("Executed tool: ..."
+text), and reports per task the LLM calls, tool calls and tokens used.
+
+By default the LLM and Google APIs are the local stubs (benchmarks/stubs.py),
+which always answer after one tool call: use them to check the suite runs.
+Numbers that say something about the protocols need a real model, with --live:
+
+    python benchmarks/tool_scenarios.py --clients openai,gemini
+    OPENAI_API_KEY=... GSUITE_CREDENTIALS=creds.json python benchmarks/tool_scenarios.py --live --clients openai
+
+With --live the API keys are read from OPENAI_API_KEY, GEMINI_API_KEY and
+AZURE_OPENAI_API_KEY (with AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_DEPLOYMENT),
+and the MCP-GSUITE credentials from the JSON file in GSUITE_CREDENTIALS. Run it
+from mcp_servers/python/clients.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+import aiohttp
+
+from load_test import start_server, stop_server, wait_until_ready
+from run_benchmark import build_payload, start_stubs
+
+# Tasks that take one or more tool calls, the same for every run
+SCENARIOS = [
+    "Show my five most recent unread emails",
+    "Find the latest email from my manager and summarize it",
+    "What meetings do I have tomorrow?",
+    "Find emails about the quarterly report and draft a short reply to the most recent one",
+    "List my calendars, then show the events of the primary calendar for next week",
+    "Search my inbox for invoices from last month and tell me the total amount",
+]
+
+MODES = {"native": "true", "text": "false"}
+
+
+def live_payload(client: str) -> Dict[str, Any]:
+    """build_payload, with the real credentials from the environment"""
+    payload = build_payload(client, "")
+    details = payload["client_details"]
+    if client == "openai":
+        details["api_key"] = os.environ["OPENAI_API_KEY"]
+    elif client == "gemini":
+        details["api_key"] = os.environ["GEMINI_API_KEY"]
+    else:
+        details.update({
+            "api_key": os.environ["AZURE_OPENAI_API_KEY"],
+            "endpoint": os.environ["AZURE_OPENAI_ENDPOINT"],
+            "deployment_id": os.environ["AZURE_OPENAI_DEPLOYMENT"],
+        })
+    with open(os.environ["GSUITE_CREDENTIALS"]) as f:
+        payload["selected_server_credentials"] = {"MCP-GSUITE": json.load(f)}
+    return payload
+
+
+async def run_scenario(session: aiohttp.ClientSession, url: str, payload: Dict[str, Any], task: str) -> Dict[str, Any]:
+    payload = json.loads(json.dumps(payload))
+    payload["client_details"]["input"] = task
+    async with session.post(url, json=payload) as resp:
+        body = await resp.json()
+    data = body.get("Data") or {}
+    return {
+        "task": task,
+        "ok": bool(body.get("Status")),
+        "llm_calls": data.get("total_llm_calls", 0),
+        "tool_calls": len(data.get("executed_tool_calls", [])),
+        "input_tokens": data.get("total_input_tokens", 0),
+        "total_tokens": data.get("total_tokens", 0),
+    }
+
+
+def totals(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "tasks": len(runs),
+        "failed": sum(1 for run in runs if not run["ok"]),
+        **{key: sum(run[key] for run in runs) for key in ("llm_calls", "tool_calls", "input_tokens", "total_tokens")},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare native tool messages with text tool results on a fixed task suite")
+    parser.add_argument("--clients", default="openai", help="Comma separated, any of openai,azure,gemini")
+    parser.add_argument("--live", action="store_true", help="Use the real LLM and Google APIs instead of the stubs")
+    parser.add_argument("--port", type=int, default=5099, help="Port used for run.py")
+    parser.add_argument("--stub-port", type=int, default=5100)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per task timeout in seconds")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    # Used by start_stubs
+    args.llm_latency_ms, args.google_latency_ms, args.messages = 0.0, 0.0, 10
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {"MCP_CLIENT_LOG_LEVEL": "WARNING"}
+    if not args.live:
+        env.update({"OPENAI_BASE_URL": f"{stub_url}/v1", "GEMINI_BASE_URL": f"{stub_url}/v1beta", "GSUITE_API_ENDPOINT": stub_url})
+
+    report: Dict[str, Any] = {"live": args.live, "results": []}
+    stubs = None if args.live else start_stubs(args)
+    try:
+        if stubs is not None:
+            await wait_until_ready(stub_url)
+        for mode, native in MODES.items():
+            server = start_server(1, args.port, {**env, "MCP_CLIENT_NATIVE_TOOL_MESSAGES": native})
+            try:
+                await wait_until_ready(base_url)
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+                    for client in args.clients.split(","):
+                        payload = live_payload(client) if args.live else build_payload(client, stub_url)
+                        runs = [await run_scenario(session, f"{base_url}/api/v1/mcp/process_message", payload, task) for task in SCENARIOS]
+                        result = {"client": client, "mode": mode, "totals": totals(runs), "tasks": runs}
+                        print(json.dumps({"client": client, "mode": mode, **result["totals"]}), file=sys.stderr)
+                        report["results"].append(result)
+            finally:
+                stop_server(server)
+    finally:
+        if stubs is not None:
+            stop_server(stubs)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
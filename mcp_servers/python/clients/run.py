@@ -1,4 +1,4 @@
-from quart import Quart, request, jsonify, make_response, Response
+from quart import Quart, request, jsonify, make_response, Response, g
 import json
 import asyncio
 import sys
@@ -6,27 +6,32 @@ import os
 import logging
 import time
 from typing import Optional, Dict, Any
-import pandas as pd
 from asyncio import Lock
 from hypercorn.asyncio import serve
 from hypercorn.config import Config
 from contextlib import AsyncExitStack
-from src.llm.azureopenai import azure_openai_processor
-from src.server_connection import initialize_all_mcp, MCPServers
+from src.server_connection import initialize_all_mcp, shutdown_lazy_mcp, MCPServers
+from src.client_and_server_config import DeploymentConfig
+from src.timing import start_request_timings, span
+from src.admission import admit, AdmissionRejected
+from src.metrics import (
+    REGISTRY,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    clear_snapshots as clear_metrics_snapshots,
+    REQUESTS,
+    REQUEST_DURATION,
+    STREAM_DURATION,
+    SSE_STREAMS_OPEN,
+    SSE_QUEUE_DEPTH,
+    REQUESTS_ABANDONED,
+)
 from src.client_and_server_validation import client_and_server_validation
 from src.client_and_server_execution import client_and_server_execution
-import logging
+from src.logging_config import setup_logging, log_sampled
 
 
-# Configure clean logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure non-blocking logging
+setup_logging()
 logger = logging.getLogger('api')
 
 app = Quart(__name__)
@@ -41,38 +46,81 @@ async def log_request_start():
 async def log_request_complete(response):
     request_time = time.time() - request.start_time
     logger.info(f"{request.method} {request.path} - {response.status_code} - {request_time:.3f}s")
+
+    # Label by route rule rather than raw path to keep the metric cardinality bounded
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if endpoint != "/metrics":
+        client = g.get("selected_client") or "none"
+        REQUESTS.inc(endpoint, client, str(response.status_code))
+        REQUEST_DURATION.observe(request_time, endpoint, client)
     return response
 
 app.mcp_exit_stack = None
+app.metrics_task = None
+
+
+async def share_metrics():
+    """Write this worker's metrics to the shared metrics directory, periodically"""
+    while True:
+        await asyncio.sleep(DeploymentConfig["metrics_flush_interval"])
+        try:
+            REGISTRY.write_snapshot(DeploymentConfig["metrics_dir"])
+        except OSError as err:
+            logger.warning(f"Could not write metrics snapshot: {err}")
+
+
 # Initialize the clients when the app starts
 @app.before_serving
 async def startup():
+    if DeploymentConfig["metrics_dir"]:
+        app.metrics_task = asyncio.create_task(share_metrics())
+
+    if DeploymentConfig["lazy_server_startup"]:
+        logger.info("Worker ready, MCP servers will be started on first use", extra={"pid": os.getpid()})
+        return
+
     try:
         app.mcp_exit_stack = AsyncExitStack()
         await app.mcp_exit_stack.__aenter__()
-        print("\n✅ MCP servers initialization started.")
+        logger.info("MCP servers initialization started")
         success = await initialize_all_mcp(app.mcp_exit_stack)
         if success: 
-            print(f"\nAvailable servers: {list(MCPServers.keys())}")
-            print("\n✅ MCP servers initialized successfully.\n")
+            logger.info("MCP servers initialized successfully", extra={"servers": list(MCPServers.keys())})
         else:
-            print("\n❌ Failed to initialize MCP clients.")
+            logger.error("Failed to initialize MCP clients")
         
     except Exception as err:
-        print(f"Error initializing MCP clients =========>>>> {err}")
+        logger.error(f"Error initializing MCP clients: {err}")
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    if DeploymentConfig["metrics_dir"]:
+        # Every worker's metrics, whichever worker answers the scrape. On the event loop thread,
+        # which is the only one updating the metrics, the files are small.
+        return Response(REGISTRY.render_shared(DeploymentConfig["metrics_dir"]), content_type=METRICS_CONTENT_TYPE)
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
 
 
 @app.route("/api/v1/mcp/process_message", methods=["POST"])
 async def process_message():
+    admission = None
     try:
         data = await request.get_json()
+        timings = start_request_timings()
+        g.selected_client = data.get("selected_client") if isinstance(data, dict) else None
+
+        # Wait for a slot, or turn the request away if too many are already waiting
+        with span("admission"):
+            admission = await admit("process_message", g.selected_client)
         
         # Set streaming to false
         if "client_details" in data:
             data["client_details"]["is_stream"] = False
         
         # Validation check
-        validation_result = await client_and_server_validation(data, {"streamCallbacks": None, "is_stream": False})
+        with span("validation"):
+            validation_result = await client_and_server_validation(data, {"streamCallbacks": None, "is_stream": False})
         if not validation_result["status"]:
             return jsonify({
                 "Data": None,
@@ -80,30 +128,48 @@ async def process_message():
                 "Status": False
             }), 200
             
-        print(f"\n✅ Validation Successful")
-        # print(validation_result)
-        print(f"\n✅ Execution Started")
+        logger.debug("Validation successful, execution started", extra={"request_id": timings.request_id})
         
         # Execution
         generated_payload = validation_result["payload"]
         execution_response = await client_and_server_execution(generated_payload, {"streamCallbacks": None, "is_stream": False})
         
-        print(f"\n✅ Execution Completed")
+        logger.debug("Execution completed", extra={"request_id": timings.request_id})
+        execution_response.Data["timings"] = timings.to_dict()
         response_dict = {
             "Data": execution_response.Data,
             "Error": execution_response.Error,
             "Status": execution_response.Status
         }
         return jsonify(response_dict), 200
+
+    except AdmissionRejected as rejected:
+        return admission_rejected_response(rejected)
+
+    except asyncio.CancelledError:
+        # Quart cancels the handler when the client disconnects, in-flight MCP calls send notifications/cancelled
+        REQUESTS_ABANDONED.inc("/api/v1/mcp/process_message", g.get("selected_client") or "none")
+        raise
     
     except Exception as error:
-        print(f"Error ========>>>>> {error}")
+        logger.error(f"Error processing message: {error}")
         return jsonify({
             "Data": None,
             "Error": str(error),
             "Status": False
         }), 500
 
+    finally:
+        if admission is not None:
+            admission.release()
+
+
+def admission_rejected_response(rejected: AdmissionRejected, **fields):
+    """Fast 503/429 answer to a request turned away by admission control"""
+    logger.warning(f"Request rejected by the {rejected.scope} limit of {rejected.name}: {rejected.reason}")
+    body = {"Data": None, "Error": str(rejected), "Status": False, **fields}
+    return jsonify(body), rejected.status, {"Retry-After": str(rejected.retry_after)}
+
 
 class CustomStreamHandler:
     def __init__(self, response_queue: asyncio.Queue):
@@ -127,26 +193,42 @@ class CustomStreamHandler:
     
     async def on_error(self, error: Exception):
         """Send error message and end the stream"""
-        print(f"Streaming Error: {error}")
+        logger.error(f"Streaming error: {error}")
         error_data = {"error": str(error)}
         await self.response_queue.put(f"data: {json.dumps(error_data)}\n\n")
         await self.response_queue.put(None)  # Signal end of stream
 
-async def stream_generator(response_queue: asyncio.Queue):
-    """Generator function for streaming responses"""
-    while True:
-        try:
-            # Wait for data with a timeout to prevent hanging
-            data = await asyncio.wait_for(response_queue.get(), timeout=30.0)
-            if data is None:  # End of stream signal
+# Queues of the SSE streams currently open, sampled by the queue depth gauge at scrape time
+open_stream_queues = set()
+SSE_QUEUE_DEPTH.set_function(lambda: {(): sum(q.qsize() for q in open_stream_queues)})
+
+async def stream_generator(response_queue: asyncio.Queue, selected_client: Optional[str] = None, task: Optional[asyncio.Task] = None):
+    """Generator function for streaming responses, cancels the task producing them when the stream ends early"""
+    started = time.perf_counter()
+    open_stream_queues.add(response_queue)
+    SSE_STREAMS_OPEN.inc()
+    try:
+        while True:
+            try:
+                # Wait for data with a timeout to prevent hanging
+                data = await asyncio.wait_for(response_queue.get(), timeout=30.0)
+                if data is None:  # End of stream signal
+                    break
+                yield data
+            except asyncio.TimeoutError:
+                # Send keepalive or break on timeout
+                break
+            except Exception as e:
+                logger.error(f"Stream generator error: {e}")
                 break
-            yield data
-        except asyncio.TimeoutError:
-            # Send keepalive or break on timeout
-            break
-        except Exception as e:
-            print(f"Stream generator error: {e}")
-            break
+    finally:
+        if task is not None and not task.done():
+            # The client disconnected or the stream timed out, nobody will read the rest
+            task.cancel()
+            REQUESTS_ABANDONED.inc("/api/v1/mcp/process_message_stream", selected_client or "none")
+        open_stream_queues.discard(response_queue)
+        SSE_STREAMS_OPEN.dec()
+        STREAM_DURATION.observe(time.perf_counter() - started, selected_client or "none")
 
 @app.route('/api/v1/mcp/process_message_stream', methods=['POST'])
 async def process_message_stream():
@@ -159,6 +241,7 @@ async def process_message_stream():
         data = await request.get_json()
         if not data:
             data = {}
+        g.selected_client = data.get("selected_client")
         
         # Modify client details
         if 'client_details' not in data:
@@ -167,6 +250,7 @@ async def process_message_stream():
         
         # Start streaming response
         async def generate_response():
+            timings = start_request_timings()
             try:
                 # Send initial status
                 start_data = {
@@ -179,7 +263,8 @@ async def process_message_stream():
                 await custom_stream_handler.on_data(json.dumps(start_data))
                 
                 # =========================================== validation check start =============================================================
-                validation_result = await client_and_server_validation(data, {"streamCallbacks": custom_stream_handler, "is_stream": True})
+                with span("validation"):
+                    validation_result = await client_and_server_validation(data, {"streamCallbacks": custom_stream_handler, "is_stream": True})
                 
                 if not validation_result.get('status', False):
                     error_data = {
@@ -197,8 +282,9 @@ async def process_message_stream():
                 # =========================================== execution start ====================================================================
                 generated_payload = validation_result.get('payload')
                 execution_response = await client_and_server_execution(generated_payload, {"streamCallbacks": custom_stream_handler, "is_stream": True})
+                execution_response.Data["timings"] = timings.to_dict()
                 # =========================================== execution end ======================================================================
-                print(f"\n✅ ------------------------" , execution_response.Data)
+                log_sampled(logger, "Stream execution result", execution_response.Data, request_id=timings.request_id)
                 if not execution_response.Status:
                     error_data = {
                         "Data": execution_response.Data,
@@ -223,7 +309,7 @@ async def process_message_stream():
                 await custom_stream_handler.on_end()
                 
             except Exception as error:
-                print(f"Error ========>>>>> {error}")
+                logger.error(f"Error processing message stream: {error}")
                 error_data = {
                     "Data": None,
                     "Error": str(error),
@@ -234,12 +320,14 @@ async def process_message_stream():
                 await custom_stream_handler.on_data(json.dumps(error_data))
                 await custom_stream_handler.on_end()
         
-        # Start the response generation in the background
-        asyncio.create_task(generate_response())
+        # Start the response generation in the background once admitted, it holds the slot until done
+        admission = await admit("process_message_stream", g.selected_client)
+        task = asyncio.create_task(generate_response())
+        task.add_done_callback(lambda _: admission.release())
         
         # Return streaming response
         return Response(
-            stream_generator(response_queue),
+            stream_generator(response_queue, data.get("selected_client"), task),
             mimetype='text/event-stream',
             headers={
                 'Cache-Control': 'no-cache',
@@ -248,9 +336,12 @@ async def process_message_stream():
                 'Access-Control-Allow-Headers': 'Content-Type'
             }
         )
+
+    except AdmissionRejected as rejected:
+        return admission_rejected_response(rejected, StreamingStatus="ERROR", Action="ERROR")
         
     except Exception as error:
-        print(f"Error ========>>>>> {error}")
+        logger.error(f"Error processing message: {error}")
         
         # Send error response immediately
         error_data = {
@@ -276,16 +367,25 @@ async def process_message_stream():
 
 @app.after_serving
 async def shutdown():
+    if app.metrics_task:
+        app.metrics_task.cancel()
+        # Keep this worker's final counts in the totals
+        REGISTRY.write_snapshot(DeploymentConfig["metrics_dir"])
+    await shutdown_lazy_mcp()
+    # Imported here, the provider modules are only loaded on first use
+    from src.llm.http_client import close_session
+    await close_session()
     if app.mcp_exit_stack:
         await app.mcp_exit_stack.__aexit__(None, None, None)
         app.mcp_exit_stack = None
-        print("\n✅ MCP servers cleaned up on shutdown.\n")
+        logger.info("MCP servers cleaned up on shutdown")
     
 if __name__ == "__main__":
     # Create a config instance
     config = Config()
     # Configure bind address and port 
-    config.bind = [f"0.0.0.0:5001"]
+    config.bind = [DeploymentConfig["bind"]]
+    config.graceful_timeout = DeploymentConfig["graceful_timeout"]
 
     # Print welcome banner
     print("╔═══════════════════════════════════════════════════════════════════════════════════════════╗")
@@ -294,9 +394,21 @@ if __name__ == "__main__":
     print("║                                                                                           ║")
     print("║  🎉 Welcome to the MCP(Model Context Protocol) Server Integration Hackathon 2k25 !! 🎉    ║")
     print("║                                                                                           ║")
-    print("║  ✅ Server running on http://0.0.0.0:5001 ✅                                              ║")
+    print(f"║  ✅ Server running on http://{DeploymentConfig['bind'] + ' ✅':<60}║")
     print("║                                                                                           ║") 
     print("╚═══════════════════════════════════════════════════════════════════════════════════════════╝")
 
+    if DeploymentConfig["workers"] > 1 or DeploymentConfig["reload"]:
+        # Multi-worker mode: hypercorn spawns the worker processes, each importing this module
+        from hypercorn.run import run as run_workers
+
+        config.application_path = "run:app"
+        if DeploymentConfig["metrics_dir"]:
+            clear_metrics_snapshots(DeploymentConfig["metrics_dir"])
+        config.workers = DeploymentConfig["workers"]
+        config.use_reloader = DeploymentConfig["reload"]
+        logger.info(f"Starting {config.workers} worker(s) on {DeploymentConfig['bind']}")
+        sys.exit(run_workers(config))
+
     # Start the Quart app
     asyncio.run(serve(app, config))
\ No newline at end of file
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from src.client_and_server_config import AdmissionConfig
+from src.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_WAIT
+
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of admitting a request, to be answered with status and a Retry-After header"""
+
+    def __init__(self, limiter: "Limiter", reason: str):
+        super().__init__(f"Too many concurrent requests for {limiter.scope} {limiter.name}, please retry later")
+        self.scope = limiter.scope
+        self.name = limiter.name
+        self.reason = reason
+        # Overload of the whole endpoint is the server's, a selected_client over its own limit is the caller's
+        self.status = 503 if limiter.scope == "endpoint" else 429
+        self.retry_after = AdmissionConfig["retry_after_seconds"]
+
+
+class Limiter:
+    """At most max_concurrent requests at a time, with up to max_queue more waiting in FIFO order"""
+
+    def __init__(self, scope: str, name: str, max_concurrent: int, max_queue: int):
+        self.scope = scope
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: deque = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float):
+        """Take a slot, waiting for one up to timeout seconds. Raises AdmissionRejected."""
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED.inc(self.scope, self.name, QUEUE_FULL)
+            raise AdmissionRejected(self, QUEUE_FULL)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as err:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended, pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(err, asyncio.TimeoutError):
+                ADMISSION_REJECTED.inc(self.scope, self.name, QUEUE_TIMEOUT)
+                raise AdmissionRejected(self, QUEUE_TIMEOUT) from None
+            raise
+
+    def release(self):
+        """Give the slot to the longest waiting request, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+_limiters: Dict[tuple, Limiter] = {}
+
+
+def _limiter(scope: str, name: str, limits: Optional[Dict[str, int]]) -> Optional[Limiter]:
+    if not limits or limits.get("max_concurrent", 0) <= 0:
+        return None
+    limiter = _limiters.get((scope, name))
+    if limiter is None:
+        limiter = _limiters[(scope, name)] = Limiter(scope, name, limits["max_concurrent"], limits.get("max_queue", 0))
+    return limiter
+
+
+class Admission:
+    """Slots held by an admitted request, to be released once when it is done"""
+
+    def __init__(self):
+        self.limiters: List[Limiter] = []
+
+    def release(self):
+        while self.limiters:
+            self.limiters.pop().release()
+
+
+async def admit(endpoint: str, selected_client: Optional[str]) -> Admission:
+    """Admit a request to an endpoint, waiting for a slot of the selected_client's and the endpoint's limit.
+
+    The selected_client's slot is taken first, so requests queued behind their
+    own client's limit do not hold endpoint slots other clients could use.
+    Raises AdmissionRejected when a queue is full or the wait times out.
+    """
+    admission = Admission()
+    if not AdmissionConfig["enabled"]:
+        return admission
+
+    limiters = [
+        # Unknown clients fail validation, they get no limiter of their own
+        _limiter("client", selected_client, AdmissionConfig["clients"].get(selected_client)) if isinstance(selected_client, str) else None,
+        _limiter("endpoint", endpoint, AdmissionConfig["endpoints"].get(endpoint)),
+    ]
+    started = time.perf_counter()
+    deadline = time.monotonic() + AdmissionConfig["queue_timeout_seconds"]
+    try:
+        for limiter in limiters:
+            if limiter is not None:
+                await limiter.acquire(max(deadline - time.monotonic(), 0))
+                admission.limiters.append(limiter)
+    except BaseException:
+        admission.release()
+        raise
+    ADMISSION_WAIT.observe(time.perf_counter() - started, endpoint)
+    return admission
+
+
+def _limiter_values(attribute: str) -> Dict[tuple, float]:
+    return {key: getattr(limiter, attribute) for key, limiter in _limiters.items()}
+
+
+ADMISSION_IN_FLIGHT.set_function(lambda: _limiter_values("in_flight"))
+ADMISSION_QUEUED.set_function(lambda: _limiter_values("queued"))
@@ -0,0 +1,99 @@
+import logging
+import math
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from src.client_and_server_config import RequestBudgetConfig
+
+logger = logging.getLogger(__name__)
+
+# Reasons a request stopped before the model gave its final answer
+DEADLINE = "deadline"
+MAX_ITERATIONS = "max_iterations"
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of starting an LLM or tool call once the request's budget is used up"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request budget exhausted: {reason}")
+        self.reason = reason
+
+
+class RequestBudget:
+    """Deadline and agent loop iteration budget of one request.
+
+    Every LLM and tool call gets a timeout cut to the time left, and no call is
+    started once the deadline has passed or the loop ran out of iterations.
+    """
+
+    def __init__(self, timeout_seconds: float, max_iterations: int):
+        self.deadline = time.monotonic() + timeout_seconds
+        self.max_iterations = max_iterations
+        self.iterations = 0
+        self.stopped_reason: Optional[str] = None
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        if self.stopped_reason is None and self.remaining() <= 0:
+            self.stopped_reason = DEADLINE
+        return self.stopped_reason is not None
+
+    def timeout(self, limit: float) -> float:
+        """Timeout for one call, limit cut to the time left"""
+        if self.expired():
+            raise BudgetExhausted(self.stopped_reason)
+        return min(limit, self.remaining())
+
+    def next_iteration(self) -> bool:
+        """Count an agent loop iteration, False once the budget does not allow another one"""
+        if self.expired():
+            return False
+        if self.iterations >= self.max_iterations:
+            self.stopped_reason = MAX_ITERATIONS
+            return False
+        self.iterations += 1
+        return True
+
+
+_current_budget: ContextVar[Optional[RequestBudget]] = ContextVar("request_budget", default=None)
+
+
+def _lowered_limit(client_details: Dict[str, Any], key: str, configured: float, cast: Callable[[Any], float]) -> float:
+    """The caller's value for a limit if it is a number above 0 and below the configured one"""
+    value = client_details.get(key)
+    if value is None:
+        return configured
+    try:
+        if isinstance(value, bool):
+            raise ValueError("not a number")
+        value = cast(value)
+        if not 0 < value < math.inf:
+            raise ValueError("must be greater than 0")
+    except (TypeError, ValueError, OverflowError) as err:
+        logger.warning(f"Ignoring client_details.{key}={client_details.get(key)!r}: {err}")
+        return configured
+    return min(configured, value)
+
+
+def start_budget(client_details: Dict[str, Any]) -> RequestBudget:
+    """Start the budget of the current request. Callers can lower the configured limits
+    with timeout_seconds and max_iterations in client_details, invalid values are ignored."""
+    timeout_seconds = _lowered_limit(client_details, "timeout_seconds", RequestBudgetConfig["timeout_seconds"], float)
+    max_iterations = _lowered_limit(client_details, "max_iterations", RequestBudgetConfig["max_iterations"], int)
+    budget = RequestBudget(timeout_seconds, max_iterations)
+    _current_budget.set(budget)
+    return budget
+
+
+def current_budget() -> Optional[RequestBudget]:
+    return _current_budget.get()
+
+
+def call_timeout(limit: float) -> float:
+    """Timeout for an LLM or tool call of the current request, see RequestBudget.timeout()"""
+    budget = _current_budget.get()
+    return budget.timeout(limit) if budget is not None else limit
@@ -1,8 +1,17 @@
+import os
+
 ClientsConfig =[
     "MCP_CLIENT_AZURE_AI",
     "MCP_CLIENT_OPENAI",
 	"MCP_CLIENT_GEMINI"
 ]
+# Module and function of the LLM processor of each client. Only the processors of the
+# clients in use are imported, on first use (see get_llm_processor).
+LlmProcessorsConfig = {
+	"MCP_CLIENT_AZURE_AI": ("src.llm.azureopenai", "azure_openai_processor"),
+	"MCP_CLIENT_OPENAI": ("src.llm.openai", "openai_processor"),
+	"MCP_CLIENT_GEMINI": ("src.llm.gemini", "gemini_processor"),
+}
 ServersConfig = [
 	{
 		"server_name": "MCP-GSUITE",
@@ -12,6 +21,182 @@ ServersConfig = [
 			"../servers/MCP-GSUITE/mcp-gsuite",
 			"run",
 			"mcp-gsuite"
+		],
+		# Used instead of command and args when direct server exec is on (see DeploymentConfig). Runs the
+		# server with its own virtualenv, skipping uv's dependency resolution on every start. Needs a `uv sync` first.
+		"direct_exec": {
+			"cwd": "../servers/MCP-GSUITE/mcp-gsuite",
+			"command": ".venv/bin/python",
+			"args": ["-m", "mcp_gsuite"]
+		},
+		# Variables forwarded from the client environment to the server process when set
+		"env": [
+			"GSUITE_API_ENDPOINT",
+			"MCP_GSUITE_LOG_LEVEL",
+			"MCP_GSUITE_GMAIL_UNITS_PER_SECOND",
+			"MCP_GSUITE_GMAIL_BURST_UNITS",
+			"MCP_GSUITE_CALENDAR_REQUESTS_PER_SECOND",
+			"MCP_GSUITE_CALENDAR_BURST",
+			"MCP_GSUITE_MAX_RETRIES",
+			"MCP_GSUITE_RETRY_BASE_DELAY",
+			"MCP_GSUITE_RETRY_MAX_DELAY",
+			"MCP_GSUITE_TOKEN_REFRESH_MARGIN",
+			"MCP_GSUITE_TOKEN_REFRESH_INTERVAL",
+			"MCP_GSUITE_TOKEN_IDLE_TTL",
+			"GSUITE_DISCOVERY_DIR"
 		]
 	}
-]
\ No newline at end of file
+]
+
+# Base URLs of the LLM provider APIs. Point them at local stubs for offline benchmarks (see benchmarks/stubs.py).
+# Azure OpenAI uses the endpoint passed in client_details instead.
+LlmEndpointsConfig = {
+	"openai": os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+	"gemini": os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta"),
+}
+
+# Context windows used to check prompt sizes before sending them, see src/llm/token_estimator.py
+LlmContextConfig = {
+	# Context window in tokens by model name prefix, the longest matching prefix wins
+	"context_windows": {
+		"gpt-3.5-turbo": 16385,
+		"gpt-4": 8192,
+		"gpt-4-turbo": 128000,
+		"gpt-4o": 128000,
+		"gpt-4.1": 1047576,
+		"o1": 200000,
+		"o3": 200000,
+		"o4-mini": 200000,
+		"gemini-1.5": 1048576,
+		"gemini-2": 1048576,
+	},
+	# Used for other models, e.g. Azure deployment names
+	"default_context_window": int(os.getenv("MCP_CLIENT_LLM_CONTEXT_WINDOW", "128000")),
+	# Share of the context window kept free for estimation errors
+	"safety_margin": float(os.getenv("MCP_CLIENT_LLM_CONTEXT_MARGIN", "0.05")),
+	# Requests that leave fewer tokens than this for the reply fail without being sent
+	"min_output_tokens": int(os.getenv("MCP_CLIENT_LLM_MIN_OUTPUT_TOKENS", "256")),
+	# Token counts of message texts cached per worker
+	"estimate_cache_size": int(os.getenv("MCP_CLIENT_TOKEN_CACHE_SIZE", "8192")),
+}
+
+# Deployment settings used by run.py. Every value can be overridden from the environment.
+DeploymentConfig = {
+	# Address hypercorn binds to
+	"bind": os.getenv("MCP_CLIENT_BIND", "0.0.0.0:5001"),
+	# Number of worker processes, each worker owns its own MCP server sessions
+	"workers": int(os.getenv("MCP_CLIENT_WORKERS", "1")),
+	# Seconds in-flight requests get to finish when a worker is stopped or reloaded
+	"graceful_timeout": float(os.getenv("MCP_CLIENT_GRACEFUL_TIMEOUT", "30")),
+	# Restart workers when source files change
+	"reload": os.getenv("MCP_CLIENT_RELOAD", "false").lower() in ("1", "true", "yes"),
+	# Start MCP servers on first use instead of at startup (defaults to on when running several workers)
+	"lazy_server_startup": os.getenv(
+		"MCP_CLIENT_LAZY_SERVERS",
+		"true" if int(os.getenv("MCP_CLIENT_WORKERS", "1")) > 1 else "false"
+	).lower() in ("1", "true", "yes"),
+	# Start servers that have a direct_exec entry with their virtualenv's python instead of `uv run`
+	"direct_server_exec": os.getenv("MCP_CLIENT_DIRECT_SERVER_EXEC", "false").lower() in ("1", "true", "yes"),
+	# Reuse the tool list of servers that send tools/list_changed instead of listing the tools on every request
+	"cache_tool_lists": os.getenv("MCP_CLIENT_CACHE_TOOLS", "true").lower() in ("1", "true", "yes"),
+	# Send tool calls and results in the providers' native formats (OpenAI tool messages, Gemini functionCall and
+	# functionResponse parts) instead of as "Executed tool: ..." text
+	"native_tool_messages": os.getenv("MCP_CLIENT_NATIVE_TOOL_MESSAGES", "true").lower() in ("1", "true", "yes"),
+	# Raw provider responses returned in Data: "full" for final_llm_response and every call in llm_responses_arr,
+	# "final" for final_llm_response only, "none" to leave both out
+	"llm_response_verbosity": os.getenv("MCP_CLIENT_LLM_RESPONSE_VERBOSITY", "full").lower(),
+	# Send notifications/cancelled for MCP requests nobody waits for anymore (client disconnected, tool call timed out),
+	# so servers can stop the work
+	"cancel_abandoned_calls": os.getenv("MCP_CLIENT_CANCEL_ABANDONED_CALLS", "true").lower() in ("1", "true", "yes"),
+	# Directory the workers share their metrics through, so /metrics on any worker reports all of them
+	# (defaults to on when running several workers, empty for per-worker metrics)
+	"metrics_dir": os.getenv("MCP_CLIENT_METRICS_DIR", ".metrics" if int(os.getenv("MCP_CLIENT_WORKERS", "1")) > 1 else ""),
+	# Seconds between the writes of a worker's metrics to metrics_dir
+	"metrics_flush_interval": float(os.getenv("MCP_CLIENT_METRICS_FLUSH_INTERVAL", "5")),
+}
+
+# Concurrency limits in front of the API, see src/admission.py. Requests over a limit wait in a bounded queue,
+# and are turned away with 503 (endpoint) or 429 (selected_client) and a Retry-After header once it is full.
+# A max_concurrent of 0 leaves a limit out.
+AdmissionConfig = {
+	"enabled": os.getenv("MCP_CLIENT_ADMISSION", "true").lower() in ("1", "true", "yes"),
+	# Limits per endpoint, per worker
+	"endpoints": {
+		"process_message": {
+			"max_concurrent": int(os.getenv("MCP_CLIENT_MAX_CONCURRENT_REQUESTS", "64")),
+			"max_queue": int(os.getenv("MCP_CLIENT_MAX_QUEUED_REQUESTS", "128")),
+		},
+		"process_message_stream": {
+			"max_concurrent": int(os.getenv("MCP_CLIENT_MAX_CONCURRENT_STREAMS", "64")),
+			"max_queue": int(os.getenv("MCP_CLIENT_MAX_QUEUED_STREAMS", "128")),
+		},
+	},
+	# Limits per selected_client, shared by both endpoints, e.g. MCP_CLIENT_GEMINI_MAX_CONCURRENT
+	"clients": {
+		client: {
+			"max_concurrent": int(os.getenv(f"{client}_MAX_CONCURRENT", "0")),
+			"max_queue": int(os.getenv(f"{client}_MAX_QUEUED", "0")),
+		}
+		for client in ClientsConfig
+	},
+	# Seconds a request may wait in a queue before it is turned away
+	"queue_timeout_seconds": float(os.getenv("MCP_CLIENT_ADMISSION_QUEUE_TIMEOUT", "10")),
+	# Retry-After sent with turned away requests
+	"retry_after_seconds": int(os.getenv("MCP_CLIENT_RETRY_AFTER", "2")),
+}
+
+# Time and agent loop iterations a request may use, see src/budget.py. Callers can lower both with
+# timeout_seconds and max_iterations in client_details.
+RequestBudgetConfig = {
+	# Seconds from the start of a request's execution after which no further LLM or tool call is made
+	"timeout_seconds": float(os.getenv("MCP_CLIENT_REQUEST_TIMEOUT", "120")),
+	# LLM calls of the agent loop, after the tool selection call
+	"max_iterations": int(os.getenv("MCP_CLIENT_MAX_AGENT_ITERATIONS", "10")),
+	# Timeout of a single LLM provider request, cut to the time the request has left
+	"llm_call_timeout_seconds": float(os.getenv("MCP_CLIENT_LLM_CALL_TIMEOUT", "60")),
+	# Timeout of a single MCP tool call, cut to the time the request has left
+	"tool_call_timeout_seconds": float(os.getenv("MCP_CLIENT_TOOL_CALL_TIMEOUT", "60")),
+}
+
+# Chat histories kept by the client, see src/conversation_store.py. Requests that pass
+# client_details.conversation_id only need to send the new input, not the chat_history.
+ConversationStoreConfig = {
+	# Directory holding one file per conversation, shared by the workers
+	"directory": os.getenv("MCP_CLIENT_CONVERSATION_DIR", ".conversations"),
+	# Conversations kept in memory per worker, least recently used are evicted first
+	"max_conversations_in_memory": int(os.getenv("MCP_CLIENT_CONVERSATION_CACHE_SIZE", "1000")),
+	# Memory budget per worker for cached conversations, in bytes of JSON
+	"max_memory_bytes": int(os.getenv("MCP_CLIENT_CONVERSATION_CACHE_BYTES", str(128 * 1024 * 1024))),
+	# Messages kept per conversation, older turns are dropped
+	"max_messages": int(os.getenv("MCP_CLIENT_CONVERSATION_MAX_MESSAGES", "200")),
+	# Conversations idle for longer than this many seconds are deleted
+	"ttl_seconds": float(os.getenv("MCP_CLIENT_CONVERSATION_TTL", "86400")),
+	# How often expired conversation files are looked for
+	"purge_interval_seconds": float(os.getenv("MCP_CLIENT_CONVERSATION_PURGE_INTERVAL", "600")),
+}
+
+# Compaction of the chat history sent with each LLM call, see src/history_compaction.py.
+# The stored or caller's history is not changed, only what is sent to the provider.
+HistoryCompactionConfig = {
+	"enabled": os.getenv("MCP_CLIENT_HISTORY_COMPACTION", "true").lower() in ("1", "true", "yes"),
+	# Estimated tokens of chat history sent per LLM call, longer histories are compacted
+	"max_history_tokens": int(os.getenv("MCP_CLIENT_HISTORY_MAX_TOKENS", "8000")),
+	# Most recent turns (a user message and what followed it) whose tool results are kept in full
+	"recent_turns": int(os.getenv("MCP_CLIENT_HISTORY_RECENT_TURNS", "2")),
+	# Characters of a tool result kept in its digest
+	"digest_preview_chars": int(os.getenv("MCP_CLIENT_HISTORY_DIGEST_CHARS", "200")),
+}
+
+# Logging settings, see src/logging_config.py
+LoggingConfig = {
+	# Default level for every logger
+	"level": os.getenv("MCP_CLIENT_LOG_LEVEL", "INFO"),
+	# Per-module overrides, e.g. "src.client_and_server_execution=DEBUG,src.server_connection=WARNING"
+	"module_levels": os.getenv("MCP_CLIENT_LOG_MODULE_LEVELS", ""),
+	# "text" for human readable lines, "json" for one JSON object per line
+	"format": os.getenv("MCP_CLIENT_LOG_FORMAT", "text"),
+	# Logged payloads (tool results, LLM responses, ...) are cut to this many characters
+	"max_payload_chars": int(os.getenv("MCP_CLIENT_LOG_MAX_PAYLOAD_CHARS", "2000")),
+	# Fraction of verbose (sampled) events that are actually logged, between 0 and 1
+	"verbose_sample_rate": float(os.getenv("MCP_CLIENT_LOG_SAMPLE_RATE", "0.01")),
+}
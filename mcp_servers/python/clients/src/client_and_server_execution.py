@@ -1,12 +1,39 @@
+import asyncio
+import importlib
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
 
-# Assuming these are your imported modules/classes for MCP clients and Azure LLM calls
-from src.llm.azureopenai import azure_openai_processor  # your async LLM call function
-from src.llm.openai import openai_processor  # your async LLM call function
 from src.server_connection import MCPServers  # MCP clients dict or class with call_tool method
-from src.llm.gemini import gemini_processor 
+from src.budget import RequestBudget, call_timeout, current_budget, start_budget
+from src.client_and_server_config import ClientsConfig, DeploymentConfig, LlmProcessorsConfig, RequestBudgetConfig
+from src.conversation_store import conversation_store
+from src.history_compaction import compact_for_llm_call, start_compaction_report
+from src.llm.message_buffer import start_message_buffers
+from src.timing import span, record_server_timings, current_timings, SERVER_TIMINGS_PREFIX
+from src.metrics import (
+    LLM_CALLS, LLM_TOKENS, TOOL_CALLS, TOOL_CALL_DURATION,
+    GOOGLE_API_RATE_LIMIT_WAIT, GOOGLE_API_THROTTLED, GOOGLE_API_RETRIES, REQUESTS_STOPPED,
+    CANCELLED_TOOL_CALL_SECONDS,
+)
+from src.logging_config import log_sampled
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_llm_processor(selected_client: str) -> Callable:
+    """Import the LLM processor of a client on first use.
+
+    The provider modules pull in aiohttp and their own setup, so they are
+    only loaded for the clients that actually get requests.
+    """
+    if selected_client not in ClientsConfig:
+        raise ValueError(f"Client {selected_client} is not configured")
+    module_name, function_name = LlmProcessorsConfig[selected_client]
+    return getattr(importlib.import_module(module_name), function_name)
 
 
 class ClientAndServerExecutionResponse:
@@ -27,8 +54,65 @@ class ClientAndServerExecutionResponse:
 
 
 async def client_and_server_execution(payload: Dict[str, Any], streaming_callback: Optional[Any] = None) -> ClientAndServerExecutionResponse:
+    """Run one turn of the conversation.
+
+    When client_details carries a conversation_id the chat history is read from
+    the conversation store and the new turns are appended to it afterwards, so
+    callers only send the new input. A chat_history sent for an unknown
+    conversation seeds it.
+    """
+    compaction = start_compaction_report()
+    start_message_buffers()
+    client_details = payload.get("client_details", {})
+    budget = start_budget(client_details)
+    conversation_id = client_details.get("conversation_id")
+    if conversation_id:
+        result = await execute_conversation_turn(str(conversation_id), payload, streaming_callback)
+    else:
+        result = await execute_turn(payload, streaming_callback)
+
+    result.Data["compaction"] = compaction.to_dict()
+    # Also set when an LLM or tool call timed out at the deadline
+    if budget.stopped_reason or (not result.Status and budget.expired()):
+        if not result.Status:
+            # Whichever call hit the limit, the caller gets the partial result with the reason
+            stop_on_budget(result, budget)
+        result.Data["stopped_reason"] = budget.stopped_reason
+        REQUESTS_STOPPED.inc(payload.get("selected_client", ""), budget.stopped_reason)
+    return result
+
+
+async def execute_conversation_turn(conversation_id: str, payload: Dict[str, Any], streaming_callback: Optional[Any] = None) -> ClientAndServerExecutionResponse:
+    """execute_turn with the chat history of a stored conversation"""
+    client_details = payload.get("client_details", {})
+    async with conversation_store.lock(conversation_id):
+        with span("conversation.load"):
+            history = await conversation_store.load(conversation_id)
+        if history is None:
+            history = list(client_details.get("chat_history") or [])
+            stored_count = 0
+        else:
+            stored_count = len(history)
+        client_details["chat_history"] = history
+
+        result = await execute_turn(payload, streaming_callback)
+
+        if result.Status:
+            # execute_turn appended the user input and tool results to the history
+            new_messages = history[stored_count:] + [
+                {"role": "assistant", "content": message}
+                for message in result.Data.get("messages", []) if isinstance(message, str) and message
+            ]
+            with span("conversation.save"):
+                await conversation_store.append(conversation_id, new_messages)
+        result.Data["conversation_id"] = conversation_id
+        return result
+
+
+async def execute_turn(payload: Dict[str, Any], streaming_callback: Optional[Any] = None) -> ClientAndServerExecutionResponse:
     try:
         result = ClientAndServerExecutionResponse()
+        budget = current_budget() or start_budget(payload.get("client_details", {}))
 
         selected_server_credentials = payload.get("selected_server_credentials")
         client_details = payload.get("client_details", {})
@@ -70,9 +154,10 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
         client_details["tools"] = []
 
         if selected_client == "MCP_CLIENT_AZURE_AI":
+            azure_openai_processor = get_llm_processor(selected_client)
 
             # Initial LLM call
-            initial_llm_response = await azure_openai_processor(client_details)
+            initial_llm_response = await run_llm_call(azure_openai_processor, client_details, "llm.tool_selection")
             if not initial_llm_response.Status:
                 result.Error = initial_llm_response.Error
                 result.Status = initial_llm_response.Status
@@ -83,8 +168,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
             result.Data["total_tokens"] += initial_llm_response.Data.get("total_tokens", 0)
             result.Data["total_input_tokens"] += initial_llm_response.Data.get("total_input_tokens", 0)
             result.Data["total_output_tokens"] += initial_llm_response.Data.get("total_output_tokens", 0)
-            result.Data["final_llm_response"] = initial_llm_response.Data.get("final_llm_response")
-            result.Data["llm_responses_arr"].append(initial_llm_response.Data.get("final_llm_response"))
+            record_llm_response(result, initial_llm_response)
 
             if streaming_callback and streaming_callback.get("is_stream"):
                 await streaming_callback["streamCallbacks"].on_data(json.dumps({
@@ -111,7 +195,9 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
 
                 # Loop to handle multiple LLM calls and tool executions
                 while True:
-                    response = await azure_openai_processor(client_details)
+                    if not budget.next_iteration():
+                        return stop_on_budget(result, budget)
+                    response = await run_llm_call(azure_openai_processor, client_details, "llm.agent_loop")
                     if not response.Status:
                         result.Error = response.Error
                         result.Status = response.Status
@@ -121,8 +207,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                     result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
                     result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
                     result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+                    record_llm_response(result, response)
 
                     if response.Data.get("output_type") == "text":
                         result.Data["messages"].extend(response.Data.get("messages", []))
@@ -150,6 +235,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                             "Action": "NOTIFICATION"
                         }))
 
+                    append_tool_calls(client_details["chat_history"], response)
                     for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
                         
                         tool_name = tool.get("function", {}).get("name")
@@ -183,24 +269,19 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                             "result": tool_call_result,
                         })
 
-                        tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                        client_details["chat_history"].append({
-                            "role": "assistant",
-                            "content": tool_call_content_data,
-                        })
+                        append_tool_result(client_details["chat_history"], tool, tool_name, tool_call_result)
 
             else:
                 # No function call, normal response case
                 client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
                 client_details["tools"] = []
 
-                normal_response = await azure_openai_processor(client_details)
+                normal_response = await run_llm_call(azure_openai_processor, client_details, "llm.response")
                 result.Data["total_llm_calls"] += 1
                 result.Data["total_tokens"] += normal_response.Data.get("total_tokens", 0)
                 result.Data["total_input_tokens"] += normal_response.Data.get("total_input_tokens", 0)
                 result.Data["total_output_tokens"] += normal_response.Data.get("total_output_tokens", 0)
-                result.Data["final_llm_response"] = normal_response.Data.get("final_llm_response")
-                result.Data["llm_responses_arr"].append(normal_response.Data.get("final_llm_response"))
+                record_llm_response(result, normal_response)
 
                 result.Data["output_type"] = normal_response.Data.get("output_type", "")
                 result.Error = normal_response.Error
@@ -234,7 +315,9 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                     client_details["tools"] = final_tool_calls
 
                     while True:
-                        response = await azure_openai_processor(client_details)
+                        if not budget.next_iteration():
+                            return stop_on_budget(result, budget)
+                        response = await run_llm_call(azure_openai_processor, client_details, "llm.agent_loop")
                         if not response.Status:
                             result.Error = response.Error
                             result.Status = response.Status
@@ -244,8 +327,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                         result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
                         result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
                         result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                        result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                        result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+                        record_llm_response(result, response)
 
                         if response.Data.get("output_type") == "text":
                             result.Data["messages"].extend(response.Data.get("messages", []))
@@ -273,6 +355,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                                 "Action": "NOTIFICATION"
                             }))
 
+                        append_tool_calls(client_details["chat_history"], response)
                         for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
                             tool_name = tool.get("function", {}).get("name")
                             args = json.loads(tool.get("function", {}).get("arguments", "{}"))
@@ -304,16 +387,13 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                                 "result": tool_call_result,
                             })
 
-                            tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                            client_details["chat_history"].append({
-                                "role": "assistant",
-                                "content": tool_call_content_data,
-                            })
+                            append_tool_result(client_details["chat_history"], tool, tool_name, tool_call_result)
         
         elif selected_client == "MCP_CLIENT_OPENAI":
+            openai_processor = get_llm_processor(selected_client)
 
             # Initial LLM call
-            initial_llm_response = await openai_processor(client_details)
+            initial_llm_response = await run_llm_call(openai_processor, client_details, "llm.tool_selection")
             if not initial_llm_response.Status:
                 result.Error = initial_llm_response.Error
                 result.Status = initial_llm_response.Status
@@ -324,8 +404,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
             result.Data["total_tokens"] += initial_llm_response.Data.get("total_tokens", 0)
             result.Data["total_input_tokens"] += initial_llm_response.Data.get("total_input_tokens", 0)
             result.Data["total_output_tokens"] += initial_llm_response.Data.get("total_output_tokens", 0)
-            result.Data["final_llm_response"] = initial_llm_response.Data.get("final_llm_response")
-            result.Data["llm_responses_arr"].append(initial_llm_response.Data.get("final_llm_response"))
+            record_llm_response(result, initial_llm_response)
 
             if streaming_callback and streaming_callback.get("is_stream"):
                 await streaming_callback["streamCallbacks"].on_data(json.dumps({
@@ -352,7 +431,9 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
 
                 # Loop to handle multiple LLM calls and tool executions
                 while True:
-                    response = await openai_processor(client_details)
+                    if not budget.next_iteration():
+                        return stop_on_budget(result, budget)
+                    response = await run_llm_call(openai_processor, client_details, "llm.agent_loop")
                     if not response.Status:
                         result.Error = response.Error
                         result.Status = response.Status
@@ -362,8 +443,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                     result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
                     result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
                     result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+                    record_llm_response(result, response)
 
                     if response.Data.get("output_type") == "text":
                         result.Data["messages"].extend(response.Data.get("messages", []))
@@ -391,6 +471,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                             "Action": "NOTIFICATION"
                         }))
 
+                    append_tool_calls(client_details["chat_history"], response)
                     for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
                         
                         tool_name = tool.get("function", {}).get("name")
@@ -424,24 +505,19 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                             "result": tool_call_result,
                         })
 
-                        tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                        client_details["chat_history"].append({
-                            "role": "assistant",
-                            "content": tool_call_content_data,
-                        })
+                        append_tool_result(client_details["chat_history"], tool, tool_name, tool_call_result)
 
             else:
                 # No function call, normal response case
                 client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
                 client_details["tools"] = []
 
-                normal_response = await openai_processor(client_details)
+                normal_response = await run_llm_call(openai_processor, client_details, "llm.response")
                 result.Data["total_llm_calls"] += 1
                 result.Data["total_tokens"] += normal_response.Data.get("total_tokens", 0)
                 result.Data["total_input_tokens"] += normal_response.Data.get("total_input_tokens", 0)
                 result.Data["total_output_tokens"] += normal_response.Data.get("total_output_tokens", 0)
-                result.Data["final_llm_response"] = normal_response.Data.get("final_llm_response")
-                result.Data["llm_responses_arr"].append(normal_response.Data.get("final_llm_response"))
+                record_llm_response(result, normal_response)
 
                 result.Data["output_type"] = normal_response.Data.get("output_type", "")
                 result.Error = normal_response.Error
@@ -475,7 +551,9 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                     client_details["tools"] = final_tool_calls
 
                     while True:
-                        response = await openai_processor(client_details)
+                        if not budget.next_iteration():
+                            return stop_on_budget(result, budget)
+                        response = await run_llm_call(openai_processor, client_details, "llm.agent_loop")
                         if not response.Status:
                             result.Error = response.Error
                             result.Status = response.Status
@@ -485,8 +563,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                         result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
                         result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
                         result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                        result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                        result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+                        record_llm_response(result, response)
 
                         if response.Data.get("output_type") == "text":
                             result.Data["messages"].extend(response.Data.get("messages", []))
@@ -514,6 +591,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                                 "Action": "NOTIFICATION"
                             }))
 
+                        append_tool_calls(client_details["chat_history"], response)
                         for tool in response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {}).get("tool_calls", []):
                             tool_name = tool.get("function", {}).get("name")
                             args = json.loads(tool.get("function", {}).get("arguments", "{}"))
@@ -545,17 +623,14 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                                 "result": tool_call_result,
                             })
 
-                            tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                            client_details["chat_history"].append({
-                                "role": "assistant",
-                                "content": tool_call_content_data,
-                            })
+                            append_tool_result(client_details["chat_history"], tool, tool_name, tool_call_result)
         
         elif selected_client == "MCP_CLIENT_GEMINI":
+            gemini_processor = get_llm_processor(selected_client)
 
             # Initial LLM call
-            initial_llm_response = await gemini_processor(client_details)
-            print("Initial LLM response:", initial_llm_response)
+            initial_llm_response = await run_llm_call(gemini_processor, client_details, "llm.tool_selection")
+            log_sampled(logger, "Initial LLM response", initial_llm_response.Data or initial_llm_response.Error)
             if not initial_llm_response.Status:
                 result.Error = initial_llm_response.Error
                 result.Status = initial_llm_response.Status
@@ -566,8 +641,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
             result.Data["total_tokens"] += initial_llm_response.Data.get("total_tokens", 0)
             result.Data["total_input_tokens"] += initial_llm_response.Data.get("total_input_tokens", 0)
             result.Data["total_output_tokens"] += initial_llm_response.Data.get("total_output_tokens", 0)
-            result.Data["final_llm_response"] = initial_llm_response.Data.get("final_llm_response")
-            result.Data["llm_responses_arr"].append(initial_llm_response.Data.get("final_llm_response"))
+            record_llm_response(result, initial_llm_response)
 
             if streaming_callback and streaming_callback.get("is_stream"):
                 await streaming_callback["streamCallbacks"].on_data(json.dumps({
@@ -595,16 +669,16 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                 # Loop to handle multiple LLM calls and tool executions
                 count=1
                 while True:
+                    if not budget.next_iteration():
+                        return stop_on_budget(result, budget)
                     if count==3:
                         result.Error = "Maximum LLM calls went into halucination"
                         result.Status = response.Status
                         return result
-                    
-                    if count != 1:
-                         client_details["tools"] = []
-                    
-                    response = await gemini_processor(client_details)
-                    print(response)
+
+                    # The declarations are sent on every call, the history holds function calls and responses that refer to them
+                    response = await run_llm_call(gemini_processor, client_details, "llm.agent_loop")
+                    log_sampled(logger, "Agent loop LLM response", response.Data or response.Error)
                     if not response.Status:
                         result.Error = response.Error
                         result.Status = response.Status
@@ -614,8 +688,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                     result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
                     result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
                     result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                    result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                    result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+                    record_llm_response(result, response)
 
                     if response.Data.get("output_type") == "text":
                         result.Data["messages"].extend(response.Data.get("messages", []))
@@ -649,6 +722,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                     content = first_candidate.get("content", {}) if isinstance(first_candidate, dict) else {}
                     parts = content.get("parts", []) if isinstance(content, dict) else []
 
+                    append_function_calls(client_details["chat_history"], parts)
                     for tool in parts:
 
                         tool_name = tool.get("functionCall", {}).get("name")
@@ -690,11 +764,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                             "result": tool_call_result,
                         })
 
-                        tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                        client_details["chat_history"].append({
-                            "role": "model",
-                            "content": tool_call_content_data,
-                        })
+                        append_function_result(client_details["chat_history"], tool_name, tool_call_result)
 
                     count+=1
             else:
@@ -702,13 +772,12 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                 client_details["prompt"] = f"{temp_prompt}. Available tools: {json.dumps(tool_call_details_arr)}"
                 client_details["tools"] = []
 
-                normal_response = await gemini_processor(client_details)
+                normal_response = await run_llm_call(gemini_processor, client_details, "llm.response")
                 result.Data["total_llm_calls"] += 1
                 result.Data["total_tokens"] += normal_response.Data.get("total_tokens", 0)
                 result.Data["total_input_tokens"] += normal_response.Data.get("total_input_tokens", 0)
                 result.Data["total_output_tokens"] += normal_response.Data.get("total_output_tokens", 0)
-                result.Data["final_llm_response"] = normal_response.Data.get("final_llm_response")
-                result.Data["llm_responses_arr"].append(normal_response.Data.get("final_llm_response"))
+                record_llm_response(result, normal_response)
 
                 result.Data["output_type"] = normal_response.Data.get("output_type", "")
                 result.Error = normal_response.Error
@@ -750,15 +819,15 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
 
                     count=1
                     while True:
+                        if not budget.next_iteration():
+                            return stop_on_budget(result, budget)
                         if count==3:
                             result.Error = "Maximum LLM calls went into halucination"
                             result.Status = False
                             return result
-                    
-                        if count != 1:
-                            client_details["tools"] = []
 
-                        response = await gemini_processor(client_details)
+                        # Declarations stay on every call, see above
+                        response = await run_llm_call(gemini_processor, client_details, "llm.agent_loop")
                         if not response.Status:
                             result.Error = response.Error
                             result.Status = response.Status
@@ -768,8 +837,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                         result.Data["total_tokens"] += response.Data.get("total_tokens", 0)
                         result.Data["total_input_tokens"] += response.Data.get("total_input_tokens", 0)
                         result.Data["total_output_tokens"] += response.Data.get("total_output_tokens", 0)
-                        result.Data["final_llm_response"] = response.Data.get("final_llm_response")
-                        result.Data["llm_responses_arr"].append(response.Data.get("final_llm_response"))
+                        record_llm_response(result, response)
 
                         if response.Data.get("output_type") == "text":
                             result.Data["messages"].extend(response.Data.get("messages", []))
@@ -803,6 +871,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                         content = first_candidate.get("content", {}) if isinstance(first_candidate, dict) else {}
                         parts = content.get("parts", []) if isinstance(content, dict) else []
 
+                        append_function_calls(client_details["chat_history"], parts)
                         for tool in parts:
 
                             tool_name = tool.get("functionCall", {}).get("name")
@@ -844,11 +913,7 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
                                 "result": tool_call_result,
                             })
 
-                            tool_call_content_data = f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}"
-                            client_details["chat_history"].append({
-                                "role": "model",
-                                "content": tool_call_content_data,
-                            })
+                            append_function_result(client_details["chat_history"], tool_name, tool_call_result)
 
                         count+=1    
 
@@ -856,13 +921,104 @@ async def client_and_server_execution(payload: Dict[str, Any], streaming_callbac
         return result
 
     except Exception as e:
-        logging.error(f"Exception in client_and_server_execution: {e}")
+        logger.error(f"Exception in client_and_server_execution: {e}")
         res = ClientAndServerExecutionResponse()
         res.Error = str(e)
         res.Status = False
         return res
 
 
+async def run_llm_call(processor, client_details: Dict[str, Any], stage: str):
+    """Run a processor call on the compacted chat history, recording its latency as a pipeline stage and its token usage"""
+    provider = processor.__name__.removesuffix("_processor")
+    with span("history.compaction"):
+        client_details = compact_for_llm_call(client_details)
+    with span(stage, model=client_details.get("chat_model")):
+        response = await processor(client_details)
+
+    if response.Status and response.Data:
+        LLM_CALLS.inc(provider, "success")
+        LLM_TOKENS.inc(provider, "input", amount=response.Data.get("total_input_tokens", 0))
+        LLM_TOKENS.inc(provider, "output", amount=response.Data.get("total_output_tokens", 0))
+        LLM_TOKENS.inc(provider, "total", amount=response.Data.get("total_tokens", 0))
+    else:
+        LLM_CALLS.inc(provider, "error")
+    return response
+
+
+def record_llm_response(result: ClientAndServerExecutionResponse, response):
+    """Keep the raw provider response of an LLM call in the result, as much as DeploymentConfig's verbosity asks for"""
+    verbosity = DeploymentConfig["llm_response_verbosity"]
+    if verbosity == "none":
+        return
+    final_llm_response = response.Data.get("final_llm_response")
+    result.Data["final_llm_response"] = final_llm_response
+    if verbosity == "full":
+        result.Data["llm_responses_arr"].append(final_llm_response)
+
+
+def stop_on_budget(result: ClientAndServerExecutionResponse, budget: RequestBudget) -> ClientAndServerExecutionResponse:
+    """Partial result of a request that ran out of budget, with the tool calls made so far"""
+    result.Error = f"Stopped before the final answer, request budget exhausted: {budget.stopped_reason}"
+    result.Status = False
+    return result
+
+
+def append_tool_calls(chat_history: List[Dict[str, Any]], response):
+    """Add the OpenAI assistant message requesting tool calls, which the tool results answer"""
+    if not DeploymentConfig["native_tool_messages"]:
+        return
+    message = response.Data.get("final_llm_response", {}).get("choices", [{}])[0].get("message", {})
+    chat_history.append({
+        "role": "assistant",
+        "content": message.get("content"),
+        "tool_calls": message.get("tool_calls", []),
+    })
+
+
+def append_tool_result(chat_history: List[Dict[str, Any]], tool: Dict[str, Any], tool_name: str, tool_call_result: Any):
+    """Add the result of an OpenAI tool call, as a tool message answering the call's id"""
+    if not DeploymentConfig["native_tool_messages"]:
+        chat_history.append({
+            "role": "assistant",
+            "content": f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}",
+        })
+        return
+    chat_history.append({
+        "role": "tool",
+        "tool_call_id": tool.get("id"),
+        "name": tool_name,
+        "content": json.dumps(tool_call_result),
+    })
+
+
+def append_function_calls(chat_history: List[Dict[str, Any]], parts: List[Dict[str, Any]]):
+    """Add the Gemini model content with the functionCall parts, which the function results answer"""
+    if not DeploymentConfig["native_tool_messages"]:
+        return
+    chat_history.append({"role": "model", "parts": parts})
+
+
+def append_function_result(chat_history: List[Dict[str, Any]], tool_name: str, tool_call_result: Any):
+    """Add the result of a Gemini function call as a functionResponse part.
+
+    The responses to the calls of one model turn go together in a single user content.
+    """
+    if not DeploymentConfig["native_tool_messages"]:
+        chat_history.append({
+            "role": "model",
+            "content": f"Executed tool: {tool_name} and the result is: {json.dumps(tool_call_result)}",
+        })
+        return
+    part = {"functionResponse": {"name": tool_name, "response": {"result": tool_call_result}}}
+    last = chat_history[-1] if chat_history else {}
+    if last.get("role") == "user" and any("functionResponse" in p for p in last.get("parts", [])):
+        # Replaced rather than extended in place, so that the message buffers see the change
+        chat_history[-1] = {**last, "parts": last["parts"] + [part]}
+    else:
+        chat_history.append({"role": "user", "parts": [part]})
+
+
 def extract_data_from_response(message: Any) -> Dict[str, Any]:
 
     """Parse message content for function call info and selected tools."""
@@ -903,12 +1059,15 @@ async def call_and_execute_tool(
     
     # pull per-server creds, defaulting to {}
     creds = credentials.get(selected_server, {})
+    # servers that can report their own timing breakdown for a tool call
+    trace_timings = False
 
     # switch/case for injecting creds (Python 3.10+)
     match selected_server:
         case "MCP-GSUITE":
             args["__credentials__"]   = creds
             args["server_credentials"] = creds
+            trace_timings = True
         case "FACEBOOK_MCP":
             args["__credentials__"]   = creds
             args["server_credentials"] = creds
@@ -925,10 +1084,40 @@ async def call_and_execute_tool(
 
     client = MCPServers[selected_server]
 
+    call_args = args
+    timings = current_timings()
+    if trace_timings and timings is not None:
+        call_args = {**args, "__trace__": {"request_id": timings.request_id}}
+
+    budget = current_budget()
+    if budget is not None and budget.expired():
+        # The rest of the agent loop is stopped as well, see stop_on_budget
+        TOOL_CALLS.inc(selected_server, tool_name, "skipped")
+        return f"Tool call skipped, request budget exhausted: {budget.stopped_reason}"
+
     try:
         # perform the tool call
-        raw_result = await client.call_tool(tool_name, args)
-        
+        started = time.perf_counter()
+        with span("tool.call", tool=tool_name):
+            raw_result = await asyncio.wait_for(
+                client.call_tool(tool_name, call_args),
+                timeout=call_timeout(RequestBudgetConfig["tool_call_timeout_seconds"]),
+            )
+        duration = time.perf_counter() - started
+        TOOL_CALL_DURATION.observe(duration, selected_server, tool_name)
+        TOOL_CALLS.inc(selected_server, tool_name, "error" if getattr(raw_result, "isError", False) else "success")
+
+        # the server appends its own timings as the last content item, strip it from the result
+        content = getattr(raw_result, "content", None)
+        if content and (getattr(content[-1], "text", None) or "").startswith(SERVER_TIMINGS_PREFIX):
+            server_timings = json.loads(content.pop().text[len(SERVER_TIMINGS_PREFIX):])
+            record_server_timings(server_timings, started, duration)
+            GOOGLE_API_RATE_LIMIT_WAIT.observe(server_timings.get("rate_limit_wait_ms", 0.0) / 1000, selected_server, tool_name)
+            if server_timings.get("throttled"):
+                GOOGLE_API_THROTTLED.inc(selected_server, tool_name, amount=server_timings["throttled"])
+            if server_timings.get("retries"):
+                GOOGLE_API_RETRIES.inc(selected_server, tool_name, amount=server_timings["retries"])
+
         # try to JSON-serialize it
         try:
             # this will recurse into __dict__ for any object
@@ -940,8 +1129,20 @@ async def call_and_execute_tool(
             # fallback to string
             tool_call_result = str(raw_result)
 
+    except asyncio.TimeoutError:
+        TOOL_CALLS.inc(selected_server, tool_name, "timeout")
+        CANCELLED_TOOL_CALL_SECONDS.inc(selected_server, tool_name, amount=time.perf_counter() - started)
+        tool_call_result = f"Tool call {tool_name} timed out"
+
+    except asyncio.CancelledError:
+        # The request was abandoned, the session has told the server to stop the call
+        TOOL_CALLS.inc(selected_server, tool_name, "cancelled")
+        CANCELLED_TOOL_CALL_SECONDS.inc(selected_server, tool_name, amount=time.perf_counter() - started)
+        raise
+
     except Exception as err:
         # catch any call-tool exception and stringify it
+        TOOL_CALLS.inc(selected_server, tool_name, "error")
         tool_call_result = str(err)
 
     return tool_call_result
\ No newline at end of file
@@ -1,7 +1,11 @@
+import logging
 from typing import Dict, Any, Callable, Optional
 
-from src.server_connection import MCPServers
+from src.server_connection import MCPServers, ensure_mcp_server
 from src.client_and_server_config import ServersConfig, ClientsConfig
+from src.timing import span
+
+logger = logging.getLogger(__name__)
 
 
 async def client_and_server_validation(payload: Dict[str, Any], streaming_callback: Optional[Callable] = None):
@@ -12,7 +16,7 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
         selected_servers = payload.get("selected_servers", [])
 
         if not selected_client or not selected_servers or not selected_server_credentials or not client_details:
-            print("Invalid Request Payload")
+            logger.info("Invalid Request Payload")
             return {
                 "payload": None,
                 "error": "Invalid Request Payload",
@@ -20,8 +24,9 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
             }
 
         for server in selected_servers:
-            if server not in MCPServers:
-                print("Invalid Server")
+            # Servers are started on first use when lazy startup is enabled
+            if not await ensure_mcp_server(server):
+                logger.info("Invalid Server")
                 return {
                     "payload": None,
                     "error": "Invalid Server",
@@ -29,7 +34,7 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
                 }
 
         if selected_client not in ClientsConfig:
-            print("Invalid Client")
+            logger.info("Invalid Client")
             return {
                 "payload": None,
                 "error": "Invalid Client",
@@ -39,7 +44,8 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
         tools_arr = []
         for server in selected_servers:
    
-            resource = await MCPServers[server].list_tools()
+            with span("validation.list_tools", server=server):
+                resource = await MCPServers[server].list_tools()
             if resource:
                 for tool in resource.tools:
                     tool_dict = {
@@ -71,7 +77,7 @@ async def client_and_server_validation(payload: Dict[str, Any], streaming_callba
         }
 
     except Exception as err:
-        print("Error initializing MCP ==========>>>>", err)
+        logger.error(f"Error validating request: {err}")
         return {
             "payload": None,
             "error": str(err),
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.client_and_server_config import ConversationStoreConfig
+from src.history_compaction import split_turns
+from src.metrics import CONVERSATIONS_IN_MEMORY, CONVERSATION_MEMORY_BYTES
+
+Message = Dict[str, Any]
+
+
+def _is_tool_result(message: Message) -> bool:
+    if message.get("role") == "tool":
+        return True
+    return any("functionResponse" in part for part in message.get("parts") or [] if isinstance(part, dict))
+
+
+def keep_latest(messages: List[Message], max_messages: int) -> List[Message]:
+    """The newest messages, at most max_messages, cut at the start of a turn.
+
+    Providers reject histories starting with a tool result whose call was cut
+    off, so whole turns are dropped. If the last turn alone is longer than
+    max_messages, it is cut after the limit's leading tool results instead.
+    """
+    if len(messages) <= max_messages:
+        return messages
+    start = len(messages) - max_messages
+    for turn in split_turns(messages):
+        if turn[0] >= start:
+            return messages[turn[0]:]
+    while start < len(messages) and _is_tool_result(messages[start]):
+        start += 1
+    return messages[start:]
+
+
+class _Conversation:
+    def __init__(self, messages: List[Message], size: int, mtime: float):
+        self.messages = messages
+        # Approximate memory footprint, the size of the messages as JSON
+        self.size = size
+        # Modification time of the file the messages were read from or written to
+        self.mtime = mtime
+
+
+class ConversationStore:
+    """Chat histories keyed by conversation ID, so callers only send the new input.
+
+    Every conversation is kept in a JSON lines file, one message per line. New
+    turns are appended to the file instead of rewriting it. The most recently
+    used conversations are also kept in memory, within a conversation count and
+    a byte budget. Conversations idle for longer than the TTL are deleted.
+
+    The files are the source of truth, so workers sharing the directory see
+    each other's turns. Requests for the same conversation are serialized
+    within a worker, see lock().
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.directory = config["directory"]
+        self.max_conversations = config["max_conversations_in_memory"]
+        self.max_memory_bytes = config["max_memory_bytes"]
+        self.max_messages = config["max_messages"]
+        self.ttl_seconds = config["ttl_seconds"]
+        self.purge_interval_seconds = config["purge_interval_seconds"]
+        self._cache: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._memory_bytes = 0
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._last_purge = time.monotonic()
+
+    def lock(self, conversation_id: str) -> asyncio.Lock:
+        """Lock to hold while a request reads and extends a conversation"""
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = self._locks[conversation_id] = asyncio.Lock()
+        return lock
+
+    def _path(self, conversation_id: str) -> str:
+        # Hashed, so that any ID maps to a safe file name
+        name = hashlib.sha256(conversation_id.encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    def _cache_put(self, conversation_id: str, conversation: _Conversation):
+        previous = self._cache.pop(conversation_id, None)
+        if previous is not None:
+            self._memory_bytes -= previous.size
+        self._cache[conversation_id] = conversation
+        self._memory_bytes += conversation.size
+        while self._cache and (len(self._cache) > self.max_conversations or self._memory_bytes > self.max_memory_bytes):
+            _, evicted = self._cache.popitem(last=False)
+            self._memory_bytes -= evicted.size
+
+    def _cache_drop(self, conversation_id: str):
+        conversation = self._cache.pop(conversation_id, None)
+        if conversation is not None:
+            self._memory_bytes -= conversation.size
+
+    def _read(self, path: str) -> Optional[_Conversation]:
+        try:
+            mtime = os.path.getmtime(path)
+            if time.time() - mtime > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+        messages = [json.loads(line) for line in lines if line.strip()]
+        return _Conversation(keep_latest(messages, self.max_messages), sum(len(line) for line in lines), mtime)
+
+    def _write(self, path: str, lines: List[str], append: bool) -> float:
+        os.makedirs(self.directory, exist_ok=True)
+        if append:
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        else:
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+            os.replace(temp_path, path)
+        return os.path.getmtime(path)
+
+    def _purge_expired(self):
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".jsonl") and now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def load(self, conversation_id: str) -> Optional[List[Message]]:
+        """Messages of a conversation, or None if it is unknown or expired.
+
+        Returns a copy, callers can extend it and pass the new messages to append().
+        """
+        path = self._path(conversation_id)
+        conversation = self._cache.get(conversation_id)
+        if conversation is not None:
+            try:
+                mtime = await asyncio.to_thread(os.path.getmtime, path)
+            except FileNotFoundError:
+                mtime = None
+            # Still valid unless the file expired, or another worker extended it
+            if mtime != conversation.mtime or time.time() - mtime > self.ttl_seconds:
+                conversation = None
+
+        if conversation is None:
+            conversation = await asyncio.to_thread(self._read, path)
+            if conversation is None:
+                self._cache_drop(conversation_id)
+                return None
+            self._cache_put(conversation_id, conversation)
+        else:
+            self._cache.move_to_end(conversation_id)
+
+        return list(conversation.messages)
+
+    async def append(self, conversation_id: str, messages: List[Message]):
+        """Add new turns at the end of a conversation, creating it if needed."""
+        if not messages:
+            return
+        path = self._path(conversation_id)
+        conversation = self._cache.get(conversation_id)
+        if conversation is not None:
+            # Taken out while its size changes, _cache_put accounts for it again
+            self._cache_drop(conversation_id)
+        else:
+            conversation = await asyncio.to_thread(self._read, path) or _Conversation([], 0, 0.0)
+
+        lines = [json.dumps(message, ensure_ascii=False) + "\n" for message in messages]
+        conversation.messages.extend(messages)
+        if len(conversation.messages) > self.max_messages:
+            # Drop the oldest turns and compact the file
+            conversation.messages = keep_latest(conversation.messages, self.max_messages)
+            lines = [json.dumps(message, ensure_ascii=False) + "\n" for message in conversation.messages]
+            conversation.size = sum(len(line) for line in lines)
+            conversation.mtime = await asyncio.to_thread(self._write, path, lines, False)
+        else:
+            conversation.size += sum(len(line) for line in lines)
+            conversation.mtime = await asyncio.to_thread(self._write, path, lines, True)
+        self._cache_put(conversation_id, conversation)
+
+        if time.monotonic() - self._last_purge > self.purge_interval_seconds:
+            self._last_purge = time.monotonic()
+            await asyncio.to_thread(self._purge_expired)
+
+    async def delete(self, conversation_id: str):
+        """Forget a conversation"""
+        self._cache_drop(conversation_id)
+        try:
+            await asyncio.to_thread(os.remove, self._path(conversation_id))
+        except FileNotFoundError:
+            pass
+
+
+conversation_store = ConversationStore(ConversationStoreConfig)
+CONVERSATIONS_IN_MEMORY.set_function(lambda: {(): len(conversation_store._cache)})
+CONVERSATION_MEMORY_BYTES.set_function(lambda: {(): conversation_store._memory_bytes})
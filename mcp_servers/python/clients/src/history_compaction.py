@@ -0,0 +1,187 @@
+import json
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.client_and_server_config import HistoryCompactionConfig
+from src.llm.token_estimator import count_tokens
+
+Message = Dict[str, Any]
+
+# Tool results are added to the chat history by client_and_server_execution as OpenAI tool messages,
+# Gemini functionResponse parts or, without native tool messages, as text in this format
+TOOL_RESULT_PREFIX = "Executed tool: "
+TOOL_RESULT_SEPARATOR = " and the result is: "
+
+# Tokens the providers add per message for the role and delimiters
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_message_tokens(message: Message, model: str = "") -> int:
+    tokens = count_tokens(message.get("content") or "", model) + MESSAGE_OVERHEAD_TOKENS
+    for key in ("tool_calls", "parts"):
+        if message.get(key):
+            tokens += count_tokens(message[key], model)
+    return tokens
+
+
+class CompactionReport:
+    """What compaction did to the chat history during one request, returned in the response Data"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.llm_calls = 0
+        self.compacted_calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.messages_digested = 0
+        self.messages_dropped = 0
+        self.over_budget = False
+
+    def add(self, tokens_before: int, tokens_after: int, digested: int, dropped: int):
+        self.llm_calls += 1
+        # Of the last call, which sent the longest history
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        if digested or dropped:
+            self.compacted_calls += 1
+        self.messages_digested = max(self.messages_digested, digested)
+        self.messages_dropped = max(self.messages_dropped, dropped)
+        self.over_budget = self.over_budget or tokens_after > self.budget
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "budget_tokens": self.budget,
+            "llm_calls": self.llm_calls,
+            "compacted_calls": self.compacted_calls,
+            "history_tokens_before": self.tokens_before,
+            "history_tokens_after": self.tokens_after,
+            "messages_digested": self.messages_digested,
+            "messages_dropped": self.messages_dropped,
+            "over_budget": self.over_budget,
+        }
+
+
+_current_report: ContextVar[Optional[CompactionReport]] = ContextVar("compaction_report", default=None)
+
+
+def start_compaction_report() -> CompactionReport:
+    """Start collecting what compaction does for the current request"""
+    report = CompactionReport(HistoryCompactionConfig["max_history_tokens"])
+    _current_report.set(report)
+    return report
+
+
+def digest_result(result: str, preview_chars: int) -> Optional[str]:
+    """Size and start of a tool result, or None if that would not be shorter"""
+    if len(result) <= preview_chars:
+        return None
+    return f"[compacted, {len(result)} characters] {result[:preview_chars]}..."
+
+
+def digest_tool_result(message: Message, preview_chars: int) -> Optional[Message]:
+    """Copy of a tool result message with the result replaced by a digest, or None if the
+    message is not a tool result or the digest would not be shorter"""
+    content = message.get("content")
+    if message.get("role") == "tool" and isinstance(content, str):
+        digest = digest_result(content, preview_chars)
+        return {**message, "content": digest} if digest else None
+
+    if message.get("parts"):
+        parts = []
+        for part in message["parts"]:
+            response = part.get("functionResponse")
+            digest = digest_result(json.dumps(response["response"]), preview_chars) if response else None
+            parts.append({"functionResponse": {**response, "response": {"result": digest}}} if digest else part)
+        return {**message, "parts": parts} if parts != message["parts"] else None
+
+    if not isinstance(content, str) or not content.startswith(TOOL_RESULT_PREFIX) or TOOL_RESULT_SEPARATOR not in content:
+        return None
+    tool_name, _, result = content[len(TOOL_RESULT_PREFIX):].partition(TOOL_RESULT_SEPARATOR)
+    digest = digest_result(result, preview_chars)
+    return {**message, "content": f"{TOOL_RESULT_PREFIX}{tool_name}{TOOL_RESULT_SEPARATOR}{digest}"} if digest else None
+
+
+def is_user_input(message: Message) -> bool:
+    # Gemini function responses are user contents as well
+    return message.get("role") == "user" and "parts" not in message
+
+
+def split_turns(chat_history: List[Message]) -> List[List[int]]:
+    """Indexes of the messages of each turn, a turn starting at every user input"""
+    turns: List[List[int]] = []
+    for index, message in enumerate(chat_history):
+        if is_user_input(message) or not turns:
+            turns.append([])
+        turns[-1].append(index)
+    return turns
+
+
+def compact_history(chat_history: List[Message], model: str = "", config: Dict[str, Any] = HistoryCompactionConfig) -> Tuple[List[Message], Dict[str, int]]:
+    """Fit a chat history into the token budget before it is sent to the LLM.
+
+    Histories within the budget are returned as they are. Otherwise, in order
+    until the history fits:
+      1. tool results older than the last recent_turns turns are replaced by a digest
+      2. the oldest turns before those are dropped
+      3. tool results of the recent turns are digested as well, except the current turn's
+
+    The input list and its messages are not modified, so stored histories keep
+    the full tool results.
+    """
+    sizes = [estimate_message_tokens(message, model) for message in chat_history]
+    tokens_before = sum(sizes)
+    stats = {"tokens_before": tokens_before, "tokens_after": tokens_before, "digested": 0, "dropped": 0}
+    budget = config["max_history_tokens"]
+    if not config["enabled"] or tokens_before <= budget:
+        return chat_history, stats
+
+    preview_chars = config["digest_preview_chars"]
+    messages = list(chat_history)
+    total = tokens_before
+    turns = split_turns(messages)
+    # The current turn is always kept
+    recent_start = max(len(turns) - max(config["recent_turns"], 1), 0)
+
+    def digest(indexes: List[int]):
+        nonlocal total
+        for index in indexes:
+            digested = digest_tool_result(messages[index], preview_chars)
+            if digested is not None:
+                messages[index] = digested
+                size = estimate_message_tokens(messages[index], model)
+                total -= sizes[index] - size
+                sizes[index] = size
+                stats["digested"] += 1
+
+    for turn in turns[:recent_start]:
+        digest(turn)
+
+    dropped_turns = 0
+    while total > budget and dropped_turns < recent_start:
+        for index in turns[dropped_turns]:
+            total -= sizes[index]
+            stats["dropped"] += 1
+        dropped_turns += 1
+
+    if total > budget:
+        for turn in turns[recent_start:-1]:
+            digest(turn)
+
+    if dropped_turns:
+        messages = messages[turns[dropped_turns][0]:]
+    stats["tokens_after"] = total
+    return messages, stats
+
+
+def compact_for_llm_call(client_details: Dict[str, Any]) -> Dict[str, Any]:
+    """client_details to pass to a processor, with the chat history compacted to the budget"""
+    chat_history = client_details.get("chat_history")
+    if not chat_history:
+        return client_details
+    messages, stats = compact_history(chat_history, client_details.get("chat_model") or "")
+    report = _current_report.get()
+    if report is not None:
+        report.add(stats["tokens_before"], stats["tokens_after"], stats["digested"], stats["dropped"])
+    if messages is chat_history:
+        return client_details
+    return {**client_details, "chat_history": messages}
@@ -1,27 +1,35 @@
-import requests
 import json
 from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
+
+from src.budget import BudgetExhausted, call_timeout
+from src.client_and_server_config import RequestBudgetConfig
+from src.llm.http_client import LlmRequestError, post_json
+from src.llm.response_data import SuccessResponseDataFormat
+from src.llm.message_buffer import encode_payload, message_buffer
+from src.llm.token_estimator import ContextOverflowError, preflight_openai
 
 @dataclass
 class ChatMessage:
     role: str
     content: str
 
-@dataclass
-class SuccessResponseDataFormat:
-    total_llm_calls: int
-    total_tokens: int
-    total_input_tokens: int
-    total_output_tokens: int
-    final_llm_response: Dict[str, Any]
-    llm_responses_arr: List[Dict[str, Any]]
-    messages: List[str]
-    output_type: str
+def to_chat_message(msg: Union[ChatMessage, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Chat completion message of a chat history message, None for Gemini contents"""
+    if isinstance(msg, ChatMessage):
+        return {"role": msg.role, "content": msg.content}
+    if "parts" in msg:
+        return None
+    message = {"role": msg["role"], "content": msg.get("content")}
+    # Assistant tool calls and the tool messages answering them
+    for key in ("tool_calls", "tool_call_id"):
+        if key in msg:
+            message[key] = msg[key]
+    return message
 
 @dataclass
 class LlmResponseStruct:
-    Data: Optional[Dict[str, Any]]
+    Data: Optional[SuccessResponseDataFormat]
     Error: Optional[Union[Exception, str, Dict[str, Any]]]
     Status: bool
 
@@ -37,7 +45,7 @@ class AzureAndOpenAiChatCompletionParams:
     vision_model: str = ''
     speech_model: str = ''
     speech_to_text: str = ''
-    chat_history: List[ChatMessage] = field(default_factory=list)
+    chat_history: List[Union[ChatMessage, Dict[str, Any]]] = field(default_factory=list)
     tools: List[Dict[str, Any]] = field(default_factory=list)
     temperature: float = 0.1
     max_tokens: int = 1000
@@ -61,8 +69,7 @@ async def azure_openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             vision_model=data.get('vision_model', ''),
             speech_model=data.get('speech_model', ''),
             speech_to_text=data.get('speech_to_text', ''),
-            chat_history=[ChatMessage(**msg) if isinstance(msg, dict) else msg 
-                         for msg in data.get('chat_history', [])],
+            chat_history=data.get('chat_history', []),
             tools=data.get('tools', []),
             temperature=data.get('temperature', 0.1),
             max_tokens=data.get('max_tokens', 1000),
@@ -83,15 +90,20 @@ async def azure_openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
         if params.max_tokens <= 0:
             return LlmResponseStruct(Data=None, Error=Exception("Max tokens must be > 0"), Status=False)
 
-        # Build messages array
-        messages_arr = [{"role": "system", "content": params.prompt}]
-        messages_arr += [{"role": m.role, "content": m.content} for m in params.chat_history]
+        # Build messages array, converting and encoding only the history added since the last call of this request
+        history = message_buffer("openai", to_chat_message)
+        history.sync(params.chat_history)
+        system_message = {"role": "system", "content": params.prompt}
+        messages_arr = [system_message] + history.messages
+
+        # Drop the oldest history if the prompt would not fit, and keep max_tokens within what is left
+        messages_arr, max_tokens, estimated_input_tokens = preflight_openai(messages_arr, params.tools, selected_model, params.max_tokens)
+        dropped = len(history.messages) + 1 - len(messages_arr)
 
         # Prepare request payload
         payload = {
             # "model": selected_model,
-            "messages": messages_arr,
-            "max_tokens": params.max_tokens,
+            "max_tokens": max_tokens,
             "stream": False,
             "tools": params.tools,
             "tool_choice": params.tool_choice,
@@ -107,9 +119,8 @@ async def azure_openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
         url = f"{endpoint}/openai/deployments/{deployment_id}/chat/completions?api-version={api_version}"
         headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {params.api_key}'}
 
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-        resp.raise_for_status()
-        response_data = resp.json()
+        body = encode_payload(payload, messages=history.encode_array(dropped, head=[json.dumps(system_message)]))
+        response_data = await post_json(url, headers, body.encode(), call_timeout(RequestBudgetConfig["llm_call_timeout_seconds"]))
 
         # Detect tool calls
         choices = response_data.get('choices', [])
@@ -127,26 +138,24 @@ async def azure_openai_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             total_input_tokens=usage.get('prompt_tokens', 0),
             total_output_tokens=usage.get('completion_tokens', 0),
             final_llm_response=response_data,
-            llm_responses_arr=[response_data],
             messages=[message_content],
-            output_type="tool_call" if is_tool_call else "text"
+            output_type="tool_call" if is_tool_call else "text",
+            estimated_input_tokens=estimated_input_tokens
         )
         
         # print(f"response: {final_format}")
 
-        # Return as dict to avoid subscript errors
-        return LlmResponseStruct(Data=asdict(final_format), Error=None, Status=True)
-
-    except requests.exceptions.RequestException as req_err:
-        err_data = None
-        if hasattr(req_err, 'response') and req_err.response is not None:
-            try:
-                err_data = req_err.response.json()
-            except ValueError:
-                err_data = req_err.response.text
-        else:
-            err_data = str(req_err)
-        return LlmResponseStruct(Data=None, Error=err_data, Status=False)
+        return LlmResponseStruct(Data=final_format, Error=None, Status=True)
+
+    except LlmRequestError as req_err:
+        return LlmResponseStruct(Data=None, Error=req_err.data, Status=False)
+
+    except BudgetExhausted as err:
+        # Errors are returned as data, they end up in the JSON response
+        return LlmResponseStruct(Data=None, Error={"type": "budget_exhausted", "reason": err.reason, "message": str(err)}, Status=False)
+
+    except ContextOverflowError as err:
+        return LlmResponseStruct(Data=None, Error={"type": "context_overflow", "message": str(err)}, Status=False)
 
     except Exception as err:
         return LlmResponseStruct(Data=None, Error=err, Status=False)
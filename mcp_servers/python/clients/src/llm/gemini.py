@@ -1,27 +1,39 @@
-import requests
 import json
 from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
+
+from src.budget import BudgetExhausted, call_timeout
+from src.client_and_server_config import LlmEndpointsConfig, RequestBudgetConfig
+from src.llm.http_client import LlmRequestError, post_json
+from src.llm.response_data import SuccessResponseDataFormat
+from src.llm.gemini_declarations import gemini_tools
+from src.llm.message_buffer import encode_payload, message_buffer
+from src.llm.token_estimator import ContextOverflowError, preflight_gemini
 
 @dataclass
 class ChatMessage:
     role: str
     content: str
 
-@dataclass
-class SuccessResponseDataFormat:
-    total_llm_calls: int
-    total_tokens: int
-    total_input_tokens: int
-    total_output_tokens: int
-    final_llm_response: Dict[str, Any]
-    llm_responses_arr: List[Dict[str, Any]]
-    messages: List[str]
-    output_type: str
+def to_gemini_content(msg: Union[ChatMessage, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Gemini content of a chat history message, None for messages Gemini does not take"""
+    if isinstance(msg, ChatMessage):
+        role, content = msg.role, msg.content
+    elif "parts" in msg:
+        # functionCall and functionResponse contents
+        return {"role": msg["role"], "parts": msg["parts"]}
+    else:
+        role, content = msg["role"], msg.get("content")
+    # Replies kept by the conversation store have the OpenAI role
+    if role == "assistant":
+        role = "model"
+    if role not in ['user', 'model'] or content is None:
+        return None
+    return {"role": role, "parts": [{"text": content}]}
 
 @dataclass
 class LlmResponseStruct:
-    Data: Optional[Dict[str, Any]]
+    Data: Optional[SuccessResponseDataFormat]
     Error: Optional[Union[Exception, str, Dict[str, Any]]]
     Status: bool
 
@@ -36,7 +48,7 @@ class GeminiChatCompletionParams:
     chat_model: str = 'gemini-2.0-pro'
     vision_model: str = 'gemini-pro-vision'
     speech_model: str = ''
-    chat_history: List[ChatMessage] = field(default_factory=list)
+    chat_history: List[Union[ChatMessage, Dict[str, Any]]] = field(default_factory=list)
     tools: List[Dict[str, Any]] = field(default_factory=list)
     temperature: float = 0.1
     max_tokens: int = 1000
@@ -57,8 +69,7 @@ async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             chat_model=data.get('chat_model', 'gemini-2.0-pro'),
             vision_model=data.get('vision_model', 'gemini-pro-vision'),
             speech_model=data.get('speech_model', ''),
-            chat_history=[ChatMessage(**msg) if isinstance(msg, dict) else msg
-                          for msg in data.get('chat_history', [])],
+            chat_history=data.get('chat_history', []),
             tools=data.get('tools', []),
             temperature=data.get('temperature', 0.1),
             max_tokens=data.get('max_tokens', 1000),
@@ -78,19 +89,14 @@ async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
         if not params.prompt and not params.input:
             return LlmResponseStruct(Data=None, Error="Prompt or input is required", Status=False)
 
-        # Build chat contents
-        chat_contents = []
-        for msg in params.chat_history:
-            if msg.role in ['user', 'model']:
-                chat_contents.append({
-                    "role": msg.role,
-                    "parts": [{"text": msg.content}]
-                })
-
-        chat_contents.append({
+        # Build chat contents, converting and encoding only the history added since the last call of this request
+        history = message_buffer("gemini", to_gemini_content)
+        history.sync(params.chat_history)
+        input_content = {
             "role": "user",
             "parts": [{"text": params.input}]
-        })
+        }
+        chat_contents = history.messages + [input_content]
 
         # Build payload
         payload = {
@@ -104,49 +110,22 @@ async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             }
         }
 
+        # Function declarations, converted once per tool set
+        tools = gemini_tools(params.tools) if params.tools else None
 
-        if params.tools:
-            function_declarations = []
-            for tool in params.tools:
-                func = tool.get("function", {})
-                parameters = func.get("parameters", {})
-                props = parameters.get("properties", {})
-
-                processed_props = {}
-                for key, val in props.items():
-                    if val.get("type") == "array":
-                        processed_props[key] = {
-                            "type": "array",
-                            "items": {"type": val.get("items", {}).get("type", "string")},
-                            "default": val.get("default", []),
-                            "description": val.get("description", "")
-                        }
-                    else:
-                        processed_props[key] = {
-                            "type": val.get("type", "string"),
-                            "default": val.get("default", ""),
-                            "description": val.get("description", "")
-                        }
-
-                function_declarations.append({
-                    "name": func.get("name"),
-                    "description": func.get("description"),
-                    "parameters": {
-                        "type": parameters.get("type", "object"),
-                        "properties": processed_props,
-                        "required": parameters.get("required", [])
-                    }
-                })
-
-            payload["tools"] = [{"functionDeclarations": function_declarations}]
+        # Drop the oldest contents if the prompt would not fit, and keep maxOutputTokens within what is left
+        payload, max_tokens, estimated_input_tokens = preflight_gemini(payload, selected_model, params.max_tokens, tools.encoded if tools else None)
+        payload["generationConfig"]["maxOutputTokens"] = max_tokens
+        dropped = len(chat_contents) - len(payload.pop("contents"))
 
         # Send request
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{selected_model}:generateContent?key={params.api_key}"
+        url = f"{LlmEndpointsConfig['gemini']}/models/{selected_model}:generateContent?key={params.api_key}"
         headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-
-        response_data = response.json()
+        encoded = {"contents": history.encode_array(dropped, tail=[json.dumps(input_content)])}
+        if tools:
+            encoded["tools"] = tools.encoded
+        body = encode_payload(payload, **encoded)
+        response_data = await post_json(url, headers, body.encode(), call_timeout(RequestBudgetConfig["llm_call_timeout_seconds"]))
 
         message_content = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
         tool_call = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("functionCall", None)
@@ -160,23 +139,22 @@ async def gemini_processor(data: Dict[str, Any]) -> LlmResponseStruct:
             total_input_tokens=usage.get("promptTokenCount", 0),
             total_output_tokens=usage.get("candidatesTokenCount", 0),
             final_llm_response=response_data,
-            llm_responses_arr=[response_data],
             messages=[message_content],
-            output_type="tool_call" if is_tool_call else "text"
+            output_type="tool_call" if is_tool_call else "text",
+            estimated_input_tokens=estimated_input_tokens
         )
 
-        return LlmResponseStruct(Data=asdict(final_format), Error=None, Status=True)
-
-    except requests.exceptions.RequestException as req_err:
-        err_data = None
-        if hasattr(req_err, 'response') and req_err.response is not None:
-            try:
-                err_data = req_err.response.json()
-            except ValueError:
-                err_data = req_err.response.text
-        else:
-            err_data = str(req_err)
-        return LlmResponseStruct(Data=None, Error=err_data, Status=False)
+        return LlmResponseStruct(Data=final_format, Error=None, Status=True)
+
+    except LlmRequestError as req_err:
+        return LlmResponseStruct(Data=None, Error=req_err.data, Status=False)
+
+    except BudgetExhausted as err:
+        # Errors are returned as data, they end up in the JSON response
+        return LlmResponseStruct(Data=None, Error={"type": "budget_exhausted", "reason": err.reason, "message": str(err)}, Status=False)
+
+    except ContextOverflowError as err:
+        return LlmResponseStruct(Data=None, Error={"type": "context_overflow", "message": str(err)}, Status=False)
 
     except Exception as err:
         return LlmResponseStruct(Data=None, Error=err, Status=False)
@@ -0,0 +1,99 @@
+"""
+Gemini functionDeclarations of the OpenAI style tool definitions the client
+passes to the processors.
+
+The tool set rarely changes between the LLM calls of a request and between
+requests, so the converted and JSON encoded declarations are cached by a hash
+of the tool set, and the last tool set is compared by value to skip hashing.
+"""
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Tool sets kept converted per worker
+CACHE_SIZE = 64
+
+# JSON schema keywords Gemini's Schema supports, copied as they are
+SCHEMA_KEYWORDS = (
+    "format", "description", "nullable", "default", "title",
+    "minimum", "maximum", "minItems", "maxItems", "minLength", "maxLength", "pattern",
+)
+
+
+@dataclass(slots=True)
+class GeminiTools:
+    # The payload's tools entry
+    tools: List[Dict[str, Any]]
+    # The same, JSON encoded
+    encoded: str
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Gemini Schema of a JSON schema, including nested objects, arrays and enums"""
+    schema_type = schema.get("type", "string")
+    converted: Dict[str, Any] = {}
+    if isinstance(schema_type, list):
+        # e.g. ["string", "null"]
+        types = [t for t in schema_type if t != "null"]
+        if len(types) < len(schema_type):
+            converted["nullable"] = True
+        schema_type = types[0] if types else "string"
+    converted["type"] = schema_type
+
+    for keyword in SCHEMA_KEYWORDS:
+        if keyword in schema:
+            converted[keyword] = schema[keyword]
+    if "enum" in schema:
+        # Gemini only takes string enums
+        converted["type"] = "string"
+        converted["enum"] = [str(value) for value in schema["enum"] if value is not None]
+    if "anyOf" in schema:
+        converted["anyOf"] = [to_gemini_schema(option) for option in schema["anyOf"]]
+
+    if schema_type == "array":
+        converted["items"] = to_gemini_schema(schema.get("items") or {})
+    elif schema_type == "object" and schema.get("properties"):
+        properties = schema["properties"]
+        converted["properties"] = {name: to_gemini_schema(value) for name, value in properties.items()}
+        required = [name for name in schema.get("required", []) if name in properties]
+        if required:
+            converted["required"] = required
+    return converted
+
+
+def to_function_declaration(tool: Dict[str, Any]) -> Dict[str, Any]:
+    func = tool.get("function", {})
+    declaration = {"name": func.get("name"), "description": func.get("description")}
+    parameters = func.get("parameters") or {}
+    # Gemini rejects objects without properties, functions without arguments leave parameters out
+    if parameters.get("properties"):
+        declaration["parameters"] = to_gemini_schema({**parameters, "type": "object"})
+    return declaration
+
+
+_cache: "OrderedDict[str, GeminiTools]" = OrderedDict()
+# Copy of the tool list last converted and its declarations, to skip hashing when an equal list is
+# passed again. A copy, so a list changed in place after the call does not match it anymore.
+_last: Optional[tuple] = None
+
+
+def gemini_tools(tools: List[Dict[str, Any]]) -> GeminiTools:
+    """Converted tools entry of a Gemini payload, from the cache when the tool set was seen before"""
+    global _last
+    if _last is not None and _last[0] == tools:
+        return _last[1]
+
+    key = hashlib.sha256(json.dumps(tools).encode()).hexdigest()
+    converted = _cache.get(key)
+    if converted is None:
+        gemini = [{"functionDeclarations": [to_function_declaration(tool) for tool in tools]}]
+        converted = _cache[key] = GeminiTools(gemini, json.dumps(gemini))
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    _last = (copy.deepcopy(tools), converted)
+    return converted
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+
+
+class LlmRequestError(Exception):
+    """A provider request that failed, with what the provider answered"""
+
+    def __init__(self, data: Any):
+        super().__init__(data if isinstance(data, str) else json.dumps(data))
+        # The provider's JSON error body, its response text, or the transport error as a string
+        self.data = data
+
+
+# Session of this worker's event loop, shared by all provider requests so connections are reused
+_session: Optional[Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    loop = asyncio.get_running_loop()
+    if _session is None or _session[0] is not loop or _session[1].closed:
+        _session = (loop, aiohttp.ClientSession())
+    return _session[1]
+
+
+async def post_json(url: str, headers: Dict[str, str], body: bytes, timeout: float) -> Dict[str, Any]:
+    """POST an encoded JSON request body and return the decoded response.
+
+    Awaited on the event loop, so the request deadline and cancellation of the
+    request's task interrupt it. Raises LlmRequestError for error statuses,
+    undecodable responses, timeouts and connection errors.
+    """
+    try:
+        async with _get_session().post(url, headers=headers, data=body, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            text = await response.text()
+    except asyncio.TimeoutError as err:
+        raise LlmRequestError(f"Request to the LLM provider timed out after {timeout:.1f}s") from err
+    except aiohttp.ClientError as err:
+        raise LlmRequestError(str(err) or type(err).__name__) from err
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if response.status >= 400:
+        raise LlmRequestError(data if data is not None else text)
+    if data is None:
+        raise LlmRequestError(f"Invalid JSON response from the LLM provider: {text[:200]}")
+    return data
+
+
+async def close_session():
+    """Close the shared session, when the worker shuts down"""
+    global _session
+    if _session is not None:
+        await _session[1].close()
+        _session = None
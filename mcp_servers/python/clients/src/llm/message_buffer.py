@@ -0,0 +1,84 @@
+"""
+Chat history already converted to a provider's message format and encoded as
+JSON, kept across the LLM calls of a request.
+
+The agent loop only ever appends to the chat history, so each call converts
+and encodes just the messages added since the previous one, and the request
+body is assembled from the encoded messages instead of being encoded again.
+"""
+import json
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+Message = Dict[str, Any]
+
+
+class MessageBuffer:
+    """Converted and JSON encoded messages of a chat history, in step with it"""
+
+    def __init__(self, convert: Callable[[Message], Optional[Message]]):
+        # Converts a chat history message to the provider's format, None leaves it out
+        self.convert = convert
+        # Chat history messages the buffer was built from
+        self.sources: List[Message] = []
+        # Number of converted messages for the first i + 1 sources
+        self.counts: List[int] = []
+        self.messages: List[Message] = []
+        self.encoded: List[str] = []
+
+    def sync(self, history: List[Message]) -> int:
+        """Bring the buffer in step with the chat history, returns the number of messages encoded.
+
+        Messages the buffer already holds are reused as long as the history
+        starts with them. A history that changed earlier on, e.g. compacted,
+        is converted again from the first changed message.
+        """
+        keep = 0
+        for kept, message in zip(self.sources, history):
+            # Compaction creates equal copies of the messages it digests
+            if kept is not message and kept != message:
+                break
+            keep += 1
+        if keep < len(self.sources):
+            count = self.counts[keep - 1] if keep else 0
+            del self.sources[keep:], self.counts[keep:], self.messages[count:], self.encoded[count:]
+
+        for message in history[keep:]:
+            converted = self.convert(message)
+            if converted is not None:
+                self.messages.append(converted)
+                self.encoded.append(json.dumps(converted))
+            self.sources.append(message)
+            self.counts.append(len(self.messages))
+        return len(history) - keep
+
+    def encode_array(self, start: int = 0, head: Optional[List[str]] = None, tail: Optional[List[str]] = None) -> str:
+        """JSON array of the converted messages from start on, between already encoded head and tail items"""
+        return "[" + ",".join((head or []) + self.encoded[start:] + (tail or [])) + "]"
+
+
+def encode_payload(payload: Dict[str, Any], **encoded_fields: str) -> str:
+    """JSON body of a payload with already JSON encoded fields added to it"""
+    fields = [json.dumps(payload)[1:-1]] if payload else []
+    fields += [f"{json.dumps(key)}: {value}" for key, value in encoded_fields.items()]
+    return "{" + ", ".join(fields) + "}"
+
+
+_current_buffers: ContextVar[Optional[Dict[str, MessageBuffer]]] = ContextVar("message_buffers", default=None)
+
+
+def start_message_buffers():
+    """Start a new set of buffers for the current request"""
+    _current_buffers.set({})
+
+
+def message_buffer(name: str, convert: Callable[[Message], Optional[Message]]) -> MessageBuffer:
+    """Buffer of the current request for a message format, created on first use"""
+    buffers = _current_buffers.get()
+    if buffers is None:
+        buffers = {}
+        _current_buffers.set(buffers)
+    buffer = buffers.get(name)
+    if buffer is None:
+        buffer = buffers[name] = MessageBuffer(convert)
+    return buffer
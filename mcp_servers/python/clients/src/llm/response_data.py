@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+
+@dataclass(slots=True)
+class SuccessResponseDataFormat:
+    """Data of a successful processor call.
+
+    Holds the raw provider response by reference, it is not copied. Supports
+    get() and [] like the dict the processors used to return.
+    """
+    total_llm_calls: int
+    total_tokens: int
+    total_input_tokens: int
+    total_output_tokens: int
+    final_llm_response: Dict[str, Any]
+    messages: List[str]
+    output_type: str
+    estimated_input_tokens: int = 0
+
+    @property
+    def llm_responses_arr(self) -> List[Dict[str, Any]]:
+        return [self.final_llm_response]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
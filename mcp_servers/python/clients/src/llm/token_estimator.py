@@ -0,0 +1,199 @@
+"""
+Local token counts of the requests the processors send, so that prompts that
+would overflow the model's context window are trimmed before sending instead of
+being rejected by the provider, and max_tokens fits in what is left.
+
+Uses tiktoken when it is installed. Without it, and for Gemini which has no
+local tokenizer, tokens are estimated from the text length.
+"""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.client_and_server_config import LlmContextConfig
+
+logger = logging.getLogger(__name__)
+
+# Tokens the OpenAI chat format adds per message, and to prime the reply
+OPENAI_MESSAGE_TOKENS = 3
+OPENAI_REPLY_TOKENS = 3
+# Tokens Gemini adds per content entry for the role and turn markers
+GEMINI_CONTENT_TOKENS = 4
+
+# Tokenizer used for models tiktoken does not know
+DEFAULT_ENCODING = "o200k_base"
+
+
+class ContextOverflowError(Exception):
+    """The prompt does not fit in the model's context window, even after trimming the history"""
+
+
+_tiktoken: Any = None
+
+
+def _load_tiktoken() -> Any:
+    global _tiktoken
+    if _tiktoken is None:
+        try:
+            import tiktoken
+            _tiktoken = tiktoken
+        except ImportError:
+            _tiktoken = False
+    return _tiktoken
+
+
+@lru_cache(maxsize=64)
+def _encoding(model: str) -> Any:
+    """tiktoken encoding of a model, or None to estimate from the text length"""
+    tiktoken = _load_tiktoken()
+    if not tiktoken or model.startswith("gemini"):
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as err:
+        # tiktoken downloads its encodings on first use, which fails on hosts without internet access
+        logger.warning(f"No tiktoken encoding for {model}, estimating tokens from the text length: {err}")
+        return None
+
+
+# Token counts by encoding and digest of the text, so cached entries do not keep large tool results alive
+_counts: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+
+
+def _count(encoding_name: Optional[str], text: str) -> int:
+    if encoding_name is None:
+        # About four characters per token for English and JSON
+        return (len(text) + 3) // 4
+    key = (encoding_name, hashlib.blake2b(text.encode(), digest_size=16).digest())
+    count = _counts.get(key)
+    if count is not None:
+        _counts.move_to_end(key)
+        return count
+    count = _counts[key] = len(_load_tiktoken().get_encoding(encoding_name).encode(text, disallowed_special=()))
+    if len(_counts) > LlmContextConfig["estimate_cache_size"]:
+        _counts.popitem(last=False)
+    return count
+
+
+def count_tokens(text: Any, model: str = "") -> int:
+    """Tokens of a text, or of a JSON value serialized as the providers receive it.
+
+    Counts are cached by a digest of the text, so every message of a chat history is only
+    tokenized once across the iterations of the agent loop.
+    """
+    if not isinstance(text, str):
+        text = json.dumps(text)
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    return _count(encoding.name if encoding is not None else None, text)
+
+
+def context_window(model: str) -> int:
+    """Context window of a model, from the longest matching prefix in LlmContextConfig"""
+    windows = LlmContextConfig["context_windows"]
+    matches = [prefix for prefix in windows if model.startswith(prefix)]
+    if not matches:
+        return LlmContextConfig["default_context_window"]
+    return windows[max(matches, key=len)]
+
+
+def available_output_tokens(model: str, prompt_tokens: int) -> int:
+    """Tokens left for the reply, after the prompt and a safety margin for estimation errors"""
+    window = context_window(model)
+    return window - prompt_tokens - int(window * LlmContextConfig["safety_margin"])
+
+
+def _fit(model: str, fixed_tokens: int, entry_tokens: List[int], can_start: List[bool], max_tokens: int) -> Tuple[int, int, int]:
+    """Number of leading history entries to drop, max_tokens to send and the prompt's tokens.
+
+    Entries are dropped oldest first until the reply gets max_tokens, or at
+    least min_output_tokens once nothing more can be dropped, and the history
+    then starts at an entry that can_start. The last entry, the current input,
+    is always kept.
+    """
+    prompt_tokens = fixed_tokens + sum(entry_tokens)
+    dropped = 0
+    while dropped < len(entry_tokens) - 1 and (
+        available_output_tokens(model, prompt_tokens) < max_tokens or (dropped and not can_start[dropped])
+    ):
+        prompt_tokens -= entry_tokens[dropped]
+        dropped += 1
+    available = available_output_tokens(model, prompt_tokens)
+    if available < min(max_tokens, LlmContextConfig["min_output_tokens"]):
+        raise ContextOverflowError(
+            f"Prompt of about {prompt_tokens} tokens does not fit the {context_window(model)} token context window of {model or 'the model'}"
+        )
+    return dropped, min(max_tokens, available), prompt_tokens
+
+
+def preflight_openai(messages: List[Dict[str, Any]], tools: List[Dict[str, Any]], model: str, max_tokens: int) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Fit an OpenAI or Azure OpenAI chat completion request in the model's context window.
+
+    Args:
+        messages: the messages array, starting with the system prompt
+        tools: the tool definitions sent with the request
+        model: model name, used to pick the tokenizer and context window
+        max_tokens: the reply's token limit requested by the caller
+
+    Returns:
+        The messages to send, with the oldest history dropped if needed, the
+        max_tokens to send and the estimated prompt tokens.
+    """
+    fixed_tokens = OPENAI_REPLY_TOKENS + (count_tokens(tools, model) if tools else 0)
+    history = messages
+    if messages and messages[0].get("role") == "system":
+        fixed_tokens += OPENAI_MESSAGE_TOKENS + count_tokens(messages[0].get("content", ""), model)
+        history = messages[1:]
+    entry_tokens = [
+        OPENAI_MESSAGE_TOKENS + count_tokens(m.get("content") or "", model) + (count_tokens(m["tool_calls"], model) if m.get("tool_calls") else 0)
+        for m in history
+    ]
+    # Tool messages have to follow the assistant message with their tool call
+    can_start = [m.get("role") != "tool" for m in history]
+
+    dropped, max_tokens, prompt_tokens = _fit(model, fixed_tokens, entry_tokens, can_start, max_tokens)
+    if dropped:
+        messages = messages[:len(messages) - len(history)] + history[dropped:]
+    return messages, max_tokens, prompt_tokens
+
+
+def preflight_gemini(payload: Dict[str, Any], model: str, max_tokens: int, tools_json: Optional[str] = None) -> Tuple[Dict[str, Any], int, int]:
+    """Fit a Gemini generateContent payload in the model's context window.
+
+    Args:
+        payload: the request payload, with system_instruction and contents
+        model: model name, used to pick the context window
+        max_tokens: the reply's token limit requested by the caller
+        tools_json: the payload's tools, JSON encoded, if they are sent separately
+
+    Returns:
+        The payload to send, with the oldest contents dropped if needed, the
+        maxOutputTokens to send and the estimated prompt tokens.
+    """
+    fixed_tokens = sum(count_tokens(part.get("text", ""), model) for part in payload.get("system_instruction", {}).get("parts", []))
+    if payload.get("tools"):
+        fixed_tokens += count_tokens(payload["tools"], model)
+    if tools_json:
+        fixed_tokens += count_tokens(tools_json, model)
+    contents = payload.get("contents", [])
+    entry_tokens = [
+        GEMINI_CONTENT_TOKENS + sum(count_tokens(part.get("text") or part, model) for part in content.get("parts", []))
+        for content in contents
+    ]
+    # Contents have to start with a user turn, and function responses have to follow their function calls
+    can_start = [
+        content.get("role") == "user" and not any("functionResponse" in part for part in content.get("parts", []))
+        for content in contents
+    ]
+
+    dropped, max_tokens, prompt_tokens = _fit(model, fixed_tokens, entry_tokens, can_start, max_tokens)
+    if dropped:
+        payload = {**payload, "contents": contents[dropped:]}
+    return payload, max_tokens, prompt_tokens
@@ -0,0 +1,112 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Any, Optional
+
+from src.client_and_server_config import LoggingConfig
+
+# Attributes every LogRecord has; anything else was passed through `extra` and is a structured field
+_RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed with `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text lines with structured fields appended as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [f"{key}={value}" for key, value in record.__dict__.items() if key not in _RESERVED_RECORD_ATTRS]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+def setup_logging():
+    """Route all logging through a queue so callers never block on stdout.
+
+    Log records are put on an unbounded in-memory queue and written by a
+    background thread. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    if LoggingConfig["format"] == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(LoggingConfig["level"].upper())
+
+    for item in filter(None, (part.strip() for part in LoggingConfig["module_levels"].split(","))):
+        name, _, level = item.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush the queue and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def truncate(value: Any, limit: Optional[int] = None) -> str:
+    """Render a payload for logging, capped to the configured number of characters"""
+    limit = LoggingConfig["max_payload_chars"] if limit is None else limit
+    if isinstance(value, str):
+        text = value
+    else:
+        try:
+            text = json.dumps(value, default=str)
+        except (TypeError, ValueError):
+            text = str(value)
+    if len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+
+def log_sampled(logger: logging.Logger, message: str, payload: Any = None, level: int = logging.DEBUG, **fields):
+    """Log a verbose event for a sample of calls only.
+
+    The level and sampling checks run before the payload is rendered, so skipped
+    events cost next to nothing.
+    """
+    if not logger.isEnabledFor(level) or random.random() >= LoggingConfig["verbose_sample_rate"]:
+        return
+    if payload is not None:
+        fields["payload"] = truncate(payload)
+    logger.log(level, message, extra=fields)
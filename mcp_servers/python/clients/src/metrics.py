@@ -0,0 +1,366 @@
+import json
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from fast in-process stages up to long agent loops
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _sum_values(values: List[Dict[Tuple[str, ...], float]]) -> Dict[Tuple[str, ...], float]:
+    merged: Dict[Tuple[str, ...], float] = {}
+    for values_by_labels in values:
+        for labelvalues, value in values_by_labels.items():
+            merged[labelvalues] = merged.get(labelvalues, 0) + value
+    return merged
+
+
+class Histogram:
+    """Prometheus style histogram.
+
+    Updates happen on the event loop thread only, so plain dict and list
+    operations are enough and no locking is needed on the hot path.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labelvalues -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        return self._series
+
+    @staticmethod
+    def merge(values: List[Dict[Tuple[str, ...], List[float]]]) -> Dict[Tuple[str, ...], List[float]]:
+        merged: Dict[Tuple[str, ...], List[float]] = {}
+        for series_by_labels in values:
+            for labelvalues, series in series_by_labels.items():
+                total = merged.get(labelvalues)
+                merged[labelvalues] = list(series) if total is None else [a + b for a, b in zip(total, series)]
+        return merged
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], List[float]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labelvalues, series in (self._series if values is None else values).items():
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += series[index]
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Prometheus style counter, updated from the event loop thread only"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        return self._values
+
+    @staticmethod
+    def merge(values: List[Dict[Tuple[str, ...], float]]) -> Dict[Tuple[str, ...], float]:
+        return _sum_values(values)
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in (self._values if values is None else values).items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Prometheus style gauge.
+
+    Values are either set directly or computed at scrape time by a callback,
+    which keeps things like queue depths off the hot path entirely.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) - amount
+
+    def set(self, value: float, *labelvalues: str):
+        self._values[labelvalues] = value
+
+    def set_function(self, callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Compute the gauge values when metrics are scraped"""
+        self._callback = callback
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        return self._callback() if self._callback else self._values
+
+    @staticmethod
+    def merge(values: List[Dict[Tuple[str, ...], float]]) -> Dict[Tuple[str, ...], float]:
+        # Summed over the workers, e.g. the SSE streams open on any of them
+        return _sum_values(values)
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labelvalues, value in (self.values() if values is None else values).items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values of every metric, as JSON"""
+        return {metric.name: [[list(labelvalues), value] for labelvalues, value in metric.values().items()] for metric in self._metrics}
+
+    def render(self, snapshots: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Exposition text of this process' metrics, or of the sum of several snapshots"""
+        lines = []
+        for metric in self._metrics:
+            values = None
+            if snapshots is not None:
+                values = metric.merge([
+                    {tuple(labelvalues): value for labelvalues, value in snapshot.get(metric.name, [])}
+                    for snapshot in snapshots
+                ])
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, directory: str):
+        """Write this worker's metrics to the directory shared by the workers"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "metrics": self.snapshot()}, f)
+        os.replace(temp_path, path)
+
+    def render_shared(self, directory: str) -> str:
+        """Exposition text of the metrics of every worker writing to the directory.
+
+        This worker's snapshot is written first, so its values are current, the
+        other workers' are as of their last write_snapshot. Counters and
+        histograms of stopped workers keep counting, their gauges are left out.
+        """
+        self.write_snapshot(directory)
+        gauges = {metric.name for metric in self._metrics if isinstance(metric, Gauge)}
+        snapshots = []
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            metrics = data.get("metrics", {})
+            if not _is_running(data.get("pid")):
+                metrics = {metric: values for metric, values in metrics.items() if metric not in gauges}
+            snapshots.append(metrics)
+        return self.render(snapshots)
+
+
+def clear_snapshots(directory: str):
+    """Remove the snapshots of a previous run, before the workers start"""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".tmp")):
+            os.remove(os.path.join(directory, name))
+
+
+def _is_running(pid: Any) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+REGISTRY = Registry()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "mcp_client_stage_duration_seconds",
+    "Time spent in each stage of the request pipeline",
+    ("stage",),
+))
+
+REQUESTS = REGISTRY.register(Counter(
+    "mcp_client_requests_total",
+    "HTTP requests handled, by endpoint, selected client and status code",
+    ("endpoint", "client", "status"),
+))
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "mcp_client_request_duration_seconds",
+    "HTTP request latency until the response is returned, by endpoint and selected client",
+    ("endpoint", "client"),
+))
+
+STREAM_DURATION = REGISTRY.register(Histogram(
+    "mcp_client_stream_duration_seconds",
+    "Time SSE streams stay open, by selected client",
+    ("client",),
+))
+
+LLM_CALLS = REGISTRY.register(Counter(
+    "mcp_client_llm_calls_total",
+    "LLM provider calls, by provider and outcome",
+    ("provider", "status"),
+))
+
+LLM_TOKENS = REGISTRY.register(Counter(
+    "mcp_client_llm_tokens_total",
+    "Tokens reported by the LLM providers, by provider and token type",
+    ("provider", "type"),
+))
+
+TOOL_CALLS = REGISTRY.register(Counter(
+    "mcp_client_tool_calls_total",
+    "MCP tool calls, by server, tool and outcome",
+    ("server", "tool", "status"),
+))
+
+TOOL_CALL_DURATION = REGISTRY.register(Histogram(
+    "mcp_client_tool_call_duration_seconds",
+    "MCP tool call latency, by server and tool",
+    ("server", "tool"),
+))
+
+SSE_STREAMS_OPEN = REGISTRY.register(Gauge(
+    "mcp_client_sse_streams_open",
+    "SSE streams currently open",
+))
+
+SSE_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "mcp_client_sse_queue_depth",
+    "Events waiting to be written to SSE clients, summed over open streams",
+))
+
+GOOGLE_API_RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "mcp_client_google_api_rate_limit_wait_seconds",
+    "Time a tool call spent waiting on the server's Google API rate limiter and retry backoff, by server and tool",
+    ("server", "tool"),
+))
+
+GOOGLE_API_THROTTLED = REGISTRY.register(Counter(
+    "mcp_client_google_api_throttled_total",
+    "Google API requests rejected for exceeding a rate limit, by server and tool",
+    ("server", "tool"),
+))
+
+GOOGLE_API_RETRIES = REGISTRY.register(Counter(
+    "mcp_client_google_api_retries_total",
+    "Google API requests retried by the server, by server and tool",
+    ("server", "tool"),
+))
+
+CONVERSATIONS_IN_MEMORY = REGISTRY.register(Gauge(
+    "mcp_client_conversations_in_memory",
+    "Conversations cached in memory by the conversation store",
+))
+
+CONVERSATION_MEMORY_BYTES = REGISTRY.register(Gauge(
+    "mcp_client_conversation_memory_bytes",
+    "Approximate size of the conversations cached in memory, in bytes of JSON",
+))
+
+REQUESTS_STOPPED = REGISTRY.register(Counter(
+    "mcp_client_requests_stopped_total",
+    "Requests stopped before the final answer because their budget ran out, by selected client and reason",
+    ("client", "reason"),
+))
+
+REQUESTS_ABANDONED = REGISTRY.register(Counter(
+    "mcp_client_requests_abandoned_total",
+    "Requests whose HTTP client went away before the response was complete, by endpoint and selected client",
+    ("endpoint", "client"),
+))
+
+CANCELLED_TOOL_CALL_SECONDS = REGISTRY.register(Counter(
+    "mcp_client_cancelled_tool_call_seconds_total",
+    "Time MCP tool calls had been running when they were cancelled or timed out, i.e. server work thrown away, by server and tool",
+    ("server", "tool"),
+))
+
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_client_admission_in_flight",
+    "Requests holding a slot of an admission limit, by scope (endpoint or client) and name",
+    ("scope", "name"),
+))
+
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "mcp_client_admission_queued",
+    "Requests waiting for a slot of an admission limit, by scope (endpoint or client) and name",
+    ("scope", "name"),
+))
+
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "mcp_client_admission_wait_seconds",
+    "Time requests waited to be admitted, by endpoint",
+    ("endpoint",),
+))
+
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "mcp_client_admission_rejected_total",
+    "Requests turned away by an admission limit, by scope, name and reason (queue_full or queue_timeout)",
+    ("scope", "name", "reason"),
+))
@@ -1,13 +1,15 @@
 import os
 import asyncio
+import logging
 import warnings
 from typing import Dict, Any
 
+import anyio
 from contextlib import AsyncExitStack
-from src.client_and_server_config import ServersConfig
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from src.client_and_server_config import ServersConfig, DeploymentConfig
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client, get_default_environment
+from mcp.types import CancelledNotification, CancelledNotificationParams, ClientNotification, ToolListChangedNotification
 
 # Suppress warnings about unclosed transports
 warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed transport .*")
@@ -16,50 +18,203 @@ warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed tr
 # Suppress specific ResourceWarning related to unclosed transport
 warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed transport .*")
 
+logger = logging.getLogger(__name__)
+
 # Global session store
 MCPServers: Dict[str, ClientSession] = {}
 
+class ToolCachingClientSession(ClientSession):
+    """ClientSession that caches the tool list of servers announcing tool list changes.
+
+    The cache is only used when the server advertises tools.listChanged, and is
+    dropped whenever it sends notifications/tools/list_changed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache_tools = False
+        self._tools = None
+        # Bumped on every list_changed, so a listing in flight is not cached after it
+        self._tools_generation = 0
+
+    async def initialize(self):
+        result = await super().initialize()
+        tools_capability = result.capabilities.tools
+        self._cache_tools = DeploymentConfig["cache_tool_lists"] and bool(tools_capability and tools_capability.listChanged)
+        return result
+
+    async def list_tools(self, *args, **kwargs):
+        if not self._cache_tools or args or kwargs:
+            return await super().list_tools(*args, **kwargs)
+        if self._tools is None:
+            generation = self._tools_generation
+            tools = await super().list_tools()
+            if generation != self._tools_generation:
+                return tools
+            self._tools = tools
+        return self._tools
+
+    async def _received_notification(self, notification):
+        if isinstance(notification.root, ToolListChangedNotification):
+            logger.debug("Tool list changed, dropping the cached tools")
+            self._tools = None
+            self._tools_generation += 1
+        await super()._received_notification(notification)
+
+
+class CancellingClientSession(ToolCachingClientSession):
+    """ClientSession that tells the server about requests it stopped waiting for.
+
+    When the task awaiting a request is cancelled, e.g. because the HTTP client
+    disconnected or the tool call timed out, notifications/cancelled is sent for
+    the request ID so the server can stop the work instead of finishing it for nobody.
+    """
+
+    async def send_request(self, *args, **kwargs):
+        # send_request takes the next ID without awaiting anything first
+        request_id = self._request_id
+        try:
+            return await super().send_request(*args, **kwargs)
+        except asyncio.CancelledError:
+            if DeploymentConfig["cancel_abandoned_calls"]:
+                with anyio.CancelScope(shield=True):
+                    await self._send_cancelled(request_id)
+            raise
+
+    async def _send_cancelled(self, request_id: int):
+        try:
+            await self.send_notification(ClientNotification(CancelledNotification(
+                method="notifications/cancelled",
+                params=CancelledNotificationParams(requestId=request_id, reason="The client stopped waiting for the result"),
+            )))
+        except Exception as err:
+            logger.debug(f"Could not send notifications/cancelled for request {request_id}: {err}")
+
+
+# Background tasks owning lazily started servers, and the locks guarding their startup
+_lazy_server_tasks: Dict[str, asyncio.Task] = {}
+_lazy_server_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def initialize_mcp_server(exit_stack, server: Dict[str, Any]) -> ClientSession:
+    """Start a single MCP server over stdio and register its session in MCPServers"""
+    logger.info(f"Initializing {server['server_name']} mcp server")
+    logger.debug(
+        "Server launch details",
+        extra={"server": server["server_name"], "command": server["command"], "args": server["args"], "cwd": os.getcwd()}
+    )
+
+    # Optional directory existence check
+    if "--directory" in server["args"]:
+        dir_index = server["args"].index("--directory")
+        if dir_index + 1 < len(server["args"]):
+            relative_path = server["args"][dir_index + 1]
+            absolute_path = os.path.abspath(relative_path)
+            logger.debug(
+                "Server directory",
+                extra={"relative_path": relative_path, "absolute_path": absolute_path, "exists": os.path.exists(absolute_path)}
+            )
+
+    # Start stdio client
+    # stdio_client only passes a small default environment to the server, forward the configured variables
+    env = None
+    forwarded = {name: os.environ[name] for name in server.get("env", []) if name in os.environ}
+    if forwarded:
+        env = {**get_default_environment(), **forwarded}
+    command, args, cwd = server["command"], server["args"], None
+    direct_exec = server.get("direct_exec")
+    if DeploymentConfig["direct_server_exec"] and direct_exec:
+        executable = os.path.join(direct_exec["cwd"], direct_exec["command"])
+        if os.path.exists(executable):
+            command, args, cwd = os.path.abspath(executable), direct_exec["args"], direct_exec["cwd"]
+        else:
+            logger.warning(f"{executable} not found, starting {server['server_name']} with {server['command']}")
+    server_params = StdioServerParameters(command=command, args=args, env=env, cwd=cwd)
+    stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
+    stdio, write = stdio_transport
+
+    session = await exit_stack.enter_async_context(CancellingClientSession(stdio, write))
+    await session.initialize()
+
+
+    # Save session globally
+    MCPServers[server["server_name"]] = session
+
+    # Confirm connection
+    tools_response = await session.list_tools()
+    tool_names = [tool.name for tool in tools_response.tools]
+    logger.info(f"Connected to {server['server_name']} mcp server", extra={"tools": len(tool_names)})
+    logger.debug(f"{server['server_name']} tools: {tool_names}")
+
+    return session
+
 
 async def initialize_all_mcp(exit_stack):
     """Initialize all MCP clients based on server configuration"""
     for server in ServersConfig:
         try:
-            print(f"\n================= Initializing {server['server_name']} mcp server start ===============")
-            print(f"Server name        : {server['server_name']}")
-            print(f"Server command     : {server['command']}")
-            print(f"Server args        : {server['args']}")
-            print(f"cwd                : {os.getcwd()}")
-
-            # Optional directory existence check
-            if "--directory" in server["args"]:
-                dir_index = server["args"].index("--directory")
-                if dir_index + 1 < len(server["args"]):
-                    relative_path = server["args"][dir_index + 1]
-                    absolute_path = os.path.abspath(relative_path)
-                    print(f"Relative path      : {relative_path}")
-                    print(f"Absolute path      : {absolute_path}")
-                    print(f"Path exists        : {os.path.exists(absolute_path)}")
-
-            # Start stdio client
-            server_params = StdioServerParameters(command=server["command"], args=server["args"])
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
-            await session.initialize()
-
-
-            # Save session globally
-            MCPServers[server["server_name"]] = session
-
-            # Confirm connection
-            tools_response = await session.list_tools()
-            tool_names = [tool.name for tool in tools_response.tools]
-            print(f"Connected to {server['server_name']} with tools: {tool_names}")
-            print(f"\n================= Initializing {server['server_name']} mcp server end ===============")
-
+            await initialize_mcp_server(exit_stack, server)
         except Exception as err:
-            print(f"Error initializing {server['server_name']} mcp server =========>>>> {err}")
+            logger.error(f"Error initializing {server['server_name']} mcp server: {err}")
             continue
 
-    return True
\ No newline at end of file
+    return True
+
+
+async def _run_lazy_mcp_server(server: Dict[str, Any], ready: asyncio.Future):
+    """Own the stdio transport and session of a lazily started server until cancelled.
+
+    The transport contexts have to be entered and exited from the same task, so each
+    lazily started server gets a dedicated task instead of sharing the app exit stack.
+    """
+    try:
+        async with AsyncExitStack() as exit_stack:
+            await initialize_mcp_server(exit_stack, server)
+            ready.set_result(True)
+            await asyncio.Event().wait()
+    except Exception as err:
+        if not ready.done():
+            ready.set_exception(err)
+    finally:
+        MCPServers.pop(server["server_name"], None)
+
+
+async def ensure_mcp_server(server_name: str) -> bool:
+    """Make sure the named server is running, starting it on first use when lazy startup is enabled.
+
+    Concurrent requests for the same server wait for a single startup instead of
+    spawning duplicate server processes. Without lazy startup every server is
+    started with the worker, so one that is not running is reported as missing.
+    """
+    if server_name in MCPServers:
+        return True
+    if not DeploymentConfig["lazy_server_startup"]:
+        return False
+
+    server = next((s for s in ServersConfig if s["server_name"] == server_name), None)
+    if server is None:
+        return False
+
+    lock = _lazy_server_locks.setdefault(server_name, asyncio.Lock())
+    async with lock:
+        if server_name in MCPServers:
+            return True
+
+        ready = asyncio.get_running_loop().create_future()
+        _lazy_server_tasks[server_name] = asyncio.create_task(_run_lazy_mcp_server(server, ready))
+        try:
+            await ready
+        except Exception as err:
+            logger.error(f"Error initializing {server_name} mcp server: {err}")
+            return False
+
+    return server_name in MCPServers
+
+
+async def shutdown_lazy_mcp():
+    """Stop every lazily started server"""
+    tasks = list(_lazy_server_tasks.values())
+    _lazy_server_tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
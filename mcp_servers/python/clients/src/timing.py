@@ -0,0 +1,91 @@
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from src.metrics import STAGE_DURATION
+
+# Prefix the MCP-GSUITE server puts in front of the timings it returns with a tool result
+SERVER_TIMINGS_PREFIX = "__timings__:"
+
+
+class RequestTimings:
+    """Per-request latency breakdown, returned to the caller in the response Data"""
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, started: float, duration: float, **attributes):
+        span = {
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if attributes:
+            span.update(attributes)
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span["name"]] = round(stages.get(span["name"], 0.0) + span["duration_ms"], 3)
+        return {
+            "request_id": self.request_id,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": stages,
+            "spans": self.spans,
+        }
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings(request_id: Optional[str] = None) -> RequestTimings:
+    """Start collecting spans for the current request"""
+    timings = RequestTimings(request_id)
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def record_span(name: str, started: float, duration: float, **attributes):
+    """Record an already measured span on the current request and in the stage histogram"""
+    STAGE_DURATION.observe(duration, name)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, started, duration, **attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block of the request pipeline. Works around awaits as well."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, started, time.perf_counter() - started, **attributes)
+
+
+def record_server_timings(server_timings: Dict[str, Any], client_started: float, client_duration: float):
+    """Split a tool call into stdio transit, server handler and Google API time.
+
+    server_timings is the breakdown returned by the MCP server for the call,
+    client_duration the round trip measured around session.call_tool.
+    """
+    handler_seconds = server_timings.get("handler_ms", 0.0) / 1000
+    google_api_seconds = server_timings.get("google_api_ms", 0.0) / 1000
+    rate_limit_seconds = server_timings.get("rate_limit_wait_ms", 0.0) / 1000
+    tool = server_timings.get("tool")
+
+    record_span("tool.stdio", client_started, max(client_duration - handler_seconds, 0.0), tool=tool)
+    record_span("tool.server_handler", client_started, max(handler_seconds - google_api_seconds - rate_limit_seconds, 0.0), tool=tool)
+    record_span("tool.google_api", client_started, google_api_seconds, tool=tool, calls=server_timings.get("google_api_calls", 0))
+    if rate_limit_seconds or server_timings.get("retries"):
+        record_span("tool.rate_limit_wait", client_started, rate_limit_seconds, tool=tool,
+                    throttled=server_timings.get("throttled", 0), retries=server_timings.get("retries", 0))
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Run from mcp_servers/python/clients, like run.py, so `src` is importable
+sys.path.insert(0, os.path.join(TESTS_DIR, ".."))
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    """Base URL of the stub LLM providers and Google APIs of benchmarks/stubs.py, served on a thread."""
+    pytest.importorskip("aiohttp")
+    from aiohttp import web
+
+    sys.path.insert(0, os.path.join(TESTS_DIR, "..", "benchmarks"))
+    import stubs
+
+    settings = stubs.StubSettings(llm_latency_ms=0, google_latency_ms=0, jitter=0, tool=stubs.DEFAULT_TOOL,
+                                  tool_args=stubs.DEFAULT_TOOL_ARGS, messages=1)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(stubs.create_app(settings))
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{port}"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.run_until_complete(runner.cleanup())
@@ -0,0 +1,22 @@
+import pytest
+
+from src.budget import start_budget
+from src.client_and_server_config import RequestBudgetConfig
+
+
+def test_callers_can_lower_the_limits():
+    budget = start_budget({"timeout_seconds": "5", "max_iterations": 2})
+    assert budget.remaining() <= 5
+    assert budget.max_iterations == 2
+
+
+def test_callers_cannot_raise_the_limits():
+    budget = start_budget({"max_iterations": RequestBudgetConfig["max_iterations"] + 5})
+    assert budget.max_iterations == RequestBudgetConfig["max_iterations"]
+
+
+@pytest.mark.parametrize("value", ["abc", 0, -1, float("nan"), True, [1]])
+def test_invalid_limits_are_ignored(value):
+    budget = start_budget({"timeout_seconds": value, "max_iterations": value})
+    assert not budget.expired()
+    assert budget.max_iterations == RequestBudgetConfig["max_iterations"]
@@ -0,0 +1,27 @@
+from src.conversation_store import keep_latest
+
+TOOL_CALL = {"role": "assistant", "content": None, "tool_calls": [{"id": "call_1", "type": "function"}]}
+TOOL_RESULT = {"role": "tool", "tool_call_id": "call_1", "name": "query_gmail_emails", "content": "[]"}
+ANSWER = {"role": "assistant", "content": "No unread mail"}
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def test_keep_latest_drops_whole_turns():
+    history = [user("first"), TOOL_CALL, TOOL_RESULT, ANSWER, user("second"), TOOL_CALL, TOOL_RESULT, ANSWER]
+    assert keep_latest(history, 8) == history
+    assert keep_latest(history, 6) == history[4:]
+
+
+def test_keep_latest_never_starts_with_a_tool_result():
+    history = [user("first"), TOOL_CALL, TOOL_RESULT, TOOL_CALL, TOOL_RESULT, ANSWER]
+    assert keep_latest(history, 4) == [TOOL_CALL, TOOL_RESULT, ANSWER]
+
+
+def test_keep_latest_gemini_function_responses():
+    call = {"role": "model", "parts": [{"functionCall": {"name": "query_gmail_emails", "args": {}}}]}
+    result = {"role": "user", "parts": [{"functionResponse": {"name": "query_gmail_emails", "response": {}}}]}
+    history = [user("first"), call, result, {"role": "model", "parts": [{"text": "Done"}]}, user("second")]
+    assert keep_latest(history, 3) == [user("second")]
@@ -0,0 +1,30 @@
+import json
+
+from src.llm.gemini_declarations import gemini_tools
+
+
+def tool(name):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": "Query Gmail emails",
+            "parameters": {"type": "object", "properties": {"query": {"type": ["string", "null"]}}, "required": ["query"]},
+        },
+    }
+
+
+def test_declarations():
+    converted = gemini_tools([tool("query_gmail_emails")])
+    declaration = converted.tools[0]["functionDeclarations"][0]
+    assert declaration["parameters"]["properties"]["query"] == {"type": "string", "nullable": True}
+    assert json.loads(converted.encoded) == converted.tools
+
+
+def test_list_changed_in_place_is_converted_again():
+    tools = [tool("query_gmail_emails")]
+    gemini_tools(tools)
+    tools[0]["function"]["name"] = "send_email"
+    tools.append(tool("list_calendars"))
+    names = [d["name"] for d in gemini_tools(tools).tools[0]["functionDeclarations"]]
+    assert names == ["send_email", "list_calendars"]
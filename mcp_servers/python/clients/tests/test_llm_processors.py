@@ -0,0 +1,64 @@
+"""
+Smoke tests of the LLM processors: each one is imported the way
+get_llm_processor does, and runs one call against the stub providers of
+benchmarks/stubs.py.
+"""
+import asyncio
+import importlib
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src.client_and_server_config import ClientsConfig, LlmEndpointsConfig, LlmProcessorsConfig
+
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "query_gmail_emails",
+        "description": "Query Gmail emails",
+        "parameters": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+    },
+}]
+
+REQUESTS = {
+    "MCP_CLIENT_AZURE_AI": {"chat_model": "gpt-4o", "deployment_id": "gpt-4o", "api_version": "2024-06-01"},
+    "MCP_CLIENT_OPENAI": {"chat_model": "gpt-4o"},
+    "MCP_CLIENT_GEMINI": {"chat_model": "gemini-2.0-flash"},
+}
+
+
+def processor(client: str):
+    module_name, function_name = LlmProcessorsConfig[client]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+@pytest.mark.parametrize("client", ClientsConfig)
+def test_processor_imports(client):
+    assert callable(processor(client))
+
+
+@pytest.mark.parametrize("client", ClientsConfig)
+def test_processor_requires_api_key(client):
+    response = asyncio.run(processor(client)({"input": "hi", "prompt": "You are helpful"}))
+    assert response.Status is False
+    assert response.Data is None
+
+
+@pytest.mark.parametrize("client", ClientsConfig)
+def test_processor_calls_provider(client, stub_url, monkeypatch):
+    monkeypatch.setitem(LlmEndpointsConfig, "openai", f"{stub_url}/v1")
+    monkeypatch.setitem(LlmEndpointsConfig, "gemini", f"{stub_url}/v1beta")
+    data = {
+        "input": "Any unread mail?",
+        "prompt": "You are a helpful assistant",
+        "api_key": "test",
+        "endpoint": stub_url,
+        "chat_history": [{"role": "user", "content": "Any unread mail?"}],
+        "tools": TOOLS,
+        **REQUESTS[client],
+    }
+    response = asyncio.run(processor(client)(data))
+    assert response.Status is True, response.Error
+    assert response.Data.total_llm_calls == 1
+    assert response.Data.output_type == "tool_call"
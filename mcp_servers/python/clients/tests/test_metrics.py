@@ -0,0 +1,38 @@
+import json
+import os
+
+from src.metrics import Counter, Gauge, Histogram, Registry, clear_snapshots
+
+
+def worker_metrics():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ("endpoint",)))
+    duration = registry.register(Histogram("duration_seconds", "Duration", buckets=(1.0,)))
+    streams = registry.register(Gauge("streams_open", "Streams"))
+    return registry, requests, duration, streams
+
+
+def test_render_shared_sums_the_workers(tmp_path):
+    registry, requests, duration, streams = worker_metrics()
+    requests.inc("/a")
+    duration.observe(0.5)
+    streams.inc()
+
+    # Another worker still running, and a stopped one
+    other, other_requests, other_duration, other_streams = worker_metrics()
+    other_requests.inc("/a", amount=2)
+    other_duration.observe(2.0)
+    other_streams.inc(amount=3)
+    snapshot = other.snapshot()
+    (tmp_path / "running.json").write_text(json.dumps({"pid": os.getppid(), "metrics": snapshot}))
+    (tmp_path / "stopped.json").write_text(json.dumps({"pid": 999999999, "metrics": snapshot}))
+
+    lines = registry.render_shared(str(tmp_path)).splitlines()
+    assert 'requests_total{endpoint="/a"} 5' in lines
+    assert 'duration_seconds_bucket{le="1"} 1' in lines
+    assert "duration_seconds_count 3" in lines
+    # The stopped worker's gauges are left out
+    assert "streams_open 4" in lines
+
+    clear_snapshots(str(tmp_path))
+    assert os.listdir(tmp_path) == []
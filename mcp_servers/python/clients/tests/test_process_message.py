@@ -0,0 +1,120 @@
+"""
+Requests through the process_message endpoint, with a stand-in MCP session
+and without any provider behind the processors.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("quart")
+pytest.importorskip("aiohttp")
+
+import run
+from src.client_and_server_config import DeploymentConfig, LlmContextConfig, LlmEndpointsConfig
+from src import server_connection
+from src.server_connection import MCPServers
+
+SERVER = "MCP-GSUITE"
+
+
+class ToolsOnlySession:
+    """Answers list_tools like an MCP session, tool calls are not expected"""
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[])
+
+
+class MailSession(ToolsOnlySession):
+    """Has the one tool the stub LLM providers call, and answers its calls"""
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[SimpleNamespace(
+            name="query_gmail_emails",
+            description="Query Gmail emails",
+            inputSchema={"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+        )])
+
+    async def call_tool(self, name, arguments):
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="[]")], isError=False)
+
+
+@pytest.fixture
+def mcp_server(monkeypatch):
+    monkeypatch.setitem(MCPServers, SERVER, ToolsOnlySession())
+
+
+@pytest.fixture
+def mail_server(monkeypatch):
+    monkeypatch.setitem(MCPServers, SERVER, MailSession())
+
+
+def post(payload):
+    async def request():
+        response = await run.app.test_client().post("/api/v1/mcp/process_message", json=payload)
+        return response.status_code, await response.get_json()
+    return asyncio.run(request())
+
+
+def payload(client: str, **client_details):
+    return {
+        "selected_client": client,
+        "selected_servers": [SERVER],
+        "selected_server_credentials": {SERVER: {}},
+        "client_details": {"input": "Any unread mail?", "prompt": "You are a helpful assistant", "api_key": "test", **client_details},
+    }
+
+
+@pytest.mark.parametrize("client", ["MCP_CLIENT_OPENAI", "MCP_CLIENT_AZURE_AI", "MCP_CLIENT_GEMINI"])
+def test_context_overflow_is_a_json_error(client, mcp_server, monkeypatch):
+    monkeypatch.setitem(LlmContextConfig, "context_windows", {"tiny": 100})
+    monkeypatch.setitem(LlmContextConfig, "default_context_window", 100)
+
+    status, body = post(payload(client, chat_model="tiny-model", deployment_id="tiny-model", endpoint="http://127.0.0.1:9"))
+
+    assert status == 200
+    assert body["Status"] is False
+    assert body["Error"]["type"] == "context_overflow"
+    assert "context window" in body["Error"]["message"]
+
+
+@pytest.mark.parametrize("client", ["MCP_CLIENT_OPENAI", "MCP_CLIENT_AZURE_AI", "MCP_CLIENT_GEMINI"])
+def test_exhausted_budget_is_a_stopped_result(client, mcp_server):
+    # The deadline passes before the first LLM call is sent
+    status, body = post(payload(client, chat_model="gpt-4o", deployment_id="gpt-4o", endpoint="http://127.0.0.1:9", timeout_seconds=1e-9))
+
+    assert status == 200
+    assert body["Status"] is False
+    assert body["Error"] == "Stopped before the final answer, request budget exhausted: deadline"
+    assert body["Data"]["stopped_reason"] == "deadline"
+
+
+def test_gemini_agent_loop_keeps_the_function_declarations(mail_server, stub_url, monkeypatch):
+    monkeypatch.setitem(LlmEndpointsConfig, "gemini", f"{stub_url}/v1beta")
+
+    # The stub rejects function calls and responses sent without declarations, like Gemini
+    status, body = post(payload("MCP_CLIENT_GEMINI", chat_model="gemini-2.0-flash"))
+
+    assert status == 200
+    assert body["Status"] is True, body["Error"]
+    assert body["Data"]["output_type"] == "text"
+    assert [call["name"] for call in body["Data"]["executed_tool_calls"]] == ["query_gmail_emails"]
+
+
+def test_missing_server_is_not_started_without_lazy_startup(monkeypatch):
+    monkeypatch.setitem(DeploymentConfig, "lazy_server_startup", False)
+    monkeypatch.delitem(MCPServers, SERVER, raising=False)
+
+    started = []
+
+    async def start(server, ready):
+        started.append(server["server_name"])
+        ready.set_exception(RuntimeError("Not started in tests"))
+    monkeypatch.setattr(server_connection, "_run_lazy_mcp_server", start)
+
+    status, body = post(payload("MCP_CLIENT_OPENAI", chat_model="gpt-4o"))
+
+    assert status == 200
+    assert body["Status"] is False
+    assert body["Error"] == "Invalid Server"
+    assert started == []
@@ -0,0 +1,65 @@
+"""
+Benchmark bulk_get_gmail_emails against a stub Gmail server with injected latency.
+
+Compares fetching the messages one at a time with the concurrent bulk fetch
+used by the tool, for several batch sizes:
+
+    uv run python benchmarks/bulk_fetch.py --latency-ms 50 --sizes 1,10,50
+
+Run it from the mcp-gsuite directory.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from google_stub import STUB_CREDENTIALS, GoogleStubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk Gmail message fetches")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latency injected per Gmail request")
+    parser.add_argument("--sizes", default="1,10,50", help="Comma separated batch sizes")
+    parser.add_argument("--workers", type=int, help="Override MCP_GSUITE_BULK_FETCH_WORKERS")
+    args = parser.parse_args()
+
+    stub = GoogleStubServer(latency_ms=args.latency_ms).start()
+    os.environ["GSUITE_API_ENDPOINT"] = stub.url
+    if args.workers:
+        os.environ["MCP_GSUITE_BULK_FETCH_WORKERS"] = str(args.workers)
+
+    from mcp_gsuite import gmail
+
+    service = gmail.GmailService(credentials=STUB_CREDENTIALS)
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        # One unknown ID per batch to exercise the per-ID error reporting
+        email_ids = [f"m{i:05d}" for i in range(size - 1)] + ["missing-0"]
+
+        started = time.perf_counter()
+        serial = [service.get_email_by_id_with_attachments(email_id)[0] for email_id in email_ids]
+        serial_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        emails, errors = service.get_emails_by_ids_with_attachments(email_ids)
+        bulk_s = time.perf_counter() - started
+
+        assert len(emails) == sum(email is not None for email in serial) and list(errors) == ["missing-0"]
+        results.append({
+            "batch_size": size,
+            "serial_ms": round(serial_s * 1000, 1),
+            "bulk_ms": round(bulk_s * 1000, 1),
+            "serial_msgs_per_s": round(size / serial_s, 1),
+            "bulk_msgs_per_s": round(size / bulk_s, 1),
+            "speedup": round(serial_s / bulk_s, 2),
+        })
+
+    stub.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Measure what the partial response masks save per tool.
+
+Runs the service calls behind each read tool against two stub servers: one that
+ignores 'format' and 'fields' and serves full resources, as the API did before
+the masks were added, and one that applies them like the real APIs. For each
+tool it reports the response bytes per call and the time per call. The stub adds
+no latency, so the time is transfer plus JSON decoding plus parsing.
+
+    uv run python benchmarks/field_masks.py --iterations 20
+
+Run it from the mcp-gsuite directory.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from google_stub import STUB_CREDENTIALS, GoogleStubServer
+
+
+def scenarios(gmail_service, calendar_service, meet_service):
+    email_ids = [f"m{i:05d}" for i in range(20)]
+    return {
+        "query_gmail_emails": lambda: gmail_service.query_emails(max_results=50),
+        "query_gmail_emails fields=subject,from": lambda: gmail_service.query_emails(max_results=50, projection=["subject", "from"]),
+        "get_gmail_email": lambda: gmail_service.get_email_by_id_with_attachments("m00001"),
+        "get_gmail_email fields=subject,body": lambda: gmail_service.get_email_by_id_with_attachments("m00001", projection=["subject", "body"]),
+        "bulk_get_gmail_emails": lambda: gmail_service.get_emails_by_ids_with_attachments(email_ids),
+        "list_calendars": lambda: calendar_service.list_calendars(),
+        "get_calendar_events": lambda: calendar_service.get_events(max_results=50),
+        "get_calendar_events fields=summary,start,end": lambda: calendar_service.get_events(max_results=50, projection=["summary", "start", "end"]),
+        "get_all_meet_meetings": lambda: meet_service.get_all_meetings(max_results=50),
+    }
+
+
+def measure(stub: GoogleStubServer, iterations: int) -> dict:
+    from mcp_gsuite import calendar, gmail, meet
+
+    # The endpoint is read when the services are built
+    os.environ["GSUITE_API_ENDPOINT"] = stub.url
+    services = (
+        gmail.GmailService(credentials=STUB_CREDENTIALS),
+        calendar.CalendarService(credentials=STUB_CREDENTIALS),
+        meet.MeetService(credentials=STUB_CREDENTIALS),
+    )
+
+    results = {}
+    for name, call in scenarios(*services).items():
+        call()
+        stub.reset_counters()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "bytes_per_call": stub.bytes_sent // iterations,
+            "requests_per_call": stub.requests // iterations,
+            "ms_per_call": round(elapsed / iterations * 1000, 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the effect of partial response masks per tool")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=50, help="Messages and events returned by list calls")
+    args = parser.parse_args()
+
+    full = GoogleStubServer(latency_ms=0, messages=args.messages, apply_masks=False).start()
+    masked = GoogleStubServer(latency_ms=0, messages=args.messages, apply_masks=True).start()
+    before = measure(full, args.iterations)
+    after = measure(masked, args.iterations)
+    full.shutdown()
+    masked.shutdown()
+
+    report = []
+    for name in before:
+        report.append({
+            "tool": name,
+            "bytes_before": before[name]["bytes_per_call"],
+            "bytes_after": after[name]["bytes_per_call"],
+            "bytes_saved_pct": round(100 * (1 - after[name]["bytes_per_call"] / max(before[name]["bytes_per_call"], 1)), 1),
+            "ms_before": before[name]["ms_per_call"],
+            "ms_after": after[name]["ms_per_call"],
+            "requests_per_call": after[name]["requests_per_call"],
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
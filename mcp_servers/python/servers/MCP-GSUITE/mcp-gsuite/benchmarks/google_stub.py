@@ -0,0 +1,255 @@
+"""
+Minimal stand-in for the Gmail and Calendar APIs, used by the benchmarks in this directory.
+
+Serves users.messages.list, users.messages.get, calendarList.list and
+events.list with an injected latency per request. IDs starting with 'missing'
+return 404. Like the real APIs it honours the message 'format' and
+'metadataHeaders' parameters and 'fields' partial response masks, unless
+created with apply_masks=False, which serves full resources to every request.
+Only the standard library is used, so the stub runs wherever the server itself runs.
+"""
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Credentials accepted by the stub. They expire far in the future, so they are never refreshed.
+STUB_CREDENTIALS = {
+    "token": "stub-access-token",
+    "expiry": "2099-01-01T00:00:00Z",
+    "refresh_token": "stub-refresh-token",
+    "token_uri": "http://127.0.0.1/token",
+    "client_id": "stub-client-id",
+    "client_secret": "stub-client-secret",
+}
+
+# Headers of a typical delivered message, most of which the server never reads
+_TRANSPORT_HEADERS = [
+    {"name": "Received", "value": f"from mail{i}.example.com (mail{i}.example.com. [192.0.2.{i}]) by mx.google.com with ESMTPS id x{i}"}
+    for i in range(8)
+] + [
+    {"name": "ARC-Seal", "value": "i=1; a=rsa-sha256; t=1704103200; cv=none; d=google.com; s=arc-20160816; b=" + "A" * 340},
+    {"name": "DKIM-Signature", "value": "v=1; a=rsa-sha256; c=relaxed/relaxed; d=example.com; s=s1; h=from:to:subject; bh=" + "B" * 300},
+    {"name": "Authentication-Results", "value": "mx.google.com; dkim=pass header.i=@example.com; spf=pass; dmarc=pass"},
+    {"name": "Content-Type", "value": "multipart/mixed; boundary=\"000000000000abcdef\""},
+]
+
+
+def stub_message(message_id: str, attachments: int = 1) -> dict:
+    body = base64.urlsafe_b64encode(f"Body of message {message_id}. ".encode() * 40).decode()
+    html = base64.urlsafe_b64encode(f"<p>Body of message {message_id}.</p>".encode() * 40).decode()
+    parts = [{
+        "partId": "0",
+        "mimeType": "multipart/alternative",
+        "filename": "",
+        "headers": [{"name": "Content-Type", "value": "multipart/alternative"}],
+        "body": {"size": 0},
+        "parts": [
+            {"partId": "0.0", "mimeType": "text/plain", "filename": "", "headers": [{"name": "Content-Type", "value": "text/plain; charset=UTF-8"}], "body": {"size": len(body), "data": body}},
+            {"partId": "0.1", "mimeType": "text/html", "filename": "", "headers": [{"name": "Content-Type", "value": "text/html; charset=UTF-8"}], "body": {"size": len(html), "data": html}},
+        ],
+    }]
+    for index in range(attachments):
+        parts.append({
+            "partId": str(index + 1),
+            "mimeType": "application/pdf",
+            "filename": f"file{index}.pdf",
+            "headers": [{"name": "Content-Disposition", "value": f"attachment; filename=\"file{index}.pdf\""}],
+            "body": {"size": 10240, "attachmentId": f"att-{message_id}-{index}-" + "C" * 200},
+        })
+    return {
+        "id": message_id,
+        "threadId": f"t{message_id}",
+        "labelIds": ["INBOX", "UNREAD", "CATEGORY_PERSONAL"],
+        "snippet": f"Body of message {message_id}.",
+        "historyId": "1000",
+        "internalDate": "1704103200000",
+        "sizeEstimate": 4096,
+        "payload": {
+            "partId": "",
+            "mimeType": "multipart/mixed",
+            "filename": "",
+            "headers": _TRANSPORT_HEADERS + [
+                {"name": "Subject", "value": f"Stub message {message_id}"},
+                {"name": "From", "value": "sender@example.com"},
+                {"name": "To", "value": "me@example.com"},
+                {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+                {"name": "Message-ID", "value": f"<{message_id}@example.com>"},
+            ],
+            "body": {"size": 0},
+            "parts": parts,
+        },
+    }
+
+
+def stub_event(index: int, meet: bool = True) -> dict:
+    event = {
+        "kind": "calendar#event",
+        "etag": f"\"{3400000000000000 + index}\"",
+        "id": f"e{index:05d}",
+        "status": "confirmed",
+        "htmlLink": f"https://www.google.com/calendar/event?eid=e{index:05d}",
+        "created": "2024-01-01T09:00:00.000Z",
+        "updated": "2024-01-01T09:00:00.000Z",
+        "summary": f"Stub event {index}",
+        "description": "Agenda:\n" + "\n".join(f"- item {i}" for i in range(10)),
+        "location": "Room 1",
+        "creator": {"email": "me@example.com", "self": True},
+        "organizer": {"email": "me@example.com", "self": True},
+        "start": {"dateTime": "2024-01-01T10:00:00Z", "timeZone": "UTC"},
+        "end": {"dateTime": "2024-01-01T11:00:00Z", "timeZone": "UTC"},
+        "iCalUID": f"e{index:05d}@google.com",
+        "sequence": 0,
+        "attendees": [{"email": f"guest{i}@example.com", "responseStatus": "needsAction"} for i in range(5)],
+        "reminders": {"useDefault": True},
+        "eventType": "default",
+    }
+    if meet:
+        event["hangoutLink"] = "https://meet.google.com/abc-defg-hij"
+        event["conferenceData"] = {
+            "entryPoints": [{"entryPointType": "video", "uri": "https://meet.google.com/abc-defg-hij", "label": "meet.google.com/abc-defg-hij"}],
+            "conferenceSolution": {"key": {"type": "hangoutsMeet"}, "name": "Google Meet", "iconUri": "https://fonts.gstatic.com/s/i/productlogos/meet_2020q4/v6/web-512dp/logo_meet_2020q4_color_2x_web_512dp.png"},
+            "conferenceId": "abc-defg-hij",
+        }
+    return event
+
+
+def parse_fields(mask: str) -> dict:
+    """Parse a partial response mask into a tree of {field: subtree}, None selecting everything below"""
+    def parse(index: int, single: bool = False):
+        tree: dict = {}
+        while index < len(mask):
+            start = index
+            while index < len(mask) and mask[index] not in ",()/":
+                index += 1
+            name = mask[start:index].strip()
+            subtree = None
+            if index < len(mask) and mask[index] == "/":
+                subtree, index = parse(index + 1, single=True)
+            elif index < len(mask) and mask[index] == "(":
+                subtree, index = parse(index + 1)
+                index += 1
+            existing = tree.get(name, {})
+            tree[name] = None if subtree is None or existing is None else {**existing, **subtree}
+            if single or index >= len(mask) or mask[index] == ")":
+                break
+            index += 1
+        return tree, index
+
+    return parse(0)[0]
+
+
+def apply_fields(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: apply_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+class GoogleStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency_ms: float = 50.0, messages: int = 50, apply_masks: bool = True):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency_ms = latency_ms
+        self.messages = messages
+        self.apply_masks = apply_masks
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "GoogleStubServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def count(self, sent: int):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict, query: dict | None = None):
+        if status == 200 and query and self.server.apply_masks and "fields" in query:
+            payload = apply_fields(payload, parse_fields(query["fields"][0]))
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count(len(data))
+
+    def _message(self, message_id: str, query: dict) -> dict:
+        message = stub_message(message_id)
+        fmt = query.get("format", ["full"])[0]
+        if self.server.apply_masks and fmt == "metadata":
+            wanted = {header.lower() for header in query.get("metadataHeaders", [])}
+            payload = message["payload"]
+            payload.pop("parts")
+            payload.pop("body")
+            if wanted:
+                payload["headers"] = [h for h in payload["headers"] if h["name"].lower() in wanted]
+        return message
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        time.sleep(self.server.latency_ms / 1000)
+        segments = url.path.strip("/").split("/")
+        count = min(int(query.get("maxResults", [self.server.messages])[0]), self.server.messages)
+
+        if segments[:2] == ["gmail", "v1"] and len(segments) >= 5 and segments[4] == "messages":
+            # gmail/v1/users/{userId}/messages[/{id}]
+            if len(segments) == 5:
+                self._send(200, {"messages": [{"id": f"m{i:05d}", "threadId": f"tm{i:05d}"} for i in range(count)], "resultSizeEstimate": count}, query)
+            elif segments[5].startswith("missing"):
+                self._send(404, {"error": {"code": 404, "message": "Requested entity was not found.", "status": "NOT_FOUND"}})
+            else:
+                self._send(200, self._message(segments[5], query), query)
+        elif segments[:5] == ["calendar", "v3", "users", "me", "calendarList"]:
+            items = [{
+                "kind": "calendar#calendarListEntry",
+                "etag": f"\"{i}\"",
+                "id": "primary" if i == 0 else f"cal{i}@example.com",
+                "summary": f"Calendar {i}",
+                "timeZone": "UTC",
+                "colorId": "1",
+                "backgroundColor": "#ac725e",
+                "foregroundColor": "#1d1d1d",
+                "selected": True,
+                "accessRole": "owner",
+                "defaultReminders": [{"method": "popup", "minutes": 10}],
+                "conferenceProperties": {"allowedConferenceSolutionTypes": ["hangoutsMeet"]},
+                "primary": i == 0,
+            } for i in range(5)]
+            self._send(200, {"kind": "calendar#calendarList", "etag": "\"1\"", "items": items}, query)
+        elif segments[:3] == ["calendar", "v3", "calendars"] and segments[-1] == "events":
+            self._send(200, {
+                "kind": "calendar#events",
+                "summary": "me@example.com",
+                "timeZone": "UTC",
+                "accessRole": "owner",
+                "items": [stub_event(i, meet=i % 2 == 0) for i in range(count)],
+            }, query)
+        else:
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
@@ -0,0 +1,71 @@
+"""
+Measure the cost of building the Google API service clients.
+
+Reports the one-off startup cost of loading and parsing the discovery
+documents, then the time per call to build each service, both with
+googleapiclient's discovery.build, which reads and parses the document on
+every call as the services used to, and with googleapi.build, which builds
+from the documents parsed at startup. No request is sent, so nothing here
+needs network access.
+
+    uv run python benchmarks/service_build.py --iterations 200
+
+Run it from the mcp-gsuite directory.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from google_stub import STUB_CREDENTIALS
+
+
+def per_call_ms(call, iterations: int) -> float:
+    call()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return round((time.perf_counter() - started) / iterations * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Google API service construction time")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    from google.oauth2.credentials import Credentials
+    from googleapiclient import discovery
+
+    from mcp_gsuite import calendar, discovery_docs, gmail, googleapi
+
+    credentials = Credentials.from_authorized_user_info(STUB_CREDENTIALS)
+
+    started = time.perf_counter()
+    discovery_docs.prewarm()
+    startup_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    report = {"startup_load_documents_ms": startup_ms, "per_call": []}
+    for service_name, version in (("gmail", "v1"), ("calendar", "v3")):
+        report["per_call"].append({
+            "service": f"{service_name} {version}",
+            "discovery_build_ms": per_call_ms(lambda: discovery.build(service_name, version, credentials=credentials), args.iterations),
+            "prebuilt_document_ms": per_call_ms(lambda: googleapi.build(service_name, version, credentials), args.iterations),
+        })
+
+    # Service construction as done by each tool call, including credential lookup
+    report["per_call"].append({
+        "service": "GmailService()",
+        "prebuilt_document_ms": per_call_ms(lambda: gmail.GmailService(credentials=STUB_CREDENTIALS), args.iterations),
+    })
+    report["per_call"].append({
+        "service": "CalendarService()",
+        "prebuilt_document_ms": per_call_ms(lambda: calendar.CalendarService(credentials=STUB_CREDENTIALS), args.iterations),
+    })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measure how long the server takes to start.
+
+Launches the server over stdio the way an MCP client does, and reports the
+time from spawning the process to the initialize response, and to the first
+tools/list response, for each launch mode:
+
+    uv              uv run mcp-gsuite, resolving dependencies on every start
+    uv-no-sync      uv run --no-sync mcp-gsuite
+    direct          .venv/bin/python -m mcp_gsuite, as with MCP_CLIENT_DIRECT_SERVER_EXEC
+
+    uv run python benchmarks/startup.py --runs 10 --modes uv,direct --output startup.json
+
+Run it from the mcp-gsuite directory, after `uv sync`. Keep the JSON output of
+each run to track startup time across changes.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODES = {
+    "uv": ["uv", "run", "mcp-gsuite"],
+    "uv-no-sync": ["uv", "run", "--no-sync", "mcp-gsuite"],
+    "direct": [os.path.join(".venv", "bin", "python"), "-m", "mcp_gsuite"],
+}
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-benchmark", "version": "0"},
+    },
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+LIST_TOOLS = {"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}}
+
+
+def read_response(process: subprocess.Popen, request_id: int) -> dict:
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"Server exited before answering request {request_id}")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def send(process: subprocess.Popen, message: dict):
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def measure(command: list[str]) -> dict:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=PROJECT_DIR, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        send(process, INITIALIZE)
+        read_response(process, 1)
+        initialize_s = time.perf_counter() - started
+        send(process, INITIALIZED)
+        send(process, LIST_TOOLS)
+        tools = read_response(process, 2)["result"]["tools"]
+        list_tools_s = time.perf_counter() - started
+    finally:
+        process.stdin.close()
+        process.terminate()
+        process.wait()
+    return {"initialize_ms": initialize_s * 1000, "list_tools_ms": list_tools_s * 1000, "tools": len(tools)}
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "median": round(statistics.median(samples), 1),
+        "min": round(min(samples), 1),
+        "max": round(max(samples), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure mcp-gsuite time to initialize")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma separated launch modes")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "runs": args.runs, "modes": {}}
+    for mode in args.modes.split(","):
+        # One untimed start, so every mode is measured with warm file system caches
+        measure(MODES[mode])
+        runs = [measure(MODES[mode]) for _ in range(args.runs)]
+        report["modes"][mode] = {
+            "initialize_ms": summarize([run["initialize_ms"] for run in runs]),
+            "list_tools_ms": summarize([run["list_tools_ms"] for run in runs]),
+            "tools": runs[-1]["tools"],
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from . import main
+
+# Allows starting the server with `python -m mcp_gsuite`
+main()
@@ -1,7 +1,8 @@
-from googleapiclient.discovery import build
+from . import fields
 from . import gauth
+from . import googleapi
+from . import timing
 import logging
-import traceback
 from datetime import datetime
 import pytz
 
@@ -13,8 +14,9 @@ class CalendarService():
         Args:
             credentials: Google OAuth2 credentials object
         """
-        authorized_credentials = gauth.authorize_credentials(credentials)
-        self.service = build('calendar', 'v3', credentials=authorized_credentials)
+        with timing.span("calendar.build_service"):
+            authorized_credentials = gauth.authorize_credentials(credentials)
+            self.service = googleapi.build('calendar', 'v3', credentials=authorized_credentials)
     
     def list_calendars(self) -> list:
         """
@@ -22,9 +24,14 @@ class CalendarService():
         
         Returns:
             list: List of calendar objects with their metadata
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
-            calendar_list = self.service.calendarList().list().execute()
+            calendar_list = googleapi.execute(self.service.calendarList().list(
+                fields=fields.CALENDAR_LIST
+            ), "calendar.calendarList.list")
 
             calendars = []
             
@@ -43,10 +50,11 @@ class CalendarService():
                 
         except Exception as e:
             logging.error(f"Error retrieving calendars: {str(e)}")
-            logging.error(traceback.format_exc())
-            return []
+            logging.debug("Traceback", exc_info=True)
+            raise
 
-    def get_events(self, time_min=None, time_max=None, max_results=250, show_deleted=False, calendar_id: str ='primary'):
+    def get_events(self, time_min=None, time_max=None, max_results=250, show_deleted=False, calendar_id: str ='primary',
+                   projection: list[str] | None = None):
         """
         Retrieve calendar events within a specified time range.
         
@@ -55,9 +63,13 @@ class CalendarService():
             time_max (str, optional): End time in RFC3339 format
             max_results (int): Maximum number of events to return (1-2500)
             show_deleted (bool): Whether to include deleted events
+            projection (list[str], optional): Fields to return for each event, all fields if not specified
             
         Returns:
             list: List of calendar events
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # If no time_min specified, use current time
@@ -74,7 +86,8 @@ class CalendarService():
                 'maxResults': max_results,
                 'singleEvents': True,
                 'orderBy': 'startTime',
-                'showDeleted': show_deleted
+                'showDeleted': show_deleted,
+                'fields': fields.calendar_events_mask(projection)
             }
             
             # Add optional time_max if specified
@@ -82,7 +95,7 @@ class CalendarService():
                 params['timeMax'] = time_max
                 
             # Execute the events().list() method
-            events_result = self.service.events().list(**params).execute()
+            events_result = googleapi.execute(self.service.events().list(**params), "calendar.events.list")
             
             # Extract the events
             events = events_result.get('items', [])
@@ -105,20 +118,20 @@ class CalendarService():
                     'conferenceData': event.get('conferenceData'),
                     'recurringEventId': event.get('recurringEventId')
                 }
-                processed_events.append(processed_event)
+                processed_events.append(fields.project(processed_event, projection))
                 
             return processed_events
             
         except Exception as e:
             logging.error(f"Error retrieving calendar events: {str(e)}")
-            logging.error(traceback.format_exc())
-            return []
+            logging.debug("Traceback", exc_info=True)
+            raise
         
     def create_event(self, summary: str, start_time: str, end_time: str, 
                 location: str | None = None, description: str | None = None, 
                 attendees: list | None = None, send_notifications: bool = True,
                 timezone: str | None = None,
-                calendar_id : str = 'primary') -> dict | None:
+                calendar_id : str = 'primary') -> dict:
         """
         Create a new calendar event.
         
@@ -133,7 +146,10 @@ class CalendarService():
             timezone (str, optional): Timezone for the event (e.g. 'America/New_York')
             
         Returns:
-            dict: Created event data or None if creation fails
+            dict: Created event data
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # Prepare event data
@@ -158,18 +174,19 @@ class CalendarService():
                 event['attendees'] = [{'email': email} for email in attendees]
                 
             # Create the event
-            created_event = self.service.events().insert(
+            created_event = googleapi.execute(self.service.events().insert(
                 calendarId=calendar_id,
                 body=event,
-                sendNotifications=send_notifications
-            ).execute()
+                sendNotifications=send_notifications,
+                fields=fields.CALENDAR_EVENT
+            ), "calendar.events.insert")
             
             return created_event
             
         except Exception as e:
             logging.error(f"Error creating calendar event: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None
+            logging.debug("Traceback", exc_info=True)
+            raise
         
     def delete_event(self, event_id: str, send_notifications: bool = True, calendar_id: str = 'primary') -> bool:
         """
@@ -180,20 +197,23 @@ class CalendarService():
             send_notifications (bool): Whether to send cancellation notifications to attendees
             
         Returns:
-            bool: True if deletion was successful, False otherwise
+            bool: True once the event is deleted
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
-            self.service.events().delete(
+            googleapi.execute(self.service.events().delete(
                 calendarId=calendar_id,
                 eventId=event_id,
                 sendNotifications=send_notifications
-            ).execute()
+            ), "calendar.events.delete")
             return True
             
         except Exception as e:
             logging.error(f"Error deleting calendar event {event_id}: {str(e)}")
-            logging.error(traceback.format_exc())
-            return False
+            logging.debug("Traceback", exc_info=True)
+            raise
 
     def check_availability(self, email: str, start_time: str, end_time: str, timezone: str | None = None) -> dict:
         """
@@ -210,7 +230,9 @@ class CalendarService():
         """
         try:
             # First check if we can access the calendar
-            calendar_list = self.service.calendarList().list().execute()
+            calendar_list = googleapi.execute(self.service.calendarList().list(
+                fields=fields.CALENDAR_LIST_IDS
+            ), "calendar.calendarList.list")
             calendars = calendar_list.get('items', [])
             has_direct_access = any(cal.get('id') == email for cal in calendars)
             
@@ -224,7 +246,10 @@ class CalendarService():
             
             # Make the freebusy query
             try:
-                freebusy = self.service.freebusy().query(body=query).execute()
+                freebusy = googleapi.execute(self.service.freebusy().query(
+                    body=query,
+                    fields=fields.CALENDAR_FREEBUSY
+                ), "calendar.freebusy.query")
                 
                 # Process the response
                 calendars = freebusy.get('calendars', {})
@@ -295,7 +320,7 @@ class CalendarService():
             
         except Exception as e:
             logging.error(f"Error checking availability: {str(e)}")
-            logging.error(traceback.format_exc())
+            logging.debug("Traceback", exc_info=True)
             return {
                 'error': str(e),
                 'email': email,
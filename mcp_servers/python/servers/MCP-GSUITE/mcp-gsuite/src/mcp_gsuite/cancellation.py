@@ -0,0 +1,77 @@
+"""
+Cancellation of tool calls the MCP client is no longer waiting for.
+
+When the client sends notifications/cancelled, the MCP SDK cancels the task
+handling the request. Tool handlers run in worker threads, which cannot be
+interrupted from outside, so each tool call gets a CancelToken that call_tool
+sets once its task is cancelled. googleapi.execute checks the token before
+every Google API request, while waiting for the rate limiter and while
+backing off, so a cancelled handler stops at its next request instead of
+finishing the tool call for nobody.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class ToolCallCancelled(Exception):
+    """Raised in a tool handler once the client has cancelled its tool call."""
+
+
+class CancelToken():
+    """Cancellation flag of one tool call, shared by the threads working on it."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: str | None = None
+
+    def cancel(self, reason: str | None = None):
+        self.reason = self.reason or reason
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        """Raise ToolCallCancelled if the tool call was cancelled."""
+        if self._event.is_set():
+            raise ToolCallCancelled(self.reason or "Tool call cancelled by the client")
+
+    def sleep(self, seconds: float):
+        """Sleep, waking up early and raising ToolCallCancelled if the tool call is cancelled."""
+        self._event.wait(seconds)
+        self.check()
+
+
+_current_token: ContextVar[CancelToken | None] = ContextVar("mcp_gsuite_cancel_token", default=None)
+
+
+@contextmanager
+def tool_call() -> Iterator[CancelToken]:
+    """Set a new cancel token for the current tool call, the handler's worker thread inherits it."""
+    token = CancelToken()
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def check():
+    """Raise ToolCallCancelled if the current tool call was cancelled."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds: float):
+    """Sleep on behalf of the current tool call, see CancelToken.sleep."""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
@@ -0,0 +1,78 @@
+"""
+Discovery documents of the Google APIs, loaded from local files only.
+
+Building a service client needs the API's discovery document. Documents are
+looked up, in order, in GSUITE_DISCOVERY_DIR, in the documents bundled with
+this package (gmail.v1.json), and in the static documents shipped with
+google-api-python-client. Each document is read and parsed once per process,
+so building a service for a tool call does no file or network I/O.
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+# Bundled documents are installed into the package, and sit at the project root in a source checkout
+_BUNDLED_DIRS = (
+    Path(__file__).resolve().parent,
+    Path(__file__).resolve().parents[2],
+)
+
+# APIs the services build clients for
+SERVICES = (('gmail', 'v1'), ('calendar', 'v3'), ('oauth2', 'v2'))
+
+_documents: dict[tuple[str, str], dict] = {}
+_lock = threading.Lock()
+
+
+def _read_local(service_name: str, version: str) -> str | None:
+    filename = f"{service_name}.{version}.json"
+    directories = list(_BUNDLED_DIRS)
+    if os.getenv('GSUITE_DISCOVERY_DIR'):
+        directories.insert(0, Path(os.environ['GSUITE_DISCOVERY_DIR']))
+    for directory in directories:
+        path = directory / filename
+        if path.is_file():
+            return path.read_text(encoding='utf-8')
+
+    from googleapiclient.discovery_cache import get_static_doc
+    return get_static_doc(service_name, version)
+
+
+def get_document(service_name: str, version: str) -> dict:
+    """
+    Get the parsed discovery document of an API.
+
+    Args:
+        service_name (str): API name, e.g. 'gmail'
+        version (str): API version, e.g. 'v1'
+
+    Returns:
+        dict: The discovery document
+
+    Raises:
+        FileNotFoundError: If no local document exists for the API
+    """
+    key = (service_name, version)
+    document = _documents.get(key)
+    if document is not None:
+        return document
+
+    with _lock:
+        document = _documents.get(key)
+        if document is None:
+            content = _read_local(service_name, version)
+            if content is None:
+                raise FileNotFoundError(f"No discovery document found for {service_name} {version}")
+            document = _documents[key] = json.loads(content)
+    return document
+
+
+def prewarm():
+    """Load the discovery documents of every API the services use."""
+    for service_name, version in SERVICES:
+        try:
+            get_document(service_name, version)
+        except Exception as e:
+            logging.warning(f"Could not load the discovery document of {service_name} {version}: {e}")
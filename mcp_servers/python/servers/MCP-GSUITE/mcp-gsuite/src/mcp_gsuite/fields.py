@@ -0,0 +1,149 @@
+"""
+Partial response masks for the Google API requests.
+
+Every request sends a ``fields`` mask listing only what the services read from
+the response, so Google does not send, and the client does not parse, the rest
+of the resource. Read tools also accept a caller-supplied projection (the
+``fields`` tool argument) which narrows both the mask and the tool output.
+"""
+
+# Tool argument holding the caller-supplied projection
+FIELDS_ARG = "fields"
+
+# ------------------------------------------------------------------------ Gmail
+
+# Top-level message fields returned by GmailService._parse_message as they are
+GMAIL_MESSAGE_FIELDS = ("id", "threadId", "historyId", "internalDate", "sizeEstimate", "labelIds", "snippet")
+
+# Fields of _parse_message output that are read from a message header, and the header
+GMAIL_HEADER_FIELDS = {
+    "subject": "Subject",
+    "from": "From",
+    "to": "To",
+    "date": "Date",
+    "cc": "Cc",
+    "bcc": "Bcc",
+    "message_id": "Message-ID",
+    "in_reply_to": "In-Reply-To",
+    "references": "References",
+    "delivered_to": "Delivered-To",
+}
+
+# Fields of the tool output that need the message body or its parts
+GMAIL_BODY_FIELDS = ("body", "mimeType", "attachments")
+
+GMAIL_METADATA_OUTPUT_FIELDS = GMAIL_MESSAGE_FIELDS + tuple(GMAIL_HEADER_FIELDS)
+GMAIL_OUTPUT_FIELDS = GMAIL_METADATA_OUTPUT_FIELDS + GMAIL_BODY_FIELDS
+
+# Parts are read recursively, the nested 'parts' is not narrowed further
+_GMAIL_PARTS_MASK = "parts(partId,mimeType,filename,body,parts)"
+
+GMAIL_MESSAGE_LIST = "messages/id,nextPageToken"
+GMAIL_SENT_MESSAGE = "id,threadId,labelIds"
+GMAIL_DRAFT = "id,message(id,threadId,labelIds)"
+GMAIL_ATTACHMENT = "size,data"
+
+
+def gmail_message_request(projection: list[str] | None = None, parse_body: bool = True) -> dict:
+    """
+    Build the format and mask arguments of a users.messages.get request.
+
+    Messages are fetched with format='metadata' and only the parsed headers unless
+    the body, MIME type or attachments are needed.
+
+    Args:
+        projection (list[str], optional): Output fields the caller asked for
+        parse_body (bool): Whether the body and attachments are needed when there is no projection
+
+    Returns:
+        dict: Keyword arguments for users.messages.get
+    """
+    wanted = set(projection or (GMAIL_OUTPUT_FIELDS if parse_body else GMAIL_METADATA_OUTPUT_FIELDS))
+    wanted.add("id")
+
+    mask = [field for field in GMAIL_MESSAGE_FIELDS if field in wanted]
+    headers = [header for field, header in GMAIL_HEADER_FIELDS.items() if field in wanted]
+    payload = ["headers"] if headers else []
+
+    if not wanted.intersection(GMAIL_BODY_FIELDS):
+        if payload:
+            mask.append("payload/headers")
+        return {"format": "metadata", "metadataHeaders": headers, "fields": ",".join(mask)}
+
+    payload += ["mimeType", "body/data", _GMAIL_PARTS_MASK]
+    mask.append(f"payload({','.join(payload)})")
+    return {"format": "full", "fields": ",".join(mask)}
+
+
+# --------------------------------------------------------------------- Calendar
+
+CALENDAR_LIST_FIELDS = ("kind", "id", "summary", "primary", "timeZone", "etag", "accessRole")
+CALENDAR_LIST = f"items({','.join(CALENDAR_LIST_FIELDS)}),nextPageToken"
+CALENDAR_LIST_IDS = "items/id,nextPageToken"
+
+# Event fields returned by the calendar and meet tools
+CALENDAR_EVENT_FIELDS = (
+    "id", "summary", "description", "start", "end", "status", "creator", "organizer",
+    "attendees", "location", "hangoutLink", "conferenceData", "recurringEventId",
+    "created", "updated", "htmlLink",
+)
+CALENDAR_EVENT = ",".join(CALENDAR_EVENT_FIELDS)
+
+# Fields of the events returned by CalendarService.get_events and MeetService.get_all_meetings
+CALENDAR_EVENT_OUTPUT_FIELDS = (
+    "id", "summary", "description", "start", "end", "status", "creator", "organizer",
+    "attendees", "location", "hangoutLink", "conferenceData", "recurringEventId",
+)
+MEET_MEETING_OUTPUT_FIELDS = (
+    "id", "summary", "description", "start", "end", "status", "creator", "organizer",
+    "attendees", "hangoutLink", "conferenceData", "recurringEventId", "created", "updated",
+)
+
+CALENDAR_FREEBUSY = "calendars"
+
+
+def calendar_events_mask(projection: list[str] | None = None, required: tuple[str, ...] = ()) -> str:
+    """
+    Build the mask of an events.list request.
+
+    Args:
+        projection (list[str], optional): Event fields the caller asked for
+        required (tuple[str, ...]): Fields the service reads itself, e.g. to filter events
+
+    Returns:
+        str: The fields mask
+    """
+    wanted = [field for field in CALENDAR_EVENT_FIELDS if not projection or field in projection or field == "id"]
+    wanted += [field for field in required if field.split("/")[0] not in wanted]
+    return f"items({','.join(wanted)}),nextPageToken"
+
+
+# ----------------------------------------------------------------- Projections
+
+def project(item: dict, projection: list[str] | None) -> dict:
+    """
+    Keep only the projected fields of a tool result item. The id is always kept.
+
+    Args:
+        item (dict): A parsed message or event
+        projection (list[str], optional): Fields to keep, everything when empty
+
+    Returns:
+        dict: The projected item
+    """
+    if not projection:
+        return item
+    return {key: value for key, value in item.items() if key in projection or key == "id"}
+
+
+def get_fields_arg_schema(available: tuple[str, ...]) -> dict:
+    """Schema of the optional projection argument of a read tool"""
+    return {
+        "type": "array",
+        "items": {
+            "type": "string",
+            "enum": list(available)
+        },
+        "description": "Optional list of fields to return for each item. Only these fields are requested "
+                       "from Google, which makes the call faster. Returns all fields if not specified."
+    }
@@ -1,16 +1,28 @@
+from __future__ import annotations
+
 import logging
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 import os
 import pydantic
 import json
 import argparse
-from typing import Optional
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
+from . import googleapi, tokens
 
-def get_gauth_file() -> str:
+# The Google auth libraries are imported where they are used, so that they load on
+# the first tool call instead of when the server starts
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+
+@lru_cache(maxsize=1)
+def get_args() -> argparse.Namespace:
+    """
+    Parse the file locations from the command line. Parsed once, the arguments
+    don't change while the server is running.
+    """
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--gauth-file",
@@ -18,8 +30,24 @@ def get_gauth_file() -> str:
         default="./.gauth.json",
         help="Path to client secrets file",
     )
+    parser.add_argument(
+        "--accounts-file",
+        type=str,
+        default="./.accounts.json",
+        help="Path to accounts configuration file",
+    )
+    parser.add_argument(
+        "--credentials-dir",
+        type=str,
+        default=".",
+        help="Directory to store OAuth2 credentials",
+    )
     args, _ = parser.parse_known_args()
-    return args.gauth_file
+    return args
+
+
+def get_gauth_file() -> str:
+    return get_args().gauth_file
 
 
 CLIENTSECRETS_LOCATION = get_gauth_file()
@@ -51,23 +79,74 @@ class AccountInfo(pydantic.BaseModel):
 
 
 def get_accounts_file() -> str:
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--accounts-file",
-        type=str,
-        default="./.accounts.json",
-        help="Path to accounts configuration file",
-    )
-    args, _ = parser.parse_known_args()
-    return args.accounts_file
+    return get_args().accounts_file
+
+
+class AccountRegistry():
+    """
+    Accounts from the accounts file, reloaded only when the file changes.
+
+    The version is bumped on every reload, so that anything built from the
+    accounts, like tool descriptions, can be cached until it changes.
+    """
+
+    def __init__(self, accounts_file: str):
+        self.accounts_file = accounts_file
+        self.version = 0
+        self._stamp = None
+        self._accounts: list[AccountInfo] = []
+        self._descriptions: list[str] = []
+        self._error: Exception | None = None
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        try:
+            stat = os.stat(self.accounts_file)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            # Loading below raises the error again, and keeps it for the callers
+            stamp = None
+        if stamp == self._stamp and self.version:
+            return
+
+        with self._lock:
+            if stamp == self._stamp and self.version:
+                return
+            accounts, error = [], None
+            try:
+                with open(self.accounts_file) as f:
+                    data = json.load(f)
+                    accounts = [AccountInfo.model_validate(acc) for acc in data.get("accounts", [])]
+            except Exception as e:
+                error = e
+            self._accounts = accounts
+            self._descriptions = [a.to_description() for a in accounts]
+            self._error = error
+            self._stamp = stamp
+            self.version += 1
+
+    def get_version(self) -> int:
+        self._reload_if_changed()
+        return self.version
+
+    def get_accounts(self) -> list[AccountInfo]:
+        self._reload_if_changed()
+        if self._error is not None:
+            raise self._error
+        return list(self._accounts)
+
+    def get_descriptions(self) -> list[str]:
+        self._reload_if_changed()
+        if self._error is not None:
+            raise self._error
+        return self._descriptions
+
+
+account_registry = AccountRegistry(get_accounts_file())
 
 
 def get_account_info() -> list[AccountInfo]:
-    accounts_file = get_accounts_file()
-    with open(accounts_file) as f:
-        data = json.load(f)
-        accounts = data.get("accounts", [])
-        return [AccountInfo.model_validate(acc) for acc in accounts]
+    return account_registry.get_accounts()
 
 class GetCredentialsException(Exception):
   """Error raised when an error occurred while retrieving credentials.
@@ -95,15 +174,7 @@ class NoUserIdException(Exception):
 
 
 def get_credentials_dir() -> str:
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--credentials-dir",
-        type=str,
-        default=".",
-        help="Directory to store OAuth2 credentials",
-    )
-    args, _ = parser.parse_known_args()
-    return args.credentials_dir
+    return get_args().credentials_dir
 
 
 def _get_credential_filename(user_id: str) -> str:
@@ -119,6 +190,9 @@ def get_stored_credentials(user_id: str) -> Optional[Credentials]:
     Returns:
         Stored credentials if found, None otherwise
     """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
     try:
         cred_file = _get_credential_filename(user_id)
         if not os.path.exists(cred_file):
@@ -175,6 +249,8 @@ def get_authorization_url(email_address: str, state: str) -> str:
     Returns:
         Authorization URL to redirect user to
     """
+    from google_auth_oauthlib.flow import Flow
+
     # Load client secrets from file
     flow = Flow.from_client_secrets_file(
         CLIENTSECRETS_LOCATION,
@@ -205,6 +281,8 @@ def get_credentials(authorization_code: str, state: str) -> Credentials:
     Raises:
         GetCredentialsException: If credentials cannot be obtained
     """
+    from google_auth_oauthlib.flow import Flow
+
     try:
         # Create flow instance
         flow = Flow.from_client_secrets_file(
@@ -249,8 +327,8 @@ def get_user_info(credentials: Credentials) -> dict:
         NoUserIdException: If user ID cannot be retrieved
     """
     try:
-        service = build('oauth2', 'v2', credentials=credentials)
-        user_info = service.userinfo().get().execute()
+        service = googleapi.build('oauth2', 'v2', credentials=credentials)
+        user_info = googleapi.execute(service.userinfo().get(), "oauth2.userinfo.get")
         if user_info and user_info.get('id'):
             return user_info
         raise NoUserIdException()
@@ -262,6 +340,9 @@ def get_user_info(credentials: Credentials) -> dict:
 def authorize_credentials(creds_data):
     """
     Authorize credentials, refreshing them if necessary.
+
+    Credentials are cached per refresh token and refreshed in the background
+    before they expire, see tokens.TokenManager.
     
     Args:
         credentials (Credentials): Google OAuth2 credentials
@@ -277,13 +358,7 @@ def authorize_credentials(creds_data):
         raise ValueError("Credentials cannot be None")
         
     try:
-        credentials = Credentials.from_authorized_user_info(creds_data)
-        
-        # Refresh if expired
-        if credentials.expired:
-            credentials.refresh(Request())
-            
-        return credentials
+        return tokens.manager.get(creds_data)
     except Exception as e:
         logging.error(f"Error authorizing credentials: {e}")
         if "invalid_grant" in str(e):
@@ -1,11 +1,25 @@
-from googleapiclient.discovery import build 
+from . import fields
 from . import gauth
+from . import googleapi
+from . import timing
 import logging
 import base64
-import traceback
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from typing import Tuple
 
+# Upper bound on the messages fetched concurrently by a bulk fetch
+BULK_FETCH_MAX_WORKERS = int(os.getenv("MCP_GSUITE_BULK_FETCH_WORKERS", "10"))
+
+# Headers needed to reply to a message in its thread, fetched without the message body
+REPLY_METADATA_HEADERS = ['Message-ID', 'References', 'Subject', 'From', 'Date']
+
+# Default number of characters of the original body quoted in a reply
+DEFAULT_MAX_QUOTE_CHARS = 2000
+
 
 class GmailService():
     def __init__(self, credentials):
@@ -15,8 +29,9 @@ class GmailService():
         Args:
             credentials: Google OAuth2 credentials object
         """
-        authorized_credentials = gauth.authorize_credentials(credentials)
-        self.service = build('gmail', 'v1', credentials=authorized_credentials)
+        with timing.span("gmail.build_service"):
+            self.credentials = gauth.authorize_credentials(credentials)
+            self.service = googleapi.build('gmail', 'v1', credentials=self.credentials)
 
     def _parse_message(self, txt, parse_body=False) -> dict | None:
         """
@@ -82,7 +97,7 @@ class GmailService():
 
         except Exception as e:
             logging.error(f"Error parsing message: {str(e)}")
-            logging.error(traceback.format_exc())
+            logging.debug("Traceback", exc_info=True)
             return None
 
     def _extract_body(self, payload) -> str | None:
@@ -126,7 +141,7 @@ class GmailService():
             logging.error(f"Error extracting body: {str(e)}")
             return None
 
-    def query_emails(self, query=None, max_results=100):
+    def query_emails(self, query=None, max_results=100, projection: list[str] | None = None):
         """
         Query emails from Gmail based on a search query.
         
@@ -134,85 +149,168 @@ class GmailService():
             query (str, optional): Gmail search query (e.g., 'is:unread', 'from:example@gmail.com')
                                 If None, returns all emails
             max_results (int): Maximum number of emails to retrieve (1-500, default: 100)
+            projection (list[str], optional): Fields to return for each email, all metadata fields if not specified
         
         Returns:
             list: List of parsed email messages, newest first
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # Ensure max_results is within API limits
             max_results = min(max(1, max_results), 500)
             
             # Get the list of messages
-            result = self.service.users().messages().list(
+            result = googleapi.execute(self.service.users().messages().list(
                 userId='me',
                 maxResults=max_results,
-                q=query if query else ''
-            ).execute()
+                q=query if query else '',
+                fields=fields.GMAIL_MESSAGE_LIST
+            ), "gmail.users.messages.list")
 
             messages = result.get('messages', [])
             parsed = []
 
-            # Fetch full message details for each message
+            # Only the headers are parsed, so the bodies are not downloaded
+            request_args = fields.gmail_message_request(projection, parse_body=False)
             for msg in messages:
-                txt = self.service.users().messages().get(
+                txt = googleapi.execute(self.service.users().messages().get(
                     userId='me', 
-                    id=msg['id']
-                ).execute()
-                parsed_message = self._parse_message(txt=txt, parse_body=False)
+                    id=msg['id'],
+                    **request_args
+                ), "gmail.users.messages.get")
+                parsed_message = self._parse_message(txt=txt, parse_body=request_args['format'] == 'full')
                 if parsed_message:
-                    parsed.append(parsed_message)
+                    parsed.append(fields.project(parsed_message, projection))
                     
             return parsed
             
         except Exception as e:
             logging.error(f"Error reading emails: {str(e)}")
-            logging.error(traceback.format_exc())
-            return []
+            logging.debug("Traceback", exc_info=True)
+            raise
         
-    def get_email_by_id_with_attachments(self, email_id: str) -> Tuple[dict, dict] | Tuple[None, dict]:
+    def get_email_by_id_with_attachments(self, email_id: str, projection: list[str] | None = None) -> Tuple[dict, dict] | Tuple[None, dict]:
         """
         Fetch and parse a complete email message by its ID including attachment IDs.
         
         Args:
             email_id (str): The Gmail message ID to retrieve
+            projection (list[str], optional): Fields to return, all fields if not specified
         
         Returns:
             Tuple[dict, list]: Complete parsed email message including body and list of attachment IDs
-            Tuple[None, list]: If retrieval or parsing fails, returns None for email and empty list for attachment IDs
+            Tuple[None, list]: If parsing fails, returns None for email and empty list for attachment IDs
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # Fetch the complete message by ID
-            message = self.service.users().messages().get(
+            request_args = fields.gmail_message_request(projection)
+            message = googleapi.execute(self.service.users().messages().get(
                 userId='me',
-                id=email_id
-            ).execute()
+                id=email_id,
+                **request_args
+            ), "gmail.users.messages.get")
             
             # Parse the message with body included
-            parsed_email = self._parse_message(txt=message, parse_body=True)
+            parsed_email = self._parse_message(txt=message, parse_body=request_args['format'] == 'full')
 
             if parsed_email is None:
                 return None, []
 
-            attachments = {}
-            for part in message["payload"]["parts"]:
-                if "attachmentId" in part["body"]:
-                    attachment_id = part["body"]["attachmentId"]
-                    part_id = part["partId"]
-                    attachment = {
-                        "filename": part["filename"],
-                        "mimeType": part["mimeType"],
-                        "attachmentId": attachment_id,
-                        "partId": part_id
-                    }
-                    attachments[part_id] = attachment
-
-
-            return parsed_email, attachments
+            return fields.project(parsed_email, projection), self._extract_attachments(message)
             
         except Exception as e:
             logging.error(f"Error retrieving email {email_id}: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None, []
+            logging.debug("Traceback", exc_info=True)
+            raise
+
+    def get_emails_by_ids_with_attachments(self, email_ids: list[str], projection: list[str] | None = None) -> Tuple[list[dict], dict[str, str]]:
+        """
+        Fetch and parse several complete email messages including attachment IDs.
+
+        Messages are fetched concurrently by a bounded pool of threads, each with
+        its own HTTP connection, so the total time grows with the number of
+        messages divided by the pool size instead of with the number of messages.
+
+        Args:
+            email_ids (list[str]): The Gmail message IDs to retrieve
+            projection (list[str], optional): Fields to return for each email, all fields if not specified
+
+        Returns:
+            Tuple[list, dict]: Parsed emails in the order of email_ids, each with an
+                'attachments' entry, and a mapping of every ID that could not be
+                retrieved to the reason
+        """
+        unique_ids = list(dict.fromkeys(email_ids))
+        if not unique_ids:
+            return [], {}
+
+        import google_auth_httplib2
+        import httplib2
+
+        thread_state = threading.local()
+        request_args = fields.gmail_message_request(projection)
+
+        def fetch(email_id: str) -> dict:
+            http = getattr(thread_state, 'http', None)
+            if http is None:
+                http = thread_state.http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            return googleapi.execute(self.service.users().messages().get(
+                userId='me',
+                id=email_id,
+                **request_args
+            ), "gmail.users.messages.get", http=http)
+
+        with ThreadPoolExecutor(max_workers=min(BULK_FETCH_MAX_WORKERS, len(unique_ids))) as pool:
+            # Each call runs in a copy of the current context so its timings reach the tool call
+            futures = [pool.submit(contextvars.copy_context().run, fetch, email_id) for email_id in unique_ids]
+
+        emails = []
+        errors = {}
+        for email_id, future in zip(unique_ids, futures):
+            try:
+                message = future.result()
+                parsed_email = self._parse_message(txt=message, parse_body=request_args['format'] == 'full')
+                if parsed_email is None:
+                    errors[email_id] = "Failed to parse message"
+                    continue
+                parsed_email["attachments"] = self._extract_attachments(message)
+                emails.append(fields.project(parsed_email, projection))
+            except Exception as e:
+                logging.error(f"Error retrieving email {email_id}: {str(e)}")
+                logging.debug("Traceback", exc_info=True)
+                errors[email_id] = str(e)
+
+        return emails, errors
+
+    def _extract_attachments(self, message: dict) -> dict:
+        """
+        Collect the attachments of a message, including those in nested parts.
+
+        Args:
+            message (dict): Raw message from Gmail API
+
+        Returns:
+            dict: Attachment details keyed by part ID
+        """
+        attachments = {}
+        parts = list(message.get("payload", {}).get("parts", []))
+        while parts:
+            part = parts.pop(0)
+            parts.extend(part.get("parts", []))
+            attachment_id = part.get("body", {}).get("attachmentId")
+            if attachment_id:
+                attachments[part["partId"]] = {
+                    "filename": part.get("filename"),
+                    "mimeType": part.get("mimeType"),
+                    "attachmentId": attachment_id,
+                    "partId": part["partId"]
+                }
+        return attachments
         
     def get_email_by_id(self, email_id: str) -> dict | None: 
         """
@@ -223,14 +321,18 @@ class GmailService():
         
         Returns:
             dict: Complete parsed email message including body
-            None: If retrieval or parsing fails
+            None: If parsing fails
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # Fetch the complete message by ID
-            message = self.service.users().messages().get(
+            message = googleapi.execute(self.service.users().messages().get(
                 userId='me',
-                id=email_id
-            ).execute()
+                id=email_id,
+                **fields.gmail_message_request()
+            ), "gmail.users.messages.get")
             
             # Parse the message with body included
             parsed_email = self._parse_message(txt=message, parse_body=True)
@@ -238,13 +340,44 @@ class GmailService():
             
         except Exception as e:
             logging.error(f"Error retrieving email {email_id}: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None   
+            logging.debug("Traceback", exc_info=True)
+            raise
+
+
+
+
+    def get_email_headers(self, email_id: str, headers: list[str] | None = None) -> dict | None:
+        """
+        Fetch the metadata of an email message without its body or attachments.
 
+        Args:
+            email_id (str): The Gmail message ID to retrieve
+            headers (list[str], optional): Headers to fetch. Defaults to the headers needed to reply.
+
+        Returns:
+            dict: Parsed message metadata including threadId and the requested headers
+            None: If parsing fails
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
+        """
+        try:
+            message = googleapi.execute(self.service.users().messages().get(
+                userId='me',
+                id=email_id,
+                format='metadata',
+                metadataHeaders=headers or REPLY_METADATA_HEADERS,
+                fields='id,threadId,payload/headers'
+            ), "gmail.users.messages.get")
 
+            return self._parse_message(txt=message, parse_body=False)
 
+        except Exception as e:
+            logging.error(f"Error retrieving headers of email {email_id}: {str(e)}")
+            logging.debug("Traceback", exc_info=True)
+            raise
 
-    def create_draft(self, to: str, subject: str, body: str, cc: list[str] | None = None) -> dict | None:
+    def create_draft(self, to: str, subject: str, body: str, cc: list[str] | None = None) -> dict:
         """
         Create a draft email message.
         
@@ -256,7 +389,9 @@ class GmailService():
             
         Returns:
             dict: Draft message data including the draft ID if successful
-            None: If creation fails
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # Create message body
@@ -279,21 +414,22 @@ class GmailService():
             raw_message = base64.urlsafe_b64encode(mime_message.as_bytes()).decode('utf-8')
             
             # Create the draft
-            draft = self.service.users().drafts().create(
+            draft = googleapi.execute(self.service.users().drafts().create(
                 userId='me',
                 body={
                     'message': {
                         'raw': raw_message
                     }
-                }
-            ).execute()
+                },
+                fields=fields.GMAIL_DRAFT
+            ), "gmail.users.drafts.create")
             
             return draft
             
         except Exception as e:
             logging.error(f"Error creating draft: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None
+            logging.debug("Traceback", exc_info=True)
+            raise
         
     def delete_draft(self, draft_id: str) -> bool:
         """
@@ -303,33 +439,42 @@ class GmailService():
             draft_id (str): The ID of the draft to delete
             
         Returns:
-            bool: True if deletion was successful, False otherwise
+            bool: True once the draft is deleted
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
-            self.service.users().drafts().delete(
+            googleapi.execute(self.service.users().drafts().delete(
                 userId='me',
                 id=draft_id
-            ).execute()
+            ), "gmail.users.drafts.delete")
             return True
             
         except Exception as e:
             logging.error(f"Error deleting draft {draft_id}: {str(e)}")
-            logging.error(traceback.format_exc())
-            return False
+            logging.debug("Traceback", exc_info=True)
+            raise
         
-    def create_reply(self, original_message: dict, reply_body: str, send: bool = False, cc: list[str] | None = None) -> dict | None:
+    def create_reply(self, original_message: dict, reply_body: str, send: bool = False, cc: list[str] | None = None,
+                     quote_original: bool = False, max_quote_chars: int = DEFAULT_MAX_QUOTE_CHARS) -> dict:
         """
         Create a reply to an email message and either send it or save as draft.
         
         Args:
-            original_message (dict): The original message data (as returned by get_email_by_id)
+            original_message (dict): The original message data (as returned by get_email_headers,
+                or by get_email_by_id when quoting the original)
             reply_body (str): Body content of the reply
             send (bool): If True, sends the reply immediately. If False, saves as draft.
             cc (list[str], optional): List of email addresses to CC
+            quote_original (bool): If True, quotes the original body below the reply
+            max_quote_chars (int): Maximum number of characters of the original body to quote
             
         Returns:
             dict: Sent message or draft data if successful
-            None: If operation fails
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             to_address = original_message.get('from')
@@ -340,16 +485,17 @@ class GmailService():
             if not subject.lower().startswith('re:'):
                 subject = f"Re: {subject}"
 
-
-            original_date = original_message.get('date', '')
-            original_from = original_message.get('from', '')
-            original_body = original_message.get('body', '')
-        
-            full_reply_body = (
-                f"{reply_body}\n\n"
-                f"On {original_date}, {original_from} wrote:\n"
-                f"> {original_body.replace('\n', '\n> ') if original_body else '[No message body]'}"
-            )
+            full_reply_body = reply_body
+            if quote_original:
+                original_body = original_message.get('body') or '[No message body]'
+                if len(original_body) > max_quote_chars:
+                    original_body = original_body[:max_quote_chars] + '\n[...]'
+                quoted_body = '\n'.join(f"> {line}" for line in original_body.split('\n'))
+                full_reply_body = (
+                    f"{reply_body}\n\n"
+                    f"On {original_message.get('date', '')}, {original_message.get('from', '')} wrote:\n"
+                    f"{quoted_body}"
+                )
 
             mime_message = MIMEText(full_reply_body)
             mime_message['to'] = to_address
@@ -357,8 +503,11 @@ class GmailService():
             if cc:
                 mime_message['cc'] = ','.join(cc)
                 
-            mime_message['In-Reply-To'] = original_message.get('id', '')
-            mime_message['References'] = original_message.get('id', '')
+            # Threading headers refer to the RFC 822 Message-ID, not the Gmail message ID
+            original_message_id = original_message.get('message_id')
+            if original_message_id:
+                mime_message['In-Reply-To'] = original_message_id
+                mime_message['References'] = f"{original_message.get('references', '')} {original_message_id}".strip()
             
             raw_message = base64.urlsafe_b64encode(mime_message.as_bytes()).decode('utf-8')
             
@@ -369,27 +518,29 @@ class GmailService():
 
             if send:
                 # Send the reply immediately
-                result = self.service.users().messages().send(
+                result = googleapi.execute(self.service.users().messages().send(
                     userId='me',
-                    body=message_body
-                ).execute()
+                    body=message_body,
+                    fields=fields.GMAIL_SENT_MESSAGE
+                ), "gmail.users.messages.send")
             else:
                 # Save as draft
-                result = self.service.users().drafts().create(
+                result = googleapi.execute(self.service.users().drafts().create(
                     userId='me',
                     body={
                         'message': message_body
-                    }
-                ).execute()
+                    },
+                    fields=fields.GMAIL_DRAFT
+                ), "gmail.users.drafts.create")
             
             return result
             
         except Exception as e:
             logging.error(f"Error {'sending' if send else 'drafting'} reply: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None
+            logging.debug("Traceback", exc_info=True)
+            raise
         
-    def get_attachment(self, message_id: str, attachment_id: str) -> dict | None:
+    def get_attachment(self, message_id: str, attachment_id: str) -> dict:
         """
         Retrieves a Gmail attachment by its ID.
         
@@ -399,14 +550,17 @@ class GmailService():
         
         Returns:
             dict: Attachment data including filename and base64-encoded content
-            None: If retrieval fails
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
-            attachment = self.service.users().messages().attachments().get(
+            attachment = googleapi.execute(self.service.users().messages().attachments().get(
                 userId='me',
                 messageId=message_id, 
-                id=attachment_id
-            ).execute()
+                id=attachment_id,
+                fields=fields.GMAIL_ATTACHMENT
+            ), "gmail.users.messages.attachments.get")
             return {
                 "size": attachment.get("size"),
                 "data": attachment.get("data")
@@ -414,10 +568,10 @@ class GmailService():
             
         except Exception as e:
             logging.error(f"Error retrieving attachment {attachment_id} from message {message_id}: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None
+            logging.debug("Traceback", exc_info=True)
+            raise
 
-    def send_email(self, to: str, subject: str, body: str, cc: list[str] | None = None, is_html: bool = False) -> dict | None:
+    def send_email(self, to: str, subject: str, body: str, cc: list[str] | None = None, is_html: bool = False) -> dict:
         """
         Directly sends an email message.
         
@@ -430,7 +584,9 @@ class GmailService():
             
         Returns:
             dict: Sent message data if successful
-            None: If sending fails
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # Create the message in MIME format with appropriate content type
@@ -447,15 +603,16 @@ class GmailService():
             # Send the email
             message_body = {'raw': raw_message}
             logging.info(f"Sending {'HTML' if is_html else 'plain text'} email to {to} with subject '{subject}'")
-            sent_message = self.service.users().messages().send(
+            sent_message = googleapi.execute(self.service.users().messages().send(
                 userId='me',
-                body=message_body
-            ).execute()
+                body=message_body,
+                fields=fields.GMAIL_SENT_MESSAGE
+            ), "gmail.users.messages.send")
             
             logging.info(f"Email sent successfully with message ID: {sent_message.get('id')}")
             return sent_message
             
         except Exception as e:
             logging.error(f"Error sending email to {to}: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None
\ No newline at end of file
+            logging.debug("Traceback", exc_info=True)
+            raise
\ No newline at end of file
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from . import cancellation, discovery_docs, ratelimit, timing
+
+# Upper bound on the service clients kept for reuse, see build
+SERVICE_CACHE_SIZE = int(os.getenv("MCP_GSUITE_SERVICE_CACHE_SIZE", "64"))
+
+# Paths the services are served under, relative to the API root. Only needed when the
+# endpoint is overridden, e.g. to point the server at a local stub for benchmarks.
+_SERVICE_PATHS = {
+    ('calendar', 'v3'): 'calendar/v3/',
+}
+
+# Built service clients with the credentials they were built for, most recently used last
+_services: OrderedDict[tuple, tuple] = OrderedDict()
+_services_lock = threading.Lock()
+
+
+def build(service_name: str, version: str, credentials):
+    """
+    Build a Google API service client.
+
+    The client is built from the locally cached discovery document, see
+    discovery_docs. Set GSUITE_API_ENDPOINT to send every request to another
+    host instead of the public Google APIs.
+
+    Building a client walks the whole discovery document, so built clients are
+    reused for the same API, credentials object and thread. Credentials are
+    shared per account and refreshed in place, see tokens. A client is only
+    used by the thread that built it, because its httplib2 object is not
+    thread safe.
+
+    Args:
+        service_name (str): API name, e.g. 'gmail'
+        version (str): API version, e.g. 'v1'
+        credentials: Authorized Google OAuth2 credentials
+
+    Returns:
+        A googleapiclient Resource for the API
+    """
+    client_options = None
+    endpoint = os.getenv('GSUITE_API_ENDPOINT')
+    if endpoint:
+        api_endpoint = endpoint.rstrip('/') + '/' + _SERVICE_PATHS.get((service_name, version), '')
+        client_options = {'api_endpoint': api_endpoint}
+    # The credentials are kept in the entry, so their id is not reused while it exists
+    key = (service_name, version, endpoint, id(credentials), threading.get_ident())
+    with _services_lock:
+        cached = _services.get(key)
+        if cached is not None and cached[0] is credentials:
+            _services.move_to_end(key)
+            return cached[1]
+
+    from googleapiclient import discovery
+
+    document = discovery_docs.get_document(service_name, version)
+    service = discovery.build_from_document(document, credentials=credentials, client_options=client_options)
+    with _services_lock:
+        _services[key] = (credentials, service)
+        _services.move_to_end(key)
+        while len(_services) > SERVICE_CACHE_SIZE:
+            _services.popitem(last=False)
+    return service
+
+
+def execute(request, method: str, http=None):
+    """
+    Execute a Google API request.
+
+    Every Google API call made by the services goes through here so that
+    cross-cutting concerns only have to be handled in one place. Calls are
+    paced by the per-account rate limiter, and requests rejected for exceeding
+    a rate limit are retried with backoff, see ratelimit. Once the client has
+    cancelled the tool call no further request is sent, see cancellation.
+
+    Args:
+        request: A googleapiclient HttpRequest
+        method (str): Name of the API method, e.g. 'gmail.users.messages.get'
+        http: Authorized http object to send the request with instead of the
+            service's own. httplib2 objects are not thread safe, so requests
+            executed from worker threads need one per thread.
+
+    Returns:
+        The decoded API response
+
+    Raises:
+        cancellation.ToolCallCancelled: If the tool call was cancelled
+        googleapiclient.errors.HttpError: If the request failed with an error
+            that is not retried, or its last retry failed
+    """
+    from googleapiclient.errors import HttpError
+
+    account = ratelimit.account_key(http or request.http)
+    attempt = 0
+    while True:
+        cancellation.check()
+        timing.record_rate_limit_wait(ratelimit.acquire(account, method))
+        cancellation.check()
+        try:
+            with timing.span(method, google_api=True):
+                return request.execute(http=http)
+        except HttpError as e:
+            delay = ratelimit.retry_delay(e, method, attempt)
+            if delay is None:
+                raise
+            throttled = ratelimit.is_rate_limited(e)
+            logging.warning(f"{method} failed with status {e.resp.status}, retrying in {delay:.2f}s")
+            timing.record_retry(throttled)
+            cancellation.sleep(delay)
+            timing.record_rate_limit_wait(delay)
+            attempt += 1
@@ -1,7 +1,8 @@
-from googleapiclient.discovery import build
+from . import fields
 from . import gauth
+from . import googleapi
+from . import timing
 import logging
-import traceback
 from datetime import datetime
 import pytz
 
@@ -13,13 +14,14 @@ class MeetService():
         Args:
             credentials: Google OAuth2 credentials object
         """
-        authorized_credentials = gauth.authorize_credentials(credentials)
-        self.service = build('calendar', 'v3', credentials=authorized_credentials)
+        with timing.span("meet.build_service"):
+            authorized_credentials = gauth.authorize_credentials(credentials)
+            self.service = googleapi.build('calendar', 'v3', credentials=authorized_credentials)
 
     def create_meeting(self, summary: str, start_time: str, end_time: str,
                       description: str | None = None,
                       attendees: list | None = None,
-                      timezone: str | None = None) -> dict | None:
+                      timezone: str | None = None) -> dict:
         """
         Create a new Google Meet meeting.
         
@@ -32,7 +34,10 @@ class MeetService():
             timezone (str, optional): Timezone for the meeting
             
         Returns:
-            dict: Created meeting data or None if creation fails
+            dict: Created meeting data
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             event = {
@@ -58,19 +63,20 @@ class MeetService():
             if attendees:
                 event['attendees'] = [{'email': email} for email in attendees]
                 
-            created_event = self.service.events().insert(
+            created_event = googleapi.execute(self.service.events().insert(
                 calendarId='primary',
                 body=event,
                 conferenceDataVersion=1,
-                sendNotifications=True
-            ).execute()
+                sendNotifications=True,
+                fields=fields.CALENDAR_EVENT
+            ), "calendar.events.insert")
             
             return created_event
             
         except Exception as e:
             logging.error(f"Error creating Meet meeting: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None 
+            logging.debug("Traceback", exc_info=True)
+            raise
 
     def cancel_meeting(self, event_id: str) -> bool:
         """
@@ -80,22 +86,25 @@ class MeetService():
             event_id (str): The ID of the meeting/event to cancel
             
         Returns:
-            bool: True if successfully canceled, False otherwise
+            bool: True once the meeting is canceled
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
-            self.service.events().delete(
+            googleapi.execute(self.service.events().delete(
                 calendarId='primary',
                 eventId=event_id,
                 sendNotifications=True
-            ).execute()
+            ), "calendar.events.delete")
             return True
         except Exception as e:
             logging.error(f"Error canceling Meet meeting: {str(e)}")
-            logging.error(traceback.format_exc())
-            return False
+            logging.debug("Traceback", exc_info=True)
+            raise
 
     def reschedule_meeting(self, event_id: str, new_start_time: str, new_end_time: str,
-                          timezone: str | None = None) -> dict | None:
+                          timezone: str | None = None) -> dict:
         """
         Reschedule an existing Google Meet meeting.
         
@@ -106,39 +115,50 @@ class MeetService():
             timezone (str, optional): Timezone for the meeting
             
         Returns:
-            dict: Updated meeting data or None if update fails
+            dict: Updated meeting data
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
-            # First get the existing event
-            event = self.service.events().get(calendarId='primary', eventId=event_id).execute()
+            # Only the current time zones are needed from the existing event
+            event = googleapi.execute(self.service.events().get(
+                calendarId='primary',
+                eventId=event_id,
+                fields='start/timeZone,end/timeZone'
+            ), "calendar.events.get")
             
             # Update the time fields
-            event['start'] = {
-                'dateTime': new_start_time,
-                'timeZone': timezone or event['start'].get('timeZone', 'UTC'),
-            }
-            event['end'] = {
-                'dateTime': new_end_time,
-                'timeZone': timezone or event['end'].get('timeZone', 'UTC'),
+            changes = {
+                'start': {
+                    'dateTime': new_start_time,
+                    'timeZone': timezone or event.get('start', {}).get('timeZone', 'UTC'),
+                },
+                'end': {
+                    'dateTime': new_end_time,
+                    'timeZone': timezone or event.get('end', {}).get('timeZone', 'UTC'),
+                }
             }
             
-            # Update the event
-            updated_event = self.service.events().update(
+            # Patch only the times, so the rest of the event does not have to be sent back
+            updated_event = googleapi.execute(self.service.events().patch(
                 calendarId='primary',
                 eventId=event_id,
-                body=event,
-                sendNotifications=True
-            ).execute()
+                body=changes,
+                sendNotifications=True,
+                fields=fields.CALENDAR_EVENT
+            ), "calendar.events.patch")
             
             return updated_event
             
         except Exception as e:
             logging.error(f"Error rescheduling Meet meeting: {str(e)}")
-            logging.error(traceback.format_exc())
-            return None 
+            logging.debug("Traceback", exc_info=True)
+            raise
 
     def get_all_meetings(self, time_min: str | None = None, time_max: str | None = None, 
-                        max_results: int = 100, include_past: bool = False) -> list:
+                        max_results: int = 100, include_past: bool = False,
+                        projection: list[str] | None = None) -> list:
         """
         Get all Google Meet meetings from the calendar.
         
@@ -147,9 +167,13 @@ class MeetService():
             time_max (str, optional): End time in RFC3339 format
             max_results (int): Maximum number of meetings to return (default: 100)
             include_past (bool): Whether to include past meetings (default: False)
+            projection (list[str], optional): Fields to return for each meeting, all fields if not specified
             
         Returns:
             list: List of meetings with Google Meet links
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request fails, after any retries
         """
         try:
             # If no time_min specified and not including past meetings, use current time
@@ -163,14 +187,16 @@ class MeetService():
                 'singleEvents': True,
                 'orderBy': 'startTime',
                 'timeMin': time_min if time_min else None,
-                'timeMax': time_max if time_max else None
+                'timeMax': time_max if time_max else None,
+                # conferenceId is needed to pick out the Meet events
+                'fields': fields.calendar_events_mask(projection, required=('conferenceData/conferenceId',))
             }
             
             # Remove None values
             params = {k: v for k, v in params.items() if v is not None}
             
             # Execute the events().list() method
-            events_result = self.service.events().list(**params).execute()
+            events_result = googleapi.execute(self.service.events().list(**params), "calendar.events.list")
             
             # Extract only events with Google Meet links
             meetings = []
@@ -193,11 +219,11 @@ class MeetService():
                         'created': event.get('created'),
                         'updated': event.get('updated')
                     }
-                    meetings.append(meeting)
+                    meetings.append(fields.project(meeting, projection))
             
             return meetings
             
         except Exception as e:
             logging.error(f"Error retrieving Meet meetings: {str(e)}")
-            logging.error(traceback.format_exc())
-            return []
\ No newline at end of file
+            logging.debug("Traceback", exc_info=True)
+            raise
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Client-side rate limiting and retries for the Google API calls.
+
+Requests are paced by a token bucket per account and API, sized after the
+per-user quotas, so a burst of tool calls is spread out locally instead of
+being rejected by Google. Requests that are rejected anyway (429, 403
+rateLimitExceeded/userRateLimitExceeded) and transient server errors on
+read-only methods are retried with exponential backoff and full jitter,
+honouring Retry-After when the response carries one.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from . import cancellation
+
+if TYPE_CHECKING:
+    from googleapiclient.errors import HttpError
+
+# Gmail charges quota units per method, see https://developers.google.com/gmail/api/reference/quota
+GMAIL_QUOTA_UNITS = {
+    "gmail.users.messages.list": 5,
+    "gmail.users.messages.get": 5,
+    "gmail.users.messages.send": 100,
+    "gmail.users.messages.attachments.get": 5,
+    "gmail.users.drafts.create": 10,
+    "gmail.users.drafts.delete": 10,
+}
+DEFAULT_GMAIL_QUOTA_UNITS = 5
+
+# Sustained rate and burst size per account, in quota units for Gmail and requests for the other APIs.
+# Gmail allows 15,000 units per user per minute, Calendar 600 queries per user per minute by default.
+API_LIMITS = {
+    "gmail": (float(os.getenv("MCP_GSUITE_GMAIL_UNITS_PER_SECOND", "250")), float(os.getenv("MCP_GSUITE_GMAIL_BURST_UNITS", "500"))),
+    "calendar": (float(os.getenv("MCP_GSUITE_CALENDAR_REQUESTS_PER_SECOND", "10")), float(os.getenv("MCP_GSUITE_CALENDAR_BURST", "20"))),
+}
+
+MAX_RETRIES = int(os.getenv("MCP_GSUITE_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = float(os.getenv("MCP_GSUITE_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("MCP_GSUITE_RETRY_MAX_DELAY", "32"))
+
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+RETRYABLE_SERVER_STATUSES = {500, 502, 503, 504}
+
+# Methods without side effects, safe to retry after a server error
+_READ_ONLY_SUFFIXES = (".get", ".list", ".query")
+
+
+class TokenBucket():
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Take tokens from the bucket, sleeping until enough are available.
+
+        The wait ends early if the current tool call is cancelled, see cancellation.sleep.
+
+        Args:
+            tokens (float): Tokens needed, capped to the bucket capacity
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            cancellation.ToolCallCancelled: If the tool call was cancelled while waiting
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            cancellation.sleep(delay)
+            waited += delay
+
+
+_buckets: dict[tuple[str, str], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def account_key(http) -> str:
+    """
+    Identify the account a request is made for, without keeping its secrets around.
+
+    Args:
+        http: The authorized http object the request is sent with
+
+    Returns:
+        str: A short hash of the account's refresh token, or 'default'
+    """
+    credentials = getattr(http, "credentials", None)
+    secret = getattr(credentials, "refresh_token", None) or getattr(credentials, "token", None)
+    if not secret:
+        return "default"
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+def acquire(account: str, method: str) -> float:
+    """
+    Wait for quota for one call of a Google API method.
+
+    Args:
+        account (str): Account key, see account_key
+        method (str): Name of the API method, e.g. 'gmail.users.messages.get'
+
+    Returns:
+        float: Seconds spent waiting
+
+    Raises:
+        cancellation.ToolCallCancelled: If the tool call was cancelled while waiting
+    """
+    api = method.split(".", 1)[0]
+    limits = API_LIMITS.get(api)
+    if limits is None:
+        return 0.0
+
+    key = (account, api)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.setdefault(key, TokenBucket(*limits))
+
+    units = GMAIL_QUOTA_UNITS.get(method, DEFAULT_GMAIL_QUOTA_UNITS) if api == "gmail" else 1
+    return bucket.acquire(units)
+
+
+def _error_reasons(error: HttpError) -> set[str]:
+    try:
+        content = json.loads(error.content)
+    except (TypeError, ValueError):
+        return set()
+    return {item.get("reason") for item in content.get("error", {}).get("errors", [])}
+
+
+def is_rate_limited(error: HttpError) -> bool:
+    """True if Google rejected the request because a quota or rate limit was exceeded."""
+    status = error.resp.status
+    return status == 429 or (status == 403 and bool(_error_reasons(error) & RATE_LIMIT_REASONS))
+
+
+def retry_delay(error: HttpError, method: str, attempt: int) -> float | None:
+    """
+    Decide whether a failed request is retried, and after how long.
+
+    Args:
+        error (HttpError): The error returned for the request
+        method (str): Name of the API method
+        attempt (int): Number of retries already made
+
+    Returns:
+        float: Seconds to wait before retrying
+        None: If the request must not be retried
+    """
+    if attempt >= MAX_RETRIES:
+        return None
+    if not is_rate_limited(error):
+        if error.resp.status not in RETRYABLE_SERVER_STATUSES or not method.endswith(_READ_ONLY_SUFFIXES):
+            return None
+
+    retry_after = error.resp.get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
@@ -1,17 +1,26 @@
+import asyncio
+import atexit
+import importlib
 import logging
+import logging.handlers
+import os
+import queue
+import sys
 from collections.abc import Sequence
 from functools import lru_cache
 import subprocess
 from typing import Any
-import traceback
 from dotenv import load_dotenv
-from mcp.server import Server
+from mcp.server import NotificationOptions, Server
+from mcp.server.session import ServerSession
 import threading
+import weakref
 from mcp.types import (
     Tool,
     TextContent,
     ImageContent,
     EmbeddedResource,
+    ListToolsResult,
 )
 import json
 from . import gauth
@@ -20,7 +29,9 @@ from urllib.parse import (
     urlparse,
     parse_qs,
 )
-from . import tools_meet
+from . import timing
+from . import discovery_docs
+from . import cancellation
 
 class OauthListener(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -52,14 +63,31 @@ class OauthListener(BaseHTTPRequestHandler):
 
 load_dotenv()
 
-from . import tools_gmail
-from . import tools_calendar
 from . import toolhandler
 
 # Load environment variables
 
+def configure_logging():
+    """
+    Route logging through a queue written by a background thread, so tool handlers
+    never block on stderr. stdout is reserved for the MCP stdio transport.
+    Tracebacks are only logged when MCP_GSUITE_LOG_LEVEL is DEBUG.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.getenv("MCP_GSUITE_LOG_LEVEL", "INFO").upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger("mcp-gsuite")
 
 def start_auth_flow(user_id: str):
@@ -95,44 +123,137 @@ def setup_oauth2(user_id: str):
 app = Server("mcp-gsuite")
 
 tool_handlers = {}
+# Bumped by add_tool_handler, so the tool list can be cached until the registry changes
+tool_handlers_version = 0
+
 def add_tool_handler(tool_class: toolhandler.ToolHandler):
-    global tool_handlers
+    global tool_handlers, tool_handlers_version
 
     tool_handlers[tool_class.name] = tool_class
+    tool_handlers_version += 1
 
 def get_tool_handler(name: str) -> toolhandler.ToolHandler | None:
+    load_tool_handlers()
     if name not in tool_handlers:
         return None
     
     return tool_handlers[name]
 
-add_tool_handler(tools_gmail.QueryEmailsToolHandler())
-add_tool_handler(tools_gmail.GetEmailByIdToolHandler())
-add_tool_handler(tools_gmail.CreateDraftToolHandler())
-add_tool_handler(tools_gmail.DeleteDraftToolHandler())
-add_tool_handler(tools_gmail.ReplyEmailToolHandler())
-add_tool_handler(tools_gmail.GetAttachmentToolHandler())
-add_tool_handler(tools_gmail.BulkGetEmailsByIdsToolHandler())
-add_tool_handler(tools_gmail.BulkSaveAttachmentsToolHandler())
-add_tool_handler(tools_gmail.SendEmailToolHandler())
+# Tool handlers by module. The modules are imported and the handlers created on first
+# use, so that none of it delays the server's initialize response.
+TOOL_HANDLER_CLASSES = {
+    "tools_gmail": [
+        "QueryEmailsToolHandler",
+        "GetEmailByIdToolHandler",
+        "CreateDraftToolHandler",
+        "DeleteDraftToolHandler",
+        "ReplyEmailToolHandler",
+        "GetAttachmentToolHandler",
+        "BulkGetEmailsByIdsToolHandler",
+        "BulkSaveAttachmentsToolHandler",
+        "SendEmailToolHandler",
+    ],
+    "tools_calendar": [
+        "ListCalendarsToolHandler",
+        "GetCalendarEventsToolHandler",
+        "CreateCalendarEventToolHandler",
+        "DeleteCalendarEventToolHandler",
+        "CheckAvailabilityToolHandler",
+    ],
+    "tools_meet": [
+        "CreateMeetingToolHandler",
+        "CancelMeetingToolHandler",
+        "RescheduleMeetingToolHandler",
+        "GetAllMeetingsToolHandler",
+    ],
+}
+_tool_handlers_loaded = False
+
+def load_tool_handlers():
+    """Import the tool modules and register their handlers, once."""
+    global _tool_handlers_loaded
+
+    if _tool_handlers_loaded:
+        return
+    _tool_handlers_loaded = True
+    for module_name, class_names in TOOL_HANDLER_CLASSES.items():
+        module = importlib.import_module(f".{module_name}", __package__)
+        for class_name in class_names:
+            add_tool_handler(getattr(module, class_name)())
+
+def get_tools_version() -> tuple[int, int]:
+    """Version of the tool list, which changes with the tool handlers and with the accounts in the descriptions"""
+    return (tool_handlers_version, gauth.account_registry.get_version())
+
+# How often, in seconds, the tool list is checked for changes to announce to the client
+TOOLS_CHECK_INTERVAL_SECONDS = float(os.getenv("MCP_GSUITE_TOOLS_CHECK_INTERVAL", "5"))
+
+
+class ToolList():
+    """One version of the tool list, with its tools/list result."""
+
+    def __init__(self, version: tuple[int, int], tools: list[Tool]):
+        self.version = version
+        self.result = ListToolsResult(tools=tools)
+
+
+# The last tool list built
+_tools_cache: ToolList | None = None
+# Version of the tool list last sent on each session, sessions drop out once they are closed
+_listed_tools_versions: weakref.WeakKeyDictionary[ServerSession, tuple[int, int]] = weakref.WeakKeyDictionary()
+
+
+def get_tool_list() -> ToolList:
+    """The current tool list, rebuilt only when its version changes."""
+    global _tools_cache
+
+    load_tool_handlers()
+    version = get_tools_version()
+    if _tools_cache is None or _tools_cache.version != version:
+        _tools_cache = ToolList(version, [th.get_cached_tool_description() for th in tool_handlers.values()])
+    return _tools_cache
 
 
-add_tool_handler(tools_calendar.ListCalendarsToolHandler())
-add_tool_handler(tools_calendar.GetCalendarEventsToolHandler())
-add_tool_handler(tools_calendar.CreateCalendarEventToolHandler())
-add_tool_handler(tools_calendar.DeleteCalendarEventToolHandler())
-add_tool_handler(tools_calendar.CheckAvailabilityToolHandler())
-
-add_tool_handler(tools_meet.CreateMeetingToolHandler())
-add_tool_handler(tools_meet.CancelMeetingToolHandler())
-add_tool_handler(tools_meet.RescheduleMeetingToolHandler())
-add_tool_handler(tools_meet.GetAllMeetingsToolHandler())
-
 @app.list_tools()
 async def list_tools() -> list[Tool]:
-    """List available tools."""
-
-    return [th.get_tool_description() for th in tool_handlers.values()]
+    """
+    List available tools.
+
+    The tools are validated once per version of the tool list, the cached
+    Tool models are returned as they are.
+    """
+    tool_list = get_tool_list()
+    _listed_tools_versions[app.request_context.session] = tool_list.version
+    return tool_list.result.tools
+
+
+async def notify_tools_changed():
+    """Send tools/list_changed on each session whose client listed the tools before they changed."""
+    version = get_tools_version()
+    for session, listed_version in list(_listed_tools_versions.items()):
+        if listed_version == version:
+            continue
+        # Announced once, until the client lists the tools again
+        del _listed_tools_versions[session]
+        try:
+            await session.send_tool_list_changed()
+        except Exception as e:
+            logging.warning(f"Could not send tools/list_changed: {e}")
+
+
+async def watch_tools_version():
+    """
+    Announce changes of the tool list to the client as they happen.
+
+    Tool handlers can be added and the accounts file edited at any time, not
+    only during a tool call, so the version is checked periodically as well.
+    """
+    while True:
+        await asyncio.sleep(TOOLS_CHECK_INTERVAL_SECONDS)
+        try:
+            await notify_tools_changed()
+        except Exception as e:
+            logging.warning(f"Could not check the tool list for changes: {e}")
 
 
 @app.call_tool()
@@ -152,10 +273,31 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageCo
         if not tool_handler:
             raise ValueError(f"Unknown tool: {name}")
 
-        return tool_handler.run_tool(arguments)
+        trace = arguments.pop(toolhandler.TRACE_ARG, None)
+        trace_id = trace.get("request_id") if isinstance(trace, dict) else None
+        with timing.collect(name, trace_id) as tool_timings, cancellation.tool_call() as cancel_token:
+            try:
+                # In a worker thread, so the event loop keeps reading messages while the handler runs.
+                # to_thread copies the context, the handler sees the timings and the cancel token.
+                result = await asyncio.to_thread(lambda: list(tool_handler.run_tool(arguments)))
+                # Nobody reads the result of a call cancelled while it finished
+                cancel_token.check()
+            except (cancellation.ToolCallCancelled, asyncio.CancelledError):
+                # The SDK cancels this task on notifications/cancelled, the worker thread has to be stopped as well
+                cancel_token.cancel()
+                wasted = tool_timings.to_dict()
+                logging.info(f"call_tool {name} cancelled by the client after {wasted['handler_ms']} ms and {wasted['google_api_calls']} Google API calls")
+                raise
+
+        if trace:
+            result.append(TextContent(type="text", text=tool_timings.to_text()))
+        await notify_tools_changed()
+        return result
+    except cancellation.ToolCallCancelled:
+        raise
     except Exception as e:
-        logging.error(traceback.format_exc())
-        logging.error(f"Error during call_tool: str(e)")
+        logging.error(f"Error during call_tool {name}: {str(e)}")
+        logging.debug("Traceback", exc_info=True)
         raise RuntimeError(f"Caught Exception. Error: {str(e) , e}")
 
 
@@ -177,10 +319,18 @@ async def main():
 
     from mcp.server.stdio import stdio_server
 
+    # Parse the discovery documents while the client initializes, so the first tool call doesn't have to wait for it
+    threading.Thread(target=discovery_docs.prewarm, name="mcp-gsuite-discovery-prewarm", daemon=True).start()
+
     async with stdio_server() as (read_stream, write_stream):
         # print("Running main4")
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
\ No newline at end of file
+        tools_watcher = asyncio.create_task(watch_tools_version())
+        try:
+            await app.run(
+                read_stream,
+                write_stream,
+                # Clients may cache the tool list until they get tools/list_changed
+                app.create_initialization_options(NotificationOptions(tools_changed=True))
+            )
+        finally:
+            tools_watcher.cancel()
\ No newline at end of file
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Prefix of the extra content item carrying the timings back to the MCP client
+TIMINGS_PREFIX = "__timings__:"
+
+
+class ToolTimings():
+    """Timings collected while a single tool call is running."""
+
+    def __init__(self, tool_name: str, trace_id: str | None = None):
+        self.tool_name = tool_name
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.google_api_calls = 0
+        # Wall time during which at least one Google API call was in flight, so that
+        # concurrent calls made by one tool are not counted twice
+        self.google_api_seconds = 0.0
+        self._api_calls_in_flight = 0
+        self._api_busy_since = 0.0
+        # Time spent waiting on the rate limiter or backing off before a retry
+        self.rate_limit_wait_seconds = 0.0
+        # Requests Google rejected for exceeding a rate limit, and requests retried for any reason
+        self.throttled = 0
+        self.retries = 0
+        # Handlers may make calls from several threads
+        self._lock = threading.Lock()
+
+    def add(self, name: str, started: float, duration: float):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": round((started - self.started) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+            })
+
+    def api_call_started(self):
+        with self._lock:
+            if self._api_calls_in_flight == 0:
+                self._api_busy_since = time.perf_counter()
+            self._api_calls_in_flight += 1
+
+    def api_call_finished(self):
+        with self._lock:
+            self.google_api_calls += 1
+            self._api_calls_in_flight -= 1
+            if self._api_calls_in_flight == 0:
+                self.google_api_seconds += time.perf_counter() - self._api_busy_since
+
+    def add_rate_limit_wait(self, seconds: float):
+        with self._lock:
+            self.rate_limit_wait_seconds += seconds
+
+    def add_retry(self, throttled: bool):
+        with self._lock:
+            self.retries += 1
+            if throttled:
+                self.throttled += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "tool": self.tool_name,
+            "trace_id": self.trace_id,
+            "handler_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "google_api_ms": round(self.google_api_seconds * 1000, 3),
+            "google_api_calls": self.google_api_calls,
+            "rate_limit_wait_ms": round(self.rate_limit_wait_seconds * 1000, 3),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "spans": self.spans,
+        }
+
+    def to_text(self) -> str:
+        return TIMINGS_PREFIX + json.dumps(self.to_dict())
+
+
+_current_timings: ContextVar[ToolTimings | None] = ContextVar("mcp_gsuite_tool_timings", default=None)
+
+
+@contextmanager
+def collect(tool_name: str, trace_id: str | None = None):
+    """Collect spans for the duration of a tool call."""
+    timings = ToolTimings(tool_name, trace_id)
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def span(name: str, google_api: bool = False):
+    """Time a block and record it on the current tool call, if any."""
+    timings = _current_timings.get()
+    if timings is not None and google_api:
+        timings.api_call_started()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add(name, started, time.perf_counter() - started)
+            if google_api:
+                timings.api_call_finished()
+
+
+def record_rate_limit_wait(seconds: float):
+    """Add time spent waiting for quota to the current tool call, if any."""
+    timings = _current_timings.get()
+    if timings is not None and seconds:
+        timings.add_rate_limit_wait(seconds)
+
+
+def record_retry(throttled: bool):
+    """Count a retried Google API request on the current tool call, if any."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_retry(throttled)
@@ -0,0 +1,139 @@
+"""
+Cache of authorized credentials, refreshed in the background.
+
+Credentials are kept per refresh token, so every tool call for an account
+shares one Credentials object instead of building its own. A background
+thread refreshes the access tokens a few minutes before they expire, which
+keeps OAuth refreshes off the tool call path. When a tool call does need a
+refresh, because the credentials are new or the background refresh failed,
+concurrent calls for the same account wait for a single refresh instead of
+each making their own.
+"""
+from __future__ import annotations
+
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+# Refresh access tokens this long before they expire
+REFRESH_MARGIN_SECONDS = float(os.getenv("MCP_GSUITE_TOKEN_REFRESH_MARGIN", "300"))
+# How often the background thread looks for tokens to refresh
+REFRESH_CHECK_INTERVAL_SECONDS = float(os.getenv("MCP_GSUITE_TOKEN_REFRESH_INTERVAL", "30"))
+# Credentials not used for this long are dropped and no longer refreshed
+IDLE_TTL_SECONDS = float(os.getenv("MCP_GSUITE_TOKEN_IDLE_TTL", "3600"))
+
+
+def _utcnow() -> datetime.datetime:
+    # Credentials.expiry is a naive UTC datetime
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class _Entry():
+
+    def __init__(self, credentials: Credentials):
+        self.credentials = credentials
+        self.last_used = time.monotonic()
+        # Held while refreshing, so that concurrent refreshes of one account are coalesced
+        self.lock = threading.Lock()
+
+    def needs_refresh(self) -> bool:
+        expiry = self.credentials.expiry
+        if expiry is None:
+            # Expiry is unknown until the first refresh
+            return True
+        return expiry - _utcnow() <= datetime.timedelta(seconds=REFRESH_MARGIN_SECONDS)
+
+
+class TokenManager():
+    """Thread-safe cache of credentials per refresh token."""
+
+    def __init__(self):
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._wakeup = threading.Event()
+
+    @staticmethod
+    def _key(creds_data: dict) -> str:
+        secret = creds_data.get("refresh_token") or creds_data.get("token") or ""
+        return hashlib.sha256(secret.encode()).hexdigest()
+
+    def get(self, creds_data: dict) -> Credentials:
+        """
+        Get authorized credentials for the given authorized user info.
+
+        Args:
+            creds_data (dict): Authorized user info, as read by Credentials.from_authorized_user_info
+
+        Returns:
+            Credentials: Valid credentials, shared by every caller with the same refresh token
+        """
+        key = self._key(creds_data)
+        entry = self._entries.get(key)
+        if entry is None:
+            from google.oauth2.credentials import Credentials
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = _Entry(Credentials.from_authorized_user_info(creds_data))
+            self._ensure_worker()
+            # The background thread learns the expiry of tokens passed in without one
+            self._wakeup.set()
+        entry.last_used = time.monotonic()
+
+        if not entry.credentials.valid:
+            self._refresh(entry, lambda entry: not entry.credentials.valid)
+        return entry.credentials
+
+    def _refresh(self, entry: _Entry, stale):
+        from google.auth.transport.requests import Request
+
+        with entry.lock:
+            # Another thread may have refreshed while this one was waiting
+            if stale(entry):
+                entry.credentials.refresh(Request())
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="mcp-gsuite-token-refresh", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(REFRESH_CHECK_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            self.refresh_due()
+
+    def refresh_due(self):
+        """Refresh the tokens that are about to expire, and drop idle credentials."""
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if now - entry.last_used > IDLE_TTL_SECONDS]:
+                del self._entries[key]
+            entries = list(self._entries.items())
+
+        for key, entry in entries:
+            if not entry.credentials.refresh_token or not entry.needs_refresh():
+                continue
+            try:
+                self._refresh(entry, _Entry.needs_refresh)
+            except Exception as e:
+                logging.warning(f"Background token refresh failed: {e}")
+                if "invalid_grant" in str(e):
+                    # The refresh token was revoked, stop retrying it
+                    with self._lock:
+                        self._entries.pop(key, None)
+
+
+manager = TokenManager()
@@ -10,13 +10,17 @@ from . import gauth
 
 USER_ID_ARG = "__user_id__"
 CREDENTIALS_ARG = "__credentials__"
+# When present, the tool call returns its timing breakdown as an extra content item
+TRACE_ARG = "__trace__"
 
 class ToolHandler():
     def __init__(self, tool_name: str):
         self.name = tool_name
+        self._tool_description: Tool | None = None
+        self._tool_description_version = None
 
     def get_account_descriptions(self) -> list[str]:
-        return [a.to_description() for a in gauth.get_account_info()]
+        return gauth.account_registry.get_descriptions()
     
     # we ingest this information into every tool that requires a specified __user_id__. 
     # we also add what information actually can be used (account info). This way Claude
@@ -33,5 +37,16 @@ class ToolHandler():
     def get_tool_description(self) -> Tool:
         raise NotImplementedError()
 
+    def get_cached_tool_description(self) -> Tool:
+        """
+        The tool description, built again only when the accounts file has changed,
+        since descriptions may list the accounts.
+        """
+        version = gauth.account_registry.get_version()
+        if self._tool_description is None or self._tool_description_version != version:
+            self._tool_description = self.get_tool_description()
+            self._tool_description_version = version
+        return self._tool_description
+
     def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         raise NotImplementedError()
\ No newline at end of file
@@ -6,6 +6,7 @@ from mcp.types import (
     EmbeddedResource,
     LoggingLevel,
 )
+from . import fields
 from . import gauth
 from . import calendar
 import json
@@ -92,7 +93,8 @@ class GetCalendarEventsToolHandler(toolhandler.ToolHandler):
                         "type": "boolean",
                         "description": "Whether to include deleted events",
                         "default": False
-                    }
+                    },
+                    fields.FIELDS_ARG: fields.get_fields_arg_schema(fields.CALENDAR_EVENT_OUTPUT_FIELDS)
                 },
             }
         )
@@ -113,6 +115,7 @@ class GetCalendarEventsToolHandler(toolhandler.ToolHandler):
             max_results=args.get('max_results', 250),
             show_deleted=args.get('show_deleted', False),
             calendar_id=args.get(CALENDAR_ID_ARG, 'primary'),
+            projection=args.get(fields.FIELDS_ARG),
         )
 
         return [
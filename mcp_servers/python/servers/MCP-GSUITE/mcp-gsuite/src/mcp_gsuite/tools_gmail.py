@@ -6,10 +6,12 @@ from mcp.types import (
     EmbeddedResource,
     LoggingLevel,
 )
+from . import fields
 from . import gmail
 import json
 from . import toolhandler
 import base64
+import logging
 
 def decode_base64_data(file_data):
     standard_base64_data = file_data.replace("-", "+").replace("_", "/")
@@ -49,7 +51,8 @@ class QueryEmailsToolHandler(toolhandler.ToolHandler):
                         "minimum": 1,
                         "maximum": 500,
                         "default": 100
-                    }
+                    },
+                    fields.FIELDS_ARG: fields.get_fields_arg_schema(fields.GMAIL_METADATA_OUTPUT_FIELDS)
                 },
             }
         )
@@ -67,7 +70,7 @@ class QueryEmailsToolHandler(toolhandler.ToolHandler):
         gmail_service = gmail.GmailService(credentials=credentials)
         query = args.get('query')
         max_results = args.get('max_results', 100)
-        emails = gmail_service.query_emails(query=query, max_results=max_results)
+        emails = gmail_service.query_emails(query=query, max_results=max_results, projection=args.get(fields.FIELDS_ARG))
 
         return [
             TextContent(
@@ -90,7 +93,8 @@ class GetEmailByIdToolHandler(toolhandler.ToolHandler):
                     "email_id": {
                         "type": "string",
                         "description": "The ID of the Gmail message to retrieve"
-                    }
+                    },
+                    fields.FIELDS_ARG: fields.get_fields_arg_schema(fields.GMAIL_OUTPUT_FIELDS)
                 },
                 "required": ["email_id"]
             }
@@ -109,7 +113,8 @@ class GetEmailByIdToolHandler(toolhandler.ToolHandler):
             raise RuntimeError(f"Missing required argument: {toolhandler.CREDENTIALS_ARG}")
 
         gmail_service = gmail.GmailService(credentials=credentials)
-        email, attachments = gmail_service.get_email_by_id_with_attachments(args["email_id"])
+        projection = args.get(fields.FIELDS_ARG)
+        email, attachments = gmail_service.get_email_by_id_with_attachments(args["email_id"], projection=projection)
 
         if email is None:
             return [
@@ -119,7 +124,8 @@ class GetEmailByIdToolHandler(toolhandler.ToolHandler):
                 )
             ]
 
-        email["attachments"] = attachments
+        if not projection or "attachments" in projection:
+            email["attachments"] = attachments
 
         return [
             TextContent(
@@ -135,7 +141,7 @@ class BulkGetEmailsByIdsToolHandler(toolhandler.ToolHandler):
     def get_tool_description(self) -> Tool:
         return Tool(
             name=self.name,
-            description="Retrieves multiple Gmail email messages by their IDs in a single request, including the full message bodies and attachment IDs.",
+            description="Retrieves multiple Gmail email messages by their IDs in a single request, including the full message bodies and attachment IDs. IDs that could not be retrieved are listed under 'errors' with the reason.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -145,7 +151,8 @@ class BulkGetEmailsByIdsToolHandler(toolhandler.ToolHandler):
                             "type": "string"
                         },
                         "description": "List of Gmail message IDs to retrieve"
-                    }
+                    },
+                    fields.FIELDS_ARG: fields.get_fields_arg_schema(fields.GMAIL_OUTPUT_FIELDS)
                 },
                 "required": ["email_ids"]
             }
@@ -164,26 +171,20 @@ class BulkGetEmailsByIdsToolHandler(toolhandler.ToolHandler):
             raise RuntimeError(f"Missing required argument: {toolhandler.CREDENTIALS_ARG}")
 
         gmail_service = gmail.GmailService(credentials=credentials)
-        
-        results = []
-        for email_id in args["email_ids"]:
-            email, attachments = gmail_service.get_email_by_id_with_attachments(email_id)
-            if email is not None:
-                email["attachments"] = attachments
-                results.append(email)
+        emails, errors = gmail_service.get_emails_by_ids_with_attachments(args["email_ids"], projection=args.get(fields.FIELDS_ARG))
 
-        if not results:
+        if not emails:
             return [
                 TextContent(
                     type="text",
-                    text=f"Failed to retrieve any emails from the provided IDs"
+                    text=f"Failed to retrieve any emails from the provided IDs: {json.dumps(errors)}"
                 )
             ]
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(results, indent=2)
+                text=json.dumps({"emails": emails, "errors": errors}, indent=2)
             )
         ]
 
@@ -341,6 +342,17 @@ class ReplyEmailToolHandler(toolhandler.ToolHandler):
                         },
                         "description": "Optional list of email addresses to CC on the reply"
                
+                    },
+                    "quote_original": {
+                        "type": "boolean",
+                        "description": "If true, quotes the original message body below the reply. Requires downloading the original message.",
+                        "default": False
+                    },
+                    "max_quote_chars": {
+                        "type": "integer",
+                        "description": "Maximum number of characters of the original body to quote",
+                        "minimum": 0,
+                        "default": gmail.DEFAULT_MAX_QUOTE_CHARS
                     }
                 },
                 "required": ["original_message_id", "reply_body"]
@@ -361,8 +373,12 @@ class ReplyEmailToolHandler(toolhandler.ToolHandler):
 
         gmail_service = gmail.GmailService(credentials=credentials)
         
-        # First get the original message to extract necessary information
-        original_message = gmail_service.get_email_by_id(args["original_message_id"])
+        # The body of the original is only downloaded when it is quoted, the threading headers are enough otherwise
+        quote_original = args.get("quote_original", False)
+        if quote_original:
+            original_message = gmail_service.get_email_by_id(args["original_message_id"])
+        else:
+            original_message = gmail_service.get_email_headers(args["original_message_id"])
         if original_message is None:
             return [
                 TextContent(
@@ -376,7 +392,9 @@ class ReplyEmailToolHandler(toolhandler.ToolHandler):
             original_message=original_message,
             reply_body=args.get("reply_body", ""),
             send=args.get("send", False),
-            cc=args.get("cc")
+            cc=args.get("cc"),
+            quote_original=quote_original,
+            max_quote_chars=args.get("max_quote_chars", gmail.DEFAULT_MAX_QUOTE_CHARS)
         )
 
         if result is None:
@@ -539,7 +557,8 @@ class BulkSaveAttachmentsToolHandler(toolhandler.ToolHandler):
         for attachment_info in args["attachments"]:
             # get attachment data from message_id and part_id
             message, attachments = gmail_service.get_email_by_id_with_attachments(
-                attachment_info["message_id"]
+                attachment_info["message_id"],
+                projection=["attachments"]
             )
             if message is None:
                 results.append(
@@ -670,7 +689,7 @@ class SendEmailToolHandler(toolhandler.ToolHandler):
         
         except Exception as e:
             logging.error(f"Error in SendEmailToolHandler: {str(e)}")
-            logging.error(traceback.format_exc())
+            logging.debug("Traceback", exc_info=True)
             return [
                 TextContent(
                     type="text",
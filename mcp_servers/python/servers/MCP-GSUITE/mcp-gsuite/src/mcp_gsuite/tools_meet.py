@@ -5,6 +5,7 @@ from mcp.types import (
     ImageContent,
     EmbeddedResource,
 )
+from . import fields
 from . import toolhandler
 from . import meet
 import json
@@ -217,7 +218,8 @@ class GetAllMeetingsToolHandler(toolhandler.ToolHandler):
                         "description": "Whether to include past meetings",
                         "default": False
                     
-                    }
+                    },
+                    fields.FIELDS_ARG: fields.get_fields_arg_schema(fields.MEET_MEETING_OUTPUT_FIELDS)
                 },
             }
         )
@@ -236,7 +238,8 @@ class GetAllMeetingsToolHandler(toolhandler.ToolHandler):
             time_min=args.get("time_min"),
             time_max=args.get("time_max"),
             max_results=args.get("max_results", 100),
-            include_past=args.get("include_past", False)
+            include_past=args.get("include_past", False),
+            projection=args.get(fields.FIELDS_ARG)
         )
 
         return [
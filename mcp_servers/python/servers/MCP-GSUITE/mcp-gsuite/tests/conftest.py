@@ -0,0 +1,87 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "mcp-gsuite-tests", "version": "0"},
+    },
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+
+class StdioServer():
+    """The server run as the MCP client runs it, talked to over its stdio transport."""
+
+    def __init__(self, cwd):
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.path.abspath(SRC_DIR),
+            # Tool list changes are announced without waiting for the default interval
+            "MCP_GSUITE_TOOLS_CHECK_INTERVAL": "0.1",
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "mcp_gsuite"], cwd=cwd, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        # Read on a thread, so a message that never comes fails the test instead of hanging it
+        self._messages = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._messages.put(json.loads(line))
+        self._messages.put(None)
+
+    def send(self, message: dict):
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def receive(self, match, timeout: float = 10) -> dict:
+        """The next message for which match is true, skipping the others."""
+        while True:
+            message = self._messages.get(timeout=timeout)
+            if message is None:
+                raise RuntimeError("Server exited before sending the expected message")
+            if match(message):
+                return message
+
+    def response(self, request_id: int, timeout: float = 10) -> dict:
+        return self.receive(lambda message: message.get("id") == request_id, timeout)
+
+    def notification(self, method: str, timeout: float = 10) -> dict:
+        return self.receive(lambda message: "id" not in message and message.get("method") == method, timeout)
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def list_tools(request_id: int) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/list", "params": {}}
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / ".accounts.json").write_text(json.dumps({"accounts": []}))
+    stdio_server = StdioServer(tmp_path)
+    try:
+        stdio_server.send(INITIALIZE)
+        stdio_server.response(1)
+        stdio_server.send(INITIALIZED)
+        yield stdio_server
+    finally:
+        stdio_server.close()
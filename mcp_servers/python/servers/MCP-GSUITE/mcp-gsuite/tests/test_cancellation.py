@@ -0,0 +1,31 @@
+"""
+Cancellations sent to the server over its stdio transport, the way the MCP client sends them.
+"""
+from conftest import list_tools
+
+
+def cancelled(request_id) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "method": "notifications/cancelled",
+        "params": {"requestId": request_id, "reason": "The client stopped waiting for the result"},
+    }
+
+
+def test_server_keeps_serving_after_a_cancellation(server):
+    server.send(cancelled(7))
+    server.send(list_tools(2))
+
+    response = server.response(2)
+
+    assert response["result"]["tools"]
+    assert server.process.poll() is None
+
+
+def test_cancellation_of_an_answered_request_is_ignored(server):
+    server.send(list_tools(2))
+    server.response(2)
+    server.send(cancelled(2))
+    server.send(list_tools(3))
+
+    assert server.response(3)["result"]["tools"]
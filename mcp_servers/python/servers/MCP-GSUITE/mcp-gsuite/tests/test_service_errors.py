@@ -0,0 +1,39 @@
+"""
+Google API failures surface from the services as errors, not as empty results.
+"""
+import json
+
+import pytest
+from googleapiclient import discovery
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+from mcp_gsuite import discovery_docs
+from mcp_gsuite.calendar import CalendarService
+from mcp_gsuite.gmail import GmailService
+from mcp_gsuite.meet import MeetService
+
+NOT_FOUND = ({"status": "404"}, json.dumps({"error": {"code": 404, "message": "Not Found"}}))
+
+
+def failing_service(service_class, api: str, version: str):
+    # Skips __init__, which would authorize real credentials
+    service = service_class.__new__(service_class)
+    document = discovery_docs.get_document(api, version)
+    service.service = discovery.build_from_document(document, http=HttpMockSequence([NOT_FOUND]))
+    return service
+
+
+@pytest.mark.parametrize("call", [
+    lambda: failing_service(GmailService, "gmail", "v1").query_emails(query="is:unread"),
+    lambda: failing_service(GmailService, "gmail", "v1").get_email_by_id_with_attachments("missing"),
+    lambda: failing_service(GmailService, "gmail", "v1").get_attachment("missing", "attachment"),
+    lambda: failing_service(CalendarService, "calendar", "v3").get_events(),
+    lambda: failing_service(CalendarService, "calendar", "v3").delete_event("missing"),
+    lambda: failing_service(MeetService, "calendar", "v3").get_all_meetings(),
+])
+def test_failed_request_is_raised(call):
+    with pytest.raises(HttpError) as error:
+        call()
+
+    assert error.value.resp.status == 404
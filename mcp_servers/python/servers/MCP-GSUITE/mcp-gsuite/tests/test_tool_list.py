@@ -0,0 +1,82 @@
+"""
+The cached tool list, and the tools/list_changed notifications announcing its changes.
+"""
+import asyncio
+import json
+import queue
+
+import anyio
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+from mcp.types import ToolListChangedNotification
+
+from conftest import list_tools
+from mcp_gsuite import server as gsuite_server
+
+LIST_CHANGED = "notifications/tools/list_changed"
+
+
+def add_account(tmp_path, email: str):
+    accounts_file = tmp_path / ".accounts.json"
+    accounts = json.loads(accounts_file.read_text())["accounts"]
+    accounts.append({"email": email, "account_type": "personal", "extra_info": ""})
+    accounts_file.write_text(json.dumps({"accounts": accounts}))
+
+
+def test_tool_list_is_the_same_on_every_call(server):
+    server.send(list_tools(2))
+    server.send(list_tools(3))
+
+    first, second = server.response(2)["result"], server.response(3)["result"]
+
+    assert first["tools"]
+    assert first == second
+
+
+def test_change_is_announced_to_a_client_that_listed_the_tools(server, tmp_path):
+    server.send(list_tools(2))
+    server.response(2)
+
+    add_account(tmp_path, "new@example.com")
+
+    server.notification(LIST_CHANGED)
+    server.send(list_tools(3))
+    assert server.response(3)["result"]["tools"]
+
+
+def test_change_is_announced_once_until_the_tools_are_listed_again(server, tmp_path):
+    server.send(list_tools(2))
+    server.response(2)
+    add_account(tmp_path, "new@example.com")
+    server.notification(LIST_CHANGED)
+
+    add_account(tmp_path, "other@example.com")
+
+    with pytest.raises(queue.Empty):
+        server.notification(LIST_CHANGED, timeout=1)
+
+
+def test_change_is_not_announced_before_the_tools_are_listed(server, tmp_path):
+    add_account(tmp_path, "new@example.com")
+
+    with pytest.raises(queue.Empty):
+        server.notification(LIST_CHANGED, timeout=1)
+
+
+def test_change_is_announced_on_every_session_that_listed_the_tools(monkeypatch):
+    async def run():
+        async with create_connected_server_and_client_session(gsuite_server.app) as first, \
+                create_connected_server_and_client_session(gsuite_server.app) as second:
+            await first.list_tools()
+            await second.list_tools()
+            version = gsuite_server.get_tools_version()
+            monkeypatch.setattr(gsuite_server, "get_tools_version", lambda: (version[0] + 1, version[1]))
+
+            await gsuite_server.notify_tools_changed()
+
+            for client in (first, second):
+                with anyio.fail_after(5):
+                    message = await client.incoming_messages.receive()
+                assert isinstance(message.root, ToolListChangedNotification)
+
+    asyncio.run(run())